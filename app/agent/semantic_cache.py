@@ -0,0 +1,190 @@
+"""
+Semantic response cache for the support agent.
+
+Stores previously answered questions together with their embeddings so that
+paraphrased repeats can be answered without running the full agent loop.
+
+Usage:
+    from app.agent.semantic_cache import get_semantic_cache
+
+    cache = get_semantic_cache()                    # or get_semantic_cache("rag_tool")
+    cached = cache.lookup(query_embedding)          # dict or None
+    cache.add(query_embedding, {"answer": "...", "sources": [], "tool_used": "rag"})
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from app.utils.logger import get_logger
+
+logger = get_logger()
+
+# Configuration -- override via environment variables if needed
+SIMILARITY_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL", str(60 * 60)))  # default 1 hour
+
+
+@dataclass
+class CacheEntry:
+    question: str
+    answer: str
+    tool_used: str
+    sources: List[Dict[str, Any]] = field(default_factory=list)
+    context: str = ""
+    created_at: float = field(default_factory=time.time)
+
+
+class SemanticCache:
+    """
+    In-process semantic cache backed by a FAISS inner-product index.
+
+    Embeddings must be L2-normalized so that inner product equals cosine
+    similarity. Entries expire after `ttl` seconds and the least recently
+    used entry is evicted once `max_entries` is reached.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SIMILARITY_THRESHOLD,
+        max_entries: int = MAX_ENTRIES,
+        ttl: int = CACHE_TTL_SECONDS,
+    ):
+        self._threshold = threshold
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._index: Optional[faiss.Index] = None
+        self._entries: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _ensure_index(self, dim: int) -> faiss.Index:
+        if self._index is None:
+            # IDMap2 lets us drop individual entries on expiry/eviction
+            self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        return self._index
+
+    def _remove(self, entry_id: int) -> None:
+        self._entries.pop(entry_id, None)
+        if self._index is not None:
+            self._index.remove_ids(np.array([entry_id], dtype=np.int64))
+
+    def _is_expired(self, entry: CacheEntry) -> bool:
+        return self._ttl > 0 and time.time() - entry.created_at > self._ttl
+
+    def lookup(self, embedding: np.ndarray, threshold: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached response for the closest prior question.
+
+        Args:
+            embedding: Normalized query embedding of shape (1, dim)
+            threshold: Minimum cosine similarity for a hit (defaults to configured value)
+
+        Returns:
+            Dictionary with question, answer, tool_used, sources, context and
+            similarity, or None on a miss
+        """
+        threshold = self._threshold if threshold is None else threshold
+        with self._lock:
+            if self._index is None or not self._entries:
+                return None
+
+            scores, ids = self._index.search(embedding, 1)
+            entry_id = int(ids[0][0])
+            score = float(scores[0][0])
+            if entry_id < 0 or score < threshold:
+                return None
+
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                return None
+            if self._is_expired(entry):
+                self._remove(entry_id)
+                return None
+
+            # Mark as most recently used
+            self._entries.move_to_end(entry_id)
+
+        logger.debug("SEMANTIC CACHE HIT | similarity=%.4f | question='%.100s'", score, entry.question)
+        return {
+            "question": entry.question,
+            "answer": entry.answer,
+            "tool_used": entry.tool_used,
+            "sources": list(entry.sources),
+            "context": entry.context,
+            "similarity": score,
+        }
+
+    def add(self, embedding: np.ndarray, result: Dict[str, Any]) -> None:
+        """
+        Store an answered question.
+
+        Args:
+            embedding: Normalized query embedding of shape (1, dim)
+            result: Response dictionary with message, answer, tool_used, sources
+                and optionally the prompt context
+        """
+        entry = CacheEntry(
+            question=result.get("message", ""),
+            answer=result.get("answer", ""),
+            tool_used=result.get("tool_used", "unknown"),
+            sources=list(result.get("sources", [])),
+            context=result.get("context", ""),
+        )
+        with self._lock:
+            index = self._ensure_index(embedding.shape[1])
+
+            # Evict least recently used entries to make room
+            while self._max_entries > 0 and len(self._entries) >= self._max_entries:
+                oldest_id = next(iter(self._entries))
+                self._remove(oldest_id)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            index.add_with_ids(embedding, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = entry
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        with self._lock:
+            self._entries.clear()
+            if self._index is not None:
+                self._index.reset()
+
+
+# Convenience: one SemanticCache instance per namespace for quick imports
+_cache_instances: Dict[str, SemanticCache] = {}
+
+__all__ = ["SemanticCache", "get_semantic_cache", "reset_semantic_cache"]
+
+
+def get_semantic_cache(namespace: str = "agent") -> SemanticCache:
+    """
+    Return the process-wide SemanticCache for `namespace`.
+
+    Namespaces keep unrelated entries apart, e.g. full agent responses
+    ("agent") versus knowledge-base tool answers ("rag_tool").
+    """
+    cache = _cache_instances.get(namespace)
+    if cache is None:
+        cache = _cache_instances[namespace] = SemanticCache()
+    return cache
+
+
+def reset_semantic_cache() -> None:
+    """
+    Reset all cached SemanticCache instances. Mainly useful for unit tests.
+    """
+    _cache_instances.clear()
@@ -1,65 +1,496 @@
 """
-LangChain ReAct Agent for Customer Support.
+LangChain Tool-Calling Agent for Customer Support.
 
-This agent uses LangChain's ReAct framework to intelligently decide:
+This agent uses Gemini's native function calling to intelligently decide:
 - When to use RAG (retrieval tool)
 - When to use direct LLM reasoning
 - When to ask follow-up questions
 
-Uses LangChain's create_react_agent with proper tools and guardrails.
+Tools are bound to ChatGoogleGenerativeAI via bind_tools, so tool calls come
+back as structured data instead of ReAct text that has to be parsed.
 """
 
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Dict, List, Optional
-
-import json
-
-from langchain_core.prompts import PromptTemplate
-from langchain_core.tools import Tool
+import os
+import re
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.tools import BaseTool, StructuredTool
 from langchain_google_genai import ChatGoogleGenerativeAI
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
 
-from app.memory.memory import Message, get_memory_store
+from app.agent.semantic_cache import get_semantic_cache
+from app.memory.memory import Message, encode_message, format_message, get_memory_store
 from app.rag.query_engine import get_rag_instance
+from app.rag.rag_chain import QuestionKey
 from app.utils.logger import get_logger
 from app.tools import OrderLookupTool, TicketTool, UpdateAddressTool
 
 logger = get_logger()
 
-# Cache for whichever AgentExecutor class exists in the installed LangChain version
-_AGENT_EXECUTOR_CLS = None
+# Tools whose answers do not depend on the caller and are safe to replay from the semantic cache.
+# Only knowledge-base answers: direct LLM answers may draw on the conversation so far.
+CACHEABLE_TOOLS = {"rag"}
+
+# Tool names in reporting priority, and the label each one is reported as
+TOOL_PRIORITY = ("order_lookup", "ticket_creator", "update_address", "rag_knowledge_base", "llm_reasoning")
+TOOL_DISPLAY = {
+    "order_lookup": "order_lookup",
+    "ticket_creator": "ticket_creator",
+    "update_address": "update_address",
+    "rag_knowledge_base": "rag",
+    "llm_reasoning": "direct_llm",
+}
+
+# Worker threads for blocking LLM/RAG/tool calls (size to the Gemini concurrency limit)
+AGENT_WORKERS = int(os.getenv("AGENT_WORKERS", "8"))
+
+# Maximum number of concurrency-safe tool calls running at the same time
+TOOL_CONCURRENCY_LIMIT = int(os.getenv("TOOL_CONCURRENCY_LIMIT", "4"))
+
+# Exact-match LRU size for knowledge-base tool answers
+RAG_TOOL_CACHE_SIZE = int(os.getenv("RAG_TOOL_CACHE_SIZE", "512"))
+
+# Number of sessions whose formatted history is memoized in-process
+HISTORY_CACHE_SESSIONS = int(os.getenv("AGENT_HISTORY_CACHE_SESSIONS", "1000"))
+
+# Gemini client transport. "grpc" keeps one long-lived HTTP/2 channel that
+# multiplexes concurrent calls; "rest" opens HTTP/1.1 connections instead.
+GEMINI_TRANSPORT = os.getenv("GEMINI_TRANSPORT", "grpc")
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")  # optional regional/proxy endpoint
+
+# Agent loop guardrails
+MAX_ITERATIONS = 3
+# Hard deadline (seconds) for one query; bounds every LLM and tool await, not just the gaps between steps
+MAX_EXECUTION_TIME = float(os.getenv("AGENT_DEADLINE_S", "20"))
+
+# Static system instruction. Gemini receives it (together with the tool
+# declarations) ahead of the conversation, and it never changes between calls,
+# so implicit prefix caching can reuse it on every LLM turn.
+SYSTEM_PREFIX = """You are NeuraHome's AI support agent that must decide when to use tools.
+Always follow these rules:
+- Use order_lookup when the customer asks about an order number or shipment status; pass only the order ID string.
+- Use ticket_creator when the customer reports a problem that needs follow-up; provide issue_type, description and user_id.
+- Use update_address when the customer requests an address change; provide user_id and new_address.
+- Use rag_knowledge_base for policy, manual, or troubleshooting questions.
+- Use llm_reasoning for general conversation, calculations, or when no tool is appropriate.
+- If a required detail (order ID, user ID, new address) is missing, ask the customer for it instead of guessing.
+When you have enough information, reply to the customer directly, citing tool results when used."""
+
+# Built once and shared by every query (messages are never mutated by the loop)
+SYSTEM_MESSAGE = SystemMessage(content=SYSTEM_PREFIX)
 
 
-def _get_agent_executor_cls():
-    """Return the AgentExecutor class regardless of LangChain version."""
-    global _AGENT_EXECUTOR_CLS
-    if _AGENT_EXECUTOR_CLS is not None:
-        return _AGENT_EXECUTOR_CLS
+class KnowledgeBaseInput(BaseModel):
+    """Arguments for the rag_knowledge_base tool."""
+    query: str = Field(..., description="A clear question about NeuraHome products or policies")
 
-    candidate_modules = [
-        "langchain.agents",
-        "langchain.agents.agent",
-        "langchain.agents.agent_executor",
-    ]
 
-    for module_path in candidate_modules:
+class ReasoningInput(BaseModel):
+    """Arguments for the llm_reasoning tool."""
+    query: str = Field(..., description="The question or statement to reason about")
+
+
+class OrderLookupInput(BaseModel):
+    """Arguments for the order_lookup tool."""
+    order_id: str = Field(..., description="The order ID string, e.g. '1234'")
+
+
+class TicketInput(BaseModel):
+    """Arguments for the ticket_creator tool."""
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    issue_type: str = Field(..., min_length=1, description="Short issue category, e.g. 'delivery_issue'")
+    description: str = Field(..., min_length=1, description="Details of the customer's problem")
+    user_id: str = Field(..., min_length=1, description="Customer user ID, e.g. 'u001'")
+
+
+class AddressUpdateInput(BaseModel):
+    """Arguments for the update_address tool."""
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    user_id: str = Field(..., min_length=1, description="Customer user ID, e.g. 'u001'")
+    new_address: str = Field(..., min_length=1, description="The full new address")
+
+
+def _missing_fields_message(error: ValidationError) -> str:
+    """Turn a tool-argument ValidationError into the message returned to the LLM."""
+    fields = sorted({str(err["loc"][0]) for err in error.errors() if err.get("loc")})
+    return f"Missing required fields: {', '.join(fields)}"
+
+
+def _is_concurrency_safe(tool: BaseTool) -> bool:
+    """Read-only tools are tagged so they can run alongside each other."""
+    return bool((tool.metadata or {}).get("is_concurrency_safe"))
+
+
+def _message_text(message: BaseMessage) -> str:
+    """Extract plain text from a chat model message (content may be a list of parts)."""
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        part if isinstance(part, str) else part.get("text", "")
+        for part in content
+    )
+
+
+# Fast path: messages whose intent is obvious are answered without an LLM call.
+# Read-only intents only; anything that changes state goes through the agent.
+ORDER_ID_PATTERN = re.compile(r"\border\s*#?\s*(\d{3,})", re.IGNORECASE)
+ADDRESS_CHANGE_PATTERN = re.compile(r"\b(?:change|update|new)\s+(?:my\s+)?(?:shipping\s+)?address\b", re.IGNORECASE)
+USER_ID_PATTERN = re.compile(r"\b(u\d{3,})\b", re.IGNORECASE)
+# "... address to <new address>": the message already carries the new address
+NEW_ADDRESS_PATTERN = re.compile(r"\baddress\b.*?\bto\s+\S", re.IGNORECASE)
+# Words that signal more than a plain lookup; such messages go to the full agent
+COMPLEX_INTENT_PATTERN = re.compile(
+    r"\b(?:ticket|complain\w*|refund|return|cancel\w*|broken|damaged|wrong|missing|never|late|why|how)\b",
+    re.IGNORECASE,
+)
+GREETING_REPLIES = {
+    "hi": "Hi! I'm NeuraHome's support assistant. How can I help you today?",
+    "hello": "Hello! I'm NeuraHome's support assistant. How can I help you today?",
+    "hey": "Hey! I'm NeuraHome's support assistant. How can I help you today?",
+    "thanks": "You're welcome! Is there anything else I can help you with?",
+    "thank you": "You're welcome! Is there anything else I can help you with?",
+}
+ADDRESS_DETAILS_PROMPT = (
+    "I can update your shipping address. Please share your user ID (e.g. u001) "
+    "and the new address you'd like us to use."
+)
+
+
+def _quick_intent(message: str) -> Optional[Tuple[Optional[str], Any]]:
+    """
+    Match messages whose intent is obvious without asking the LLM.
+
+    Only read-only intents are handled here. Address changes are written by
+    the agent, which can tell a request from a question or hypothetical
+    ("should I update my address to ...?"); the fast path only asks for the
+    missing details when none were given.
+
+    Args:
+        message: User's message
+
+    Returns:
+        (tool_name, tool_args) when a tool should be called directly,
+        (None, reply) for a canned reply, or None to run the full agent
+    """
+    text = message.strip()
+    reply = GREETING_REPLIES.get(text.lower().rstrip("!.? "))
+    if reply is not None:
+        return None, reply
+
+    if COMPLEX_INTENT_PATTERN.search(text):
+        return None
+
+    if ADDRESS_CHANGE_PATTERN.search(text):
+        if not USER_ID_PATTERN.search(text) and not NEW_ADDRESS_PATTERN.search(text):
+            return None, ADDRESS_DETAILS_PROMPT
+        return None
+
+    order_match = ORDER_ID_PATTERN.search(text)
+    if order_match:
+        return "order_lookup", {"order_id": order_match.group(1)}
+
+    return None
+
+
+# Shared Gemini chat model (lazy initialization)
+_llm_instance: Optional[ChatGoogleGenerativeAI] = None
+
+
+def get_llm() -> ChatGoogleGenerativeAI:
+    """Get or create the shared Gemini chat model used by the agent and its tools."""
+    global _llm_instance
+    if _llm_instance is None:
+        api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("Google API key not found!")
+
+        client_options = {"api_endpoint": GEMINI_API_ENDPOINT} if GEMINI_API_ENDPOINT else None
+        _llm_instance = ChatGoogleGenerativeAI(
+            model="gemini-2.5-flash",
+            temperature=0.2,
+            google_api_key=api_key,
+            transport=GEMINI_TRANSPORT,
+            client_options=client_options,
+        )
+    return _llm_instance
+
+
+def _create_rag_tool(rag_chain_factory: Callable[[], Any]) -> BaseTool:
+    """
+    Create RAG retrieval tool for LangChain agent.
+    
+    Args:
+        rag_chain_factory: Returns the (lazily initialized) RAG chain
+        
+    Returns:
+        LangChain StructuredTool for RAG retrieval
+    """
+    rag_cache = get_semantic_cache("rag_tool")
+    seen_version: Optional[int] = None
+
+    @lru_cache(maxsize=RAG_TOOL_CACHE_SIZE)
+    def cached_answer(key: QuestionKey, corpus_version: int) -> Tuple[str, Tuple[Dict[str, Any], ...]]:
+        """
+        Answer a query, trying the semantic cache before the RAG chain.
+        
+        Exact repeats are served by lru_cache, keyed on the normalized query;
+        the query as asked (key.original) is what gets embedded and answered.
+        `corpus_version` is part of the key so re-indexing the knowledge base
+        invalidates old answers.
+        """
+        query = key.original
+        rag_chain = rag_chain_factory()
+        embedding = rag_chain.vector_store.encode_query(query)
+        cached = rag_cache.lookup(embedding)
+        if cached is not None:
+            logger.info("RAG TOOL CACHE HIT | similarity=%.4f", cached['similarity'])
+            return cached["answer"], tuple(cached["sources"])
+
+        result = rag_chain.ask_with_sources(query, k=5)
+        if result.get("error"):
+            # Raise so failures are never memoized
+            raise RuntimeError(result["error"])
+
+        answer = result.get("answer", "No information found.")
+        sources = result.get("sources", [])
+        rag_cache.add(embedding, {
+            "message": query,
+            "answer": answer,
+            "sources": sources,
+            "tool_used": "rag"
+        })
+        return answer, tuple(sources)
+
+    def rag_search(query: str) -> str:
+        """
+        Search the NeuraHome knowledge base for product information.
+        
+        Use this tool for questions about:
+        - Product manuals and setup instructions
+        - Troubleshooting guides
+        - Policy documents (shipping, returns, warranty)
+        - FAQs about NeuraHome products
+        
+        Args:
+            query: The question to search for
+            
+        Returns:
+            Answer from knowledge base
+        """
+        nonlocal seen_version
+        try:
+            logger.info("RAG TOOL CALLED | query='%.100s...'", query)
+            corpus_version = rag_chain_factory().corpus_version
+            if seen_version != corpus_version:
+                # Knowledge base was re-indexed: drop answers from the old corpus
+                if seen_version is not None:
+                    cached_answer.cache_clear()
+                    rag_cache.clear()
+                seen_version = corpus_version
+
+            answer, sources = cached_answer(QuestionKey(query), corpus_version)
+            
+            # Include source information
+            if sources:
+                source_info = "\n\nSources:\n" + "\n".join([
+                    f"- {src.get('title', 'N/A')}" for src in sources[:3]
+                ])
+                answer += source_info
+            
+            logger.info("RAG TOOL RESULT | answer_length=%s", len(answer))
+            return answer
+        except Exception as e:
+            logger.error("RAG TOOL ERROR | error='%s'", e)
+            return f"Error searching knowledge base: {str(e)}"
+
+    return StructuredTool.from_function(
+        func=rag_search,
+        name="rag_knowledge_base",
+        description=(
+            "Search the NeuraHome product knowledge base. "
+            "Use this tool for questions about: product manuals, setup instructions, "
+            "troubleshooting, policies (shipping, returns, warranty), FAQs, and any "
+            "NeuraHome product-specific information."
+        ),
+        args_schema=KnowledgeBaseInput,
+        metadata={"is_concurrency_safe": True},
+    )
+
+
+def _create_reasoning_tool(llm_factory: Callable[[], Any]) -> BaseTool:
+    """
+    Create LLM reasoning tool for general questions.
+    
+    Args:
+        llm_factory: Returns the shared chat model
+        
+    Returns:
+        LangChain StructuredTool for direct LLM reasoning
+    """
+    def llm_reasoning(query: str) -> str:
+        """
+        Use LLM for general reasoning, calculations, or questions not in knowledge base.
+        
+        Use this tool for:
+        - Mathematical calculations
+        - General knowledge questions
+        - Questions not related to NeuraHome products
+        - Conversational responses
+        
+        Args:
+            query: The question or statement to reason about
+            
+        Returns:
+            LLM-generated answer
+        """
         try:
-            module = __import__(module_path, fromlist=["AgentExecutor"])
-            _AGENT_EXECUTOR_CLS = getattr(module, "AgentExecutor")
-            return _AGENT_EXECUTOR_CLS
-        except (ImportError, AttributeError):
-            continue
-
-    raise ImportError(
-        "Could not import AgentExecutor from LangChain. "
-        "Please upgrade langchain to >=0.1.0 or ensure agent components are installed."
+            logger.info("REASONING TOOL CALLED | query='%.100s...'", query)
+            llm = llm_factory()
+            response = llm.invoke(query)
+            answer = response.content if hasattr(response, "content") else str(response)
+            logger.info("REASONING TOOL RESULT | answer_length=%s", len(answer))
+            return answer.strip()
+        except Exception as e:
+            logger.error("REASONING TOOL ERROR | error='%s'", e)
+            return f"Error processing question: {str(e)}"
+
+    return StructuredTool.from_function(
+        func=llm_reasoning,
+        name="llm_reasoning",
+        description=(
+            "Use this tool for general reasoning, calculations, or questions that don't "
+            "require NeuraHome product knowledge. Use for: math problems, general knowledge, "
+            "conversational responses, or questions outside the product documentation."
+        ),
+        args_schema=ReasoningInput,
+        metadata={"is_concurrency_safe": True},
+    )
+
+
+def _create_order_lookup_tool(order_tool: OrderLookupTool) -> BaseTool:
+    """Create a tool for looking up order details."""
+
+    def lookup(order_id: str) -> str:
+        oid = order_id.strip()
+        if not oid:
+            return "Please provide an order ID (e.g., 1234)."
+
+        result = order_tool.lookup(oid)
+        if "error" in result:
+            return result["error"]
+
+        items = ", ".join(result.get("items", [])) or "No items recorded"
+        total = result.get("total_price", "Unknown")
+        status = result.get("status", "Unknown")
+        eta = result.get("expected_delivery", "Unknown delivery date")
+        return (
+            f"Order {oid} for user {result.get('user_id', 'unknown')}:\n"
+            f"- Status: {status}\n"
+            f"- Items: {items}\n"
+            f"- Total Price: ${total}\n"
+            f"- Expected Delivery: {eta}"
+        )
+
+    return StructuredTool.from_function(
+        func=lookup,
+        name="order_lookup",
+        description="Fetch order status, items, total price and expected delivery for an order ID.",
+        args_schema=OrderLookupInput,
+        metadata={"is_concurrency_safe": True},
     )
 
 
+def _create_ticket_tool(ticket_tool: TicketTool) -> BaseTool:
+    """Create a tool for logging customer support tickets."""
+
+    def create_ticket(issue_type: str, description: str, user_id: str) -> str:
+        # Arguments are already validated (non-empty, stripped) by TicketInput
+        ticket = ticket_tool.create_ticket(
+            issue_type=issue_type,
+            description=description,
+            user_id=user_id,
+        )
+        return (
+            f"Ticket {ticket['ticket_id']} created for user {ticket['user_id']} "
+            f"({ticket['issue_type']}). Status: {ticket['status']}."
+        )
+
+    return StructuredTool.from_function(
+        func=create_ticket,
+        name="ticket_creator",
+        description="Create a support ticket for a customer problem that needs follow-up.",
+        args_schema=TicketInput,
+        handle_validation_error=_missing_fields_message,
+        metadata={"is_concurrency_safe": False},
+    )
+
+
+def _create_address_update_tool(address_tool: UpdateAddressTool) -> BaseTool:
+    """Create a tool for updating user addresses."""
+
+    def update_address(user_id: str, new_address: str) -> str:
+        # Arguments are already validated (non-empty, stripped) by AddressUpdateInput
+        result = address_tool.update(user_id, new_address)
+        if "error" in result:
+            return result["error"]
+
+        return (
+            f"Address updated for {result.get('name', 'user')} "
+            f"({result['user_id']}). New address: {result['address']}."
+        )
+
+    return StructuredTool.from_function(
+        func=update_address,
+        name="update_address",
+        description="Update a user's shipping address.",
+        args_schema=AddressUpdateInput,
+        handle_validation_error=_missing_fields_message,
+        metadata={"is_concurrency_safe": False},
+    )
+
+
+def _build_tools(
+    rag_chain_factory: Callable[[], Any],
+    llm_factory: Callable[[], Any],
+    order_tool: OrderLookupTool,
+    ticket_tool: TicketTool,
+    address_tool: UpdateAddressTool,
+) -> List[BaseTool]:
+    """Build the agent's tool set from its backends."""
+    return [
+        _create_rag_tool(rag_chain_factory),
+        _create_reasoning_tool(llm_factory),
+        _create_order_lookup_tool(order_tool),
+        _create_ticket_tool(ticket_tool),
+        _create_address_update_tool(address_tool),
+    ]
+
+
+# Stateless tool set shared by every agent instance (backends are initialized lazily)
+TOOLS = _build_tools(
+    rag_chain_factory=get_rag_instance,
+    llm_factory=get_llm,
+    order_tool=OrderLookupTool(),
+    ticket_tool=TicketTool(),
+    address_tool=UpdateAddressTool(),
+)
+TOOLS_BY_NAME: Dict[str, BaseTool] = {tool.name: tool for tool in TOOLS}
+
+
 class SupportAgent:
     """
-    LangChain ReAct Agent for intelligent customer support.
+    LangChain Tool-Calling Agent for intelligent customer support.
     
     The agent can:
     - Use RAG tool for product documentation questions
@@ -70,343 +501,446 @@ class SupportAgent:
 
     def __init__(self, history_window: int = 10):
         """
-        Initialize the LangChain ReAct Agent.
+        Initialize the LangChain Tool-Calling Agent.
         
         Args:
             history_window: Number of recent messages to include in context
         """
         self.memory = get_memory_store()
+        self.semantic_cache = get_semantic_cache()
         self.history_window = history_window
-        self._rag_chain = None
-        self._llm = None
+        # session_id -> (memory version, formatted lines, joined text)
+        self._history_cache: "OrderedDict[str, Tuple[int, List[str], str]]" = OrderedDict()
+        # session_id -> in-flight background memory write (also keeps the task referenced)
+        self._pending_writes: Dict[str, asyncio.Task] = {}
+        # Corpus version the semantic cache's answers were generated from
+        self._corpus_version: Optional[int] = None
         self._agent_executor = None
-        self._order_tool = OrderLookupTool()
-        self._ticket_tool = TicketTool()
-        self._address_tool = UpdateAddressTool()
+        self._tool_semaphore = asyncio.Semaphore(TOOL_CONCURRENCY_LIMIT)
+        # Dedicated bounded pool so agent work doesn't compete with FastAPI's default executor
+        self._executor = ThreadPoolExecutor(max_workers=AGENT_WORKERS, thread_name_prefix="support-agent")
 
     def _get_rag_chain(self):
-        """Lazy initialization of RAG chain."""
-        if self._rag_chain is None:
-            self._rag_chain = get_rag_instance(verbose=False)
-        return self._rag_chain
+        """Return the current shared RAG chain (replaced after a re-index reset)."""
+        return get_rag_instance(verbose=False)
 
     def _get_llm(self):
-        """Lazy initialization of LLM for agent."""
-        if self._llm is None:
-            import os
-            api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
-            if not api_key:
-                raise ValueError("Google API key not found!")
-            
-            self._llm = ChatGoogleGenerativeAI(
-                model="gemini-2.5-flash",
-                temperature=0.2,
-                google_api_key=api_key
-            )
-        return self._llm
+        """Return the shared LLM for the agent."""
+        return get_llm()
 
     async def _run_in_executor(self, func, *args, **kwargs):
         """Run synchronous function in thread executor."""
         loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, lambda: func(*args, **kwargs))
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    def shutdown(self) -> None:
+        """Stop the agent's worker threads, cancelling queued work."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _cache_history(self, session_id: str, version: int, lines: List[str]) -> str:
+        """Memoize the formatted history of a session and return its text."""
+        text = "\n".join(lines)
+        self._history_cache[session_id] = (version, lines, text)
+        self._history_cache.move_to_end(session_id)
+        while len(self._history_cache) > HISTORY_CACHE_SESSIONS:
+            self._history_cache.popitem(last=False)
+        return text
+
+    async def _get_history_text(self, session_id: str) -> Tuple[str, int]:
+        """
+        Return the formatted recent history for a session and its message count.
+        
+        The formatted text is reused while the session's memory version is
+        unchanged, which skips the history fetch and the string rebuild.
+        """
+        version = await self.memory.get_version(session_id)
+        cached = self._history_cache.get(session_id)
+        if cached is None or cached[0] != version:
+            history = await self.memory.get_recent(session_id, n=self.history_window)
+            lines = [self._format_message(msg) for msg in history]
+            self._cache_history(session_id, version, lines)
+            cached = self._history_cache[session_id]
+        return cached[2], len(cached[1])
+
+    async def _remember_turn(self, session_id: str, message: str, answer: str) -> None:
+        """Store a user/assistant turn and extend the memoized history in place."""
+        await self.memory.add_message(session_id, encode_message("user", message))
+        version = await self.memory.add_message(session_id, encode_message("assistant", answer))
+
+        cached = self._history_cache.get(session_id)
+        if cached is not None and cached[0] == version - 2:
+            lines = cached[1] + [f"User: {message}", f"Assistant: {answer}"]
+            self._cache_history(session_id, version, lines[-self.history_window:])
+
+    def _persist_turn(self, session_id: str, message: str, answer: str) -> None:
+        """
+        Store a turn in memory in the background so the response isn't delayed.
+        
+        Writes for the same session are chained so turns stay in order.
+        """
+        previous = self._pending_writes.get(session_id)
+
+        async def write() -> None:
+            if previous is not None:
+                await asyncio.wait([previous])
+            await self._remember_turn(session_id, message, answer)
+
+        task = asyncio.create_task(write())
+        self._pending_writes[session_id] = task
+        task.add_done_callback(lambda t: self._on_write_done(session_id, t))
+
+    def _on_write_done(self, session_id: str, task: asyncio.Task) -> None:
+        """Forget a finished background write and log its failure, if any."""
+        if self._pending_writes.get(session_id) is task:
+            del self._pending_writes[session_id]
+        if not task.cancelled() and task.exception() is not None:
+            error = task.exception()
+            logger.error(
+                "MEMORY WRITE ERROR | session_id=%s | "
+                "error_type=%s | error='%s'",
+                session_id,
+                type(error).__name__,
+                error,
+            )
+
+    async def _wait_for_pending_write(self, session_id: str) -> None:
+        """Wait for this session's previous turn to be stored before reading history."""
+        task = self._pending_writes.get(session_id)
+        if task is not None:
+            # Failures are already logged by _on_write_done
+            await asyncio.wait([task])
+
+    def _embed_query(self, message: str):
+        """Embed a message with the RAG chain's embedding model."""
+        return self._get_rag_chain().vector_store.encode_query(message)
 
-    def _create_rag_tool(self) -> Tool:
+    def warm_up(self) -> None:
         """
-        Create RAG retrieval tool for LangChain agent.
+        Eagerly build the LLM client, RAG chain, embedding model and agent executor.
+        
+        Called from the FastAPI startup hook so the first request doesn't pay
+        the initialization cost.
+        """
+        self._get_llm()
+        self._get_rag_chain()
+        # Loads the embedding model/tokenizer used by the semantic cache
+        self._embed_query("warm up")
+        self._create_agent_executor()
+        logger.info("AGENT WARM-UP COMPLETE")
+
+    def _create_agent_executor(self) -> Any:
+        """
+        Bind the agent tools to the Gemini chat model.
         
         Returns:
-            LangChain Tool for RAG retrieval
+            Tool-calling chat model (ChatGoogleGenerativeAI.bind_tools)
         """
-        def rag_search(query: str) -> str:
-            """
-            Search the NeuraHome knowledge base for product information.
-            
-            Use this tool for questions about:
-            - Product manuals and setup instructions
-            - Troubleshooting guides
-            - Policy documents (shipping, returns, warranty)
-            - FAQs about NeuraHome products
-            
-            Args:
-                query: The question to search for
-                
-            Returns:
-                Answer from knowledge base
-            """
+        if self._agent_executor is None:
+            # Each tool becomes a Gemini FunctionDeclaration built from its args_schema
+            self._agent_executor = self._get_llm().bind_tools(TOOLS)
+            logger.info("LangChain Tool-Calling Agent initialized")
+
+        return self._agent_executor
+
+    async def _call_tool(self, tool_call: Dict[str, Any], tools_by_name: Dict[str, BaseTool]) -> str:
+        """Run a single tool call off the event loop, bounded by the tool semaphore."""
+        name = tool_call["name"]
+        tool = tools_by_name.get(name)
+        if tool is None:
+            return f"{name} is not a valid tool, try one of [{', '.join(tools_by_name)}]."
+
+        async with self._tool_semaphore:
             try:
-                logger.info(f"RAG TOOL CALLED | query='{query[:100]}...'")
-                rag_chain = self._get_rag_chain()
-                result = rag_chain.ask_with_sources(query, k=5)
-                answer = result.get("answer", "No information found.")
-                
-                # Include source information
-                sources = result.get("sources", [])
-                if sources:
-                    source_info = "\n\nSources:\n" + "\n".join([
-                        f"- {src.get('title', 'N/A')}" for src in sources[:3]
-                    ])
-                    answer += source_info
-                
-                logger.info(f"RAG TOOL RESULT | answer_length={len(answer)}")
-                return answer
+                return str(await self._run_in_executor(tool.run, tool_call.get("args", {})))
             except Exception as e:
-                logger.error(f"RAG TOOL ERROR | error='{str(e)}'")
-                return f"Error searching knowledge base: {str(e)}"
-
-        return Tool(
-            name="rag_knowledge_base",
-            func=rag_search,
-            description=(
-                "Search the NeuraHome product knowledge base. "
-                "Use this tool for questions about: product manuals, setup instructions, "
-                "troubleshooting, policies (shipping, returns, warranty), FAQs, and any "
-                "NeuraHome product-specific information. "
-                "Input should be a clear question about NeuraHome products or policies."
-            )
-        )
+                logger.error("TOOL ERROR | tool=%s | error='%s'", name, e)
+                return f"Error running {name}: {str(e)}"
 
-    def _create_reasoning_tool(self) -> Tool:
+    async def _dispatch_tool_calls(
+        self,
+        tool_calls: List[Dict[str, Any]],
+        tools_by_name: Dict[str, BaseTool]
+    ) -> List[str]:
         """
-        Create LLM reasoning tool for general questions.
+        Execute the tool calls emitted by one LLM turn.
+        
+        Consecutive concurrency-safe (read-only) calls are gathered and run in
+        parallel; write tools act as barriers and run one at a time, in order.
         
         Returns:
-            LangChain Tool for direct LLM reasoning
+            Observations in the same order as `tool_calls`
+        """
+        observations: List[str] = [""] * len(tool_calls)
+        batch: List[int] = []
+
+        async def flush_batch() -> None:
+            if not batch:
+                return
+            results = await asyncio.gather(
+                *[self._call_tool(tool_calls[i], tools_by_name) for i in batch]
+            )
+            for i, observation in zip(batch, results):
+                observations[i] = observation
+            batch.clear()
+
+        for idx, tool_call in enumerate(tool_calls):
+            tool = tools_by_name.get(tool_call["name"])
+            if tool is not None and _is_concurrency_safe(tool):
+                batch.append(idx)
+                continue
+            await flush_batch()
+            observations[idx] = await self._call_tool(tool_call, tools_by_name)
+        await flush_batch()
+
+        return observations
+
+    async def _iter_agent_loop(
+        self,
+        agent_executor: Any,
+        full_input: str,
+        stream: bool = False
+    ) -> AsyncIterator[Tuple[str, Any]]:
         """
-        def llm_reasoning(query: str) -> str:
-            """
-            Use LLM for general reasoning, calculations, or questions not in knowledge base.
+        Drive the function-calling loop.
+        
+        Each LLM turn either answers the customer or returns structured tool
+        calls; the tool calls are executed through `_dispatch_tool_calls` and
+        their results are sent back as ToolMessages.
+        
+        Args:
+            agent_executor: Tool-calling chat model
+            full_input: User message (with conversation context)
+            stream: If True, stream each LLM turn and yield its text as it arrives
             
-            Use this tool for:
-            - Mathematical calculations
-            - General knowledge questions
-            - Questions not related to NeuraHome products
-            - Conversational responses
+        Yields:
+            ("token", text) events when streaming, then a single ("result", dict)
+            with 'output' and 'tools_used' (names of the tools called, in order)
             
-            Args:
-                query: The question or statement to reason about
-                
-            Returns:
-                LLM-generated answer
-            """
-            try:
-                logger.info(f"REASONING TOOL CALLED | query='{query[:100]}...'")
-                llm = self._get_llm()
-                response = llm.invoke(query)
-                answer = response.content if hasattr(response, "content") else str(response)
-                logger.info(f"REASONING TOOL RESULT | answer_length={len(answer)}")
-                return answer.strip()
-            except Exception as e:
-                logger.error(f"REASONING TOOL ERROR | error='{str(e)}'")
-                return f"Error processing question: {str(e)}"
-
-        return Tool(
-            name="llm_reasoning",
-            func=llm_reasoning,
-            description=(
-                "Use this tool for general reasoning, calculations, or questions that don't "
-                "require NeuraHome product knowledge. Use for: math problems, general knowledge, "
-                "conversational responses, or questions outside the product documentation. "
-                "Input should be the question or statement to reason about."
+        Raises:
+            asyncio.TimeoutError: If the query runs past MAX_EXECUTION_TIME
+        """
+        messages: List[BaseMessage] = [
+            SYSTEM_MESSAGE,
+            HumanMessage(content=full_input),
+        ]
+        deadline = time.monotonic() + MAX_EXECUTION_TIME
+
+        def remaining() -> float:
+            return max(deadline - time.monotonic(), 0.0)
+
+        tools_used: List[str] = []
+        for _ in range(MAX_ITERATIONS):
+            if stream:
+                response = None
+                chunks = agent_executor.astream(messages).__aiter__()
+                try:
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout=remaining())
+                        except StopAsyncIteration:
+                            break
+                        response = chunk if response is None else response + chunk
+                        text = _message_text(chunk)
+                        if text:
+                            yield "token", text
+                finally:
+                    # Close the stream (and its HTTP response) on timeout or cancellation too
+                    await chunks.aclose()
+                if response is None:
+                    # Empty stream: treat as an empty answer rather than appending None
+                    response = AIMessage(content="")
+            else:
+                response = await asyncio.wait_for(
+                    self._run_in_executor(agent_executor.invoke, messages),
+                    timeout=remaining()
+                )
+            messages.append(response)
+
+            tool_calls = getattr(response, "tool_calls", None) or []
+            if not tool_calls:
+                yield "result", {
+                    "output": _message_text(response).strip(),
+                    "tools_used": tools_used
+                }
+                return
+
+            observations = await asyncio.wait_for(
+                self._dispatch_tool_calls(tool_calls, TOOLS_BY_NAME),
+                timeout=remaining()
             )
-        )
-
-    def _create_order_lookup_tool(self) -> Tool:
-        """Create a tool for looking up order details."""
-
-        def lookup(order_id: str) -> str:
-            oid = order_id.strip()
-            if not oid:
-                return "Please provide an order ID (e.g., 1234)."
-
-            result = self._order_tool.lookup(oid)
-            if "error" in result:
-                return result["error"]
-
-            items = ", ".join(result.get("items", [])) or "No items recorded"
-            total = result.get("total_price", "Unknown")
-            status = result.get("status", "Unknown")
-            eta = result.get("expected_delivery", "Unknown delivery date")
-            return (
-                f"Order {oid} for user {result.get('user_id', 'unknown')}:\n"
-                f"- Status: {status}\n"
-                f"- Items: {items}\n"
-                f"- Total Price: ${total}\n"
-                f"- Expected Delivery: {eta}"
+            for tool_call, observation in zip(tool_calls, observations):
+                messages.append(ToolMessage(
+                    content=observation,
+                    name=tool_call["name"],
+                    tool_call_id=tool_call.get("id") or tool_call["name"],
+                ))
+                tools_used.append(tool_call["name"])
+
+        yield "result", {
+            "output": "Agent stopped due to iteration limit.",
+            "tools_used": tools_used
+        }
+
+    async def _run_agent_loop(self, agent_executor: Any, full_input: str) -> Dict[str, Any]:
+        """
+        Run the function-calling loop to completion without streaming.
+        
+        Returns:
+            Dictionary with 'output' and 'tools_used' (names of the tools called, in order)
+        """
+        result: Dict[str, Any] = {}
+        async for event, payload in self._iter_agent_loop(agent_executor, full_input):
+            if event == "result":
+                result = payload
+        return result
+
+    async def _run_fast_path(self, session_id: str, message: str) -> Optional[str]:
+        """Answer obvious intents directly, returning None when the full agent is needed."""
+        intent = _quick_intent(message)
+        if intent is None:
+            return None
+
+        tool_name, payload = intent
+        logger.info("AGENT FAST PATH | session_id=%s | tool=%s", session_id, tool_name or "canned_reply")
+        if tool_name is None:
+            return payload
+        return await self._call_tool({"name": tool_name, "args": payload}, TOOLS_BY_NAME)
+
+    def _check_corpus_version(self, corpus_version: int) -> None:
+        """Drop cached answers once the knowledge base is re-indexed."""
+        if self._corpus_version != corpus_version:
+            if self._corpus_version is not None:
+                self.semantic_cache.clear()
+            self._corpus_version = corpus_version
+
+    async def _lookup_semantic_cache(self, session_id: str, message: str) -> Tuple[Any, Optional[Dict[str, Any]]]:
+        """
+        Embed the message and look it up in the semantic cache.
+        
+        The cache is keyed on the bare message and shared by all sessions, so
+        callers only use it for turns without conversation history.
+        
+        Returns:
+            (query embedding or None if embedding failed, cached response or None)
+        """
+        try:
+            self._check_corpus_version(self._get_rag_chain().corpus_version)
+            query_embedding = await self._run_in_executor(self._embed_query, message)
+            cached = self.semantic_cache.lookup(query_embedding)
+        except Exception as cache_err:
+            logger.warning(
+                "SEMANTIC CACHE WARNING | session_id=%s | "
+                "error='%s' | skipping_cache",
+                session_id,
+                cache_err,
             )
+            return None, None
 
-        return Tool(
-            name="order_lookup",
-            func=lookup,
-            description=(
-                "Fetch order status and items. Input must be the order ID string, "
-                "e.g., '1234'."
-            ),
-        )
-
-    def _create_ticket_tool(self) -> Tool:
-        """Create a tool for logging customer support tickets."""
-
-        def create_ticket(payload: str) -> str:
-            try:
-                data = json.loads(payload)
-            except json.JSONDecodeError:
-                return (
-                    "Invalid input. Provide JSON like "
-                    '{"issue_type":"delivery_issue","description":"details","user_id":"u001"}.'
-                )
-
-            required = ["issue_type", "description", "user_id"]
-            missing = [field for field in required if not data.get(field)]
-            if missing:
-                return f"Missing required fields: {', '.join(missing)}"
-
-            ticket = self._ticket_tool.create_ticket(
-                issue_type=data["issue_type"],
-                description=data["description"],
-                user_id=data["user_id"],
-            )
-            return (
-                f"Ticket {ticket['ticket_id']} created for user {ticket['user_id']} "
-                f"({ticket['issue_type']}). Status: {ticket['status']}."
+        if cached is not None:
+            logger.info(
+                "SEMANTIC CACHE HIT | session_id=%s | "
+                "similarity=%.4f",
+                session_id,
+                cached['similarity'],
             )
+        return query_embedding, cached
 
-        return Tool(
-            name="ticket_creator",
-            func=create_ticket,
-            description=(
-                "Create a support ticket. Input must be JSON with "
-                "'issue_type', 'description', and 'user_id'."
-            ),
+    async def _build_agent_input(self, session_id: str, message: str) -> Tuple[str, int]:
+        """
+        Combine the user message with the session's recent conversation history.
+        
+        Returns:
+            (agent input, number of history messages it includes)
+        """
+        await self._wait_for_pending_write(session_id)
+        history_text, history_count = await self._get_history_text(session_id)
+        
+        logger.info(
+            "AGENT MEMORY | session_id=%s | "
+            "history_messages=%s",
+            session_id,
+            history_count,
         )
 
-    def _create_address_update_tool(self) -> Tool:
-        """Create a tool for updating user addresses."""
+        if not history_text:
+            return message, 0
+        return f"""Previous conversation context:
+{history_text}
 
-        def update_address(payload: str) -> str:
-            try:
-                data = json.loads(payload)
-            except json.JSONDecodeError:
-                return (
-                    "Invalid input. Provide JSON like "
-                    '{"user_id":"u001","new_address":"123 Main St"}.'
-                )
+Current question: {message}
 
-            user_id = data.get("user_id")
-            new_address = data.get("new_address")
-            if not user_id or not new_address:
-                return "Both 'user_id' and 'new_address' are required."
+Answer the current question, considering the conversation history if relevant.""", history_count
 
-            result = self._address_tool.update(user_id, new_address)
-            if "error" in result:
-                return result["error"]
+    @staticmethod
+    def _resolve_tool_used(tools_used: List[str]) -> str:
+        """Pick the tool reported to the client from the tool calls the agent made."""
+        used_set = set(tools_used)
 
-            return (
-                f"Address updated for {result.get('name', 'user')} "
-                f"({result['user_id']}). New address: {result['address']}."
-            )
+        tool_used = next((TOOL_DISPLAY[name] for name in TOOL_PRIORITY if name in used_set), None)
+        if tool_used is not None:
+            return tool_used
+        return tools_used[0] if tools_used else "direct_llm"
 
-        return Tool(
-            name="update_address",
-            func=update_address,
-            description=(
-                "Update a user's address. Input must be JSON with "
-                "'user_id' and 'new_address'."
-            ),
+    def _complete_query(
+        self,
+        session_id: str,
+        message: str,
+        answer: str,
+        tool_used: str,
+        query_embedding: Any = None
+    ) -> Dict[str, Any]:
+        """Store the turn, cache stateless answers and build the response dictionary."""
+        logger.info(
+            "AGENT EXECUTION COMPLETE | session_id=%s | "
+            "answer_length=%s | tool_used=%s",
+            session_id,
+            len(answer),
+            tool_used,
         )
 
-    def _create_agent_executor(self) -> Any:
-        """
-        Create LangChain ReAct Agent with tools.
-        
-        Returns:
-            Configured AgentExecutor
-        """
-        if self._agent_executor is None:
-            # Create tools
-            tools = [
-                self._create_rag_tool(),
-                self._create_reasoning_tool(),
-                self._create_order_lookup_tool(),
-                self._create_ticket_tool(),
-                self._create_address_update_tool(),
-            ]
-
-            # Create ReAct agent
-            llm = self._get_llm()
-            
-            # Try new LangChain API first (v0.1.0+)
-            try:
-                from langchain.agents import create_react_agent
-
-                prompt = PromptTemplate.from_template(
-                    """You are NeuraHome's AI support agent that must decide when to use tools.
-Always follow these rules:
-- Use order_lookup when the customer asks about an order number or shipment status; pass only the order ID string.
-- Use ticket_creator when the customer reports a problem that needs follow-up; pass JSON with issue_type, description, user_id.
-- Use update_address when the customer requests an address change; pass JSON with user_id and new_address.
-- Use rag_knowledge_base for policy, manual, or troubleshooting questions.
-- Use llm_reasoning for general conversation, calculations, or when no tool is appropriate.
-
-Respond in the ReAct format:
+        # Store interaction in memory (off the response path)
+        self._persist_turn(session_id, message, answer)
 
-Question: {input}
-Thought: consider whether a tool is needed
-Action: the action to take, must be one of [{tool_names}]
-Action Input: the input to the action
-Observation: the tool result
-... (repeat Thought/Action/Action Input/Observation as needed)
-Thought: I now know the final answer
-Final Answer: the response for the user, citing tool results when used
+        response = {
+            "session_id": session_id,
+            "message": message,
+            "answer": answer,
+            "sources": [],
+            "tool_used": tool_used
+        }
 
-Begin!
+        # Remember stateless answers for future paraphrased questions (query_embedding
+        # is only set for turns without history)
+        if query_embedding is not None and tool_used in CACHEABLE_TOOLS:
+            self.semantic_cache.add(query_embedding, response)
 
-Thought: {agent_scratchpad}"""
-                )
+        return response
 
-                agent = create_react_agent(llm, tools, prompt)
-                
-                # Create executor
-                AgentExecutorCls = _get_agent_executor_cls()
-                self._agent_executor = AgentExecutorCls(
-                    agent=agent,
-                    tools=tools,
-                    verbose=False,
-                    max_iterations=5,
-                    max_execution_time=30,
-                    handle_parsing_errors=True,
-                    return_intermediate_steps=True
-                )
-                logger.info("LangChain ReAct Agent initialized (new API)")
-                
-            except (ImportError, Exception) as e:
-                # Fallback to old API
-                logger.warning(f"New LangChain API not available, using fallback: {e}")
-                try:
-                    from langchain.agents import initialize_agent, AgentType
-                    
-                    try:
-                        agent_type = AgentType.ZERO_SHOT_REACT_DESCRIPTION
-                    except AttributeError:
-                        agent_type = AgentType.REACT_DOCSTORE
-                    
-                    self._agent_executor = initialize_agent(
-                        tools=tools,
-                        llm=llm,
-                        agent=agent_type,
-                        verbose=False,
-                        max_iterations=5,
-                        max_execution_time=30,
-                        handle_parsing_errors=True,
-                        return_intermediate_steps=True
-                    )
-                    logger.info("LangChain ReAct Agent initialized (legacy API)")
-                except ImportError:
-                    raise ImportError(
-                        "Could not initialize LangChain agent. "
-                        "Please ensure langchain is installed: pip install langchain"
-                    )
+    @staticmethod
+    def _deadline_error() -> TimeoutError:
+        """Describe a query that ran past the agent deadline."""
+        return TimeoutError(f"Agent did not finish within {MAX_EXECUTION_TIME:g}s")
 
-        return self._agent_executor
+    @staticmethod
+    def _error_response(session_id: str, message: str, error: Exception) -> Dict[str, Any]:
+        """Log an agent failure (called from an except block) and build the graceful error payload."""
+        # Traceback is formatted only if a handler emits the record
+        logger.exception(
+            "AGENT ERROR | session_id=%s | "
+            "error_type=%s | error='%s'",
+            session_id,
+            type(error).__name__,
+            error,
+        )
+        
+        return {
+            "session_id": session_id,
+            "message": message,
+            "answer": "I encountered an error processing your request. Please try again or contact support.",
+            "sources": [],
+            "tool_used": "error",
+            "error": str(error)
+        }
 
     async def process_query(
         self,
@@ -416,7 +950,7 @@ Thought: {agent_scratchpad}"""
         force_rag: Optional[bool] = None
     ) -> Dict[str, Any]:
         """
-        Process a user query through the LangChain ReAct Agent.
+        Process a user query through the LangChain Tool-Calling Agent.
         
         Args:
             session_id: Session identifier for conversation memory
@@ -428,115 +962,132 @@ Thought: {agent_scratchpad}"""
             Dictionary with answer, sources, and metadata
         """
         logger.info(
-            f"AGENT QUERY START | session_id={session_id} | "
-            f"message='{message[:100]}...'"
+            "AGENT QUERY START | session_id=%s | "
+            "message='%s...'",
+            session_id,
+            message[:100],
         )
 
         try:
-            # 1. Retrieve conversation history
-            history = await self.memory.get_recent(session_id, n=self.history_window)
-            history_text = self._format_history(history)
-            
-            logger.info(
-                f"AGENT MEMORY | session_id={session_id} | "
-                f"history_messages={len(history)}"
-            )
-
-            # 2. Build input with conversation context
-            if history_text and history_text != "No previous conversation.":
-                full_input = f"""Previous conversation context:
-{history_text}
-
-Current question: {message}
-
-Answer the current question, considering the conversation history if relevant."""
-            else:
-                full_input = message
+            # 0. Answer obvious intents without calling the LLM
+            fast_answer = await self._run_fast_path(session_id, message)
+            if fast_answer is not None:
+                return self._complete_query(session_id, message, fast_answer, "fast_path")
+
+            # 1-2. Build input with conversation context
+            full_input, history_count = await self._build_agent_input(session_id, message)
+
+            # Serve paraphrased repeats straight from the semantic cache; follow-ups
+            # ("yes, do that") depend on the history, so only context-free turns use it
+            query_embedding = None
+            if force_rag is None and history_count == 0:
+                query_embedding, cached = await self._lookup_semantic_cache(session_id, message)
+                if cached is not None:
+                    self._persist_turn(session_id, message, cached["answer"])
+                    return {
+                        "session_id": session_id,
+                        "message": message,
+                        "answer": cached["answer"],
+                        "sources": cached["sources"],
+                        "tool_used": "semantic_cache"
+                    }
 
             # 3. Execute agent
             agent_executor = self._create_agent_executor()
             
-            logger.info(f"AGENT EXECUTION START | session_id={session_id}")
+            logger.info("AGENT EXECUTION START | session_id=%s", session_id)
             
-            result = await self._run_in_executor(
-                agent_executor.invoke,
-                {"input": full_input}
-            )
+            result = await self._run_agent_loop(agent_executor, full_input)
             
             answer = result.get("output", "I couldn't process your question.")
-            tools_used = []
-            sources = []
-            
-            # Extract which tools were used (if available in result)
-            if "intermediate_steps" in result:
-                for step in result["intermediate_steps"]:
-                    if len(step) > 0:
-                        action = step[0]
-                        if hasattr(action, "tool"):
-                            tool_name = action.tool
-                            tools_used.append(tool_name)
-                            # If RAG tool was used, try to extract sources from the observation
-                            if tool_name == "rag_knowledge_base" and len(step) > 1:
-                                observation = step[1]
-                                # Sources are embedded in the RAG tool's response
-                                # The RAG tool already includes source info in its answer
+            tool_used = self._resolve_tool_used(result.get("tools_used", []))
+
+            # 4-5. Store interaction and cache the answer
+            return self._complete_query(session_id, message, answer, tool_used, query_embedding)
+
+        except asyncio.TimeoutError:
+            return self._error_response(session_id, message, self._deadline_error())
+        except Exception as e:
+            return self._error_response(session_id, message, e)
+
+    async def process_query_stream(
+        self,
+        session_id: str,
+        message: str,
+        k: int = 5,
+        force_rag: Optional[bool] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process a user query and stream the answer as it is generated.
+        
+        Args:
+            session_id: Session identifier for conversation memory
+            message: User's question
+            k: Number of RAG chunks (ignored if agent chooses tool)
+            force_rag: Ignored (agent decides automatically)
             
-            # Determine tool_used for response
-            if "order_lookup" in tools_used:
-                tool_used = "order_lookup"
-            elif "ticket_creator" in tools_used:
-                tool_used = "ticket_creator"
-            elif "update_address" in tools_used:
-                tool_used = "update_address"
-            elif "rag_knowledge_base" in tools_used:
-                tool_used = "rag"
-            elif "llm_reasoning" in tools_used:
-                tool_used = "direct_llm"
-            elif tools_used:
-                tool_used = tools_used[0]
-            else:
-                tool_used = "direct_llm"
+        Yields:
+            {"type": "token", "content": ...} events while the LLM generates, then
+            a final {"type": "done", ...} event carrying the full response dictionary
+            (or {"type": "error", ...} on failure)
+        """
+        logger.info(
+            "AGENT STREAM START | session_id=%s | "
+            "message='%s...'",
+            session_id,
+            message[:100],
+        )
 
-            logger.info(
-                f"AGENT EXECUTION COMPLETE | session_id={session_id} | "
-                f"answer_length={len(answer)} | tool_used={tool_used}"
-            )
+        try:
+            fast_answer = await self._run_fast_path(session_id, message)
+            if fast_answer is not None:
+                response = self._complete_query(session_id, message, fast_answer, "fast_path")
+                yield {"type": "token", "content": fast_answer}
+                yield {"type": "done", **response}
+                return
+
+            full_input, history_count = await self._build_agent_input(session_id, message)
+
+            # Only context-free turns use the semantic cache (see process_query)
+            query_embedding = None
+            if force_rag is None and history_count == 0:
+                query_embedding, cached = await self._lookup_semantic_cache(session_id, message)
+                if cached is not None:
+                    self._persist_turn(session_id, message, cached["answer"])
+                    yield {"type": "token", "content": cached["answer"]}
+                    yield {
+                        "type": "done",
+                        "session_id": session_id,
+                        "message": message,
+                        "answer": cached["answer"],
+                        "sources": cached["sources"],
+                        "tool_used": "semantic_cache"
+                    }
+                    return
 
-            # 4. Store interaction in memory
-            await self.memory.add_message(session_id, Message(role="user", content=message))
-            await self.memory.add_message(session_id, Message(role="assistant", content=answer))
+            agent_executor = self._create_agent_executor()
 
-            return {
-                "session_id": session_id,
-                "message": message,
-                "answer": answer,
-                "sources": sources,
-                "tool_used": tool_used
-            }
+            result: Dict[str, Any] = {}
+            async for event, payload in self._iter_agent_loop(agent_executor, full_input, stream=True):
+                if event == "token":
+                    yield {"type": "token", "content": payload}
+                else:
+                    result = payload
 
+            answer = result.get("output", "I couldn't process your question.")
+            tool_used = self._resolve_tool_used(result.get("tools_used", []))
+            response = self._complete_query(session_id, message, answer, tool_used, query_embedding)
+            yield {"type": "done", **response}
+
+        except asyncio.TimeoutError:
+            yield {"type": "error", **self._error_response(session_id, message, self._deadline_error())}
         except Exception as e:
-            logger.error(
-                f"AGENT ERROR | session_id={session_id} | "
-                f"error_type={type(e).__name__} | error='{str(e)}'"
-            )
-            import traceback
-            logger.error(f"AGENT TRACEBACK | session_id={session_id}\n{traceback.format_exc()}")
-            
-            return {
-                "session_id": session_id,
-                "message": message,
-                "answer": "I encountered an error processing your request. Please try again or contact support.",
-                "sources": [],
-                "tool_used": "error",
-                "error": str(e)
-            }
+            yield {"type": "error", **self._error_response(session_id, message, e)}
 
     @staticmethod
-    def _format_history(history: List[Message]) -> str:
-        """Format conversation history as text."""
-        if not history:
-            return "No previous conversation."
-        return "\n".join(f"{msg.role.title()}: {msg.content}" for msg in history)
+    def _format_message(msg: Message) -> str:
+        """Format a single history message as text."""
+        return format_message(msg.role, msg.content)
 
 
 # Global agent instance
@@ -551,6 +1102,14 @@ def get_support_agent() -> SupportAgent:
     return _agent_instance
 
 
+def shutdown_support_agent() -> None:
+    """Shut down the global support agent instance, if one was created."""
+    global _agent_instance
+    if _agent_instance is not None:
+        _agent_instance.shutdown()
+        _agent_instance = None
+
+
 # Convenience function for backward compatibility
 async def ask_agent(session_id: str, message: str, k: int = 5) -> Dict[str, Any]:
     """
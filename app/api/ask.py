@@ -5,12 +5,17 @@ Provides /ask endpoint that uses the intelligent support agent
 to route queries to appropriate tools (RAG or direct LLM).
 """
 
-from typing import List, Optional
+import asyncio
+import json
+import os
+from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from app.agent.support_agent import ask_agent, get_support_agent
+from app.api.schemas import AskRequest, AskResponse
 from app.utils.logger import get_logger
 
 logger = get_logger()
@@ -18,33 +23,18 @@ logger = get_logger()
 # Create router (not a new FastAPI app)
 router = APIRouter()
 
+# Maximum number of batch items processed concurrently (bounded by upstream Gemini quota)
+BATCH_CONCURRENCY = int(os.getenv("AGENT_BATCH_CONCURRENCY", "8"))
 
-class SourceInfo(BaseModel):
-    """Source information model."""
-    title: Optional[str] = None
-    score: Optional[float] = None
-    source_file: Optional[str] = None
-    section: Optional[str] = None
 
-
-class AskRequest(BaseModel):
-    """Request model for asking the agent."""
-    session_id: str = Field(..., description="Unique session ID for conversation context")
-    question: str = Field(..., min_length=1, max_length=1500, description="User's question")
-    k: int = Field(5, ge=1, le=20, description="Number of RAG chunks to retrieve (if RAG is used)")
-    force_rag: Optional[bool] = Field(
-        None,
-        description="Force RAG usage (True) or direct LLM (False). None for auto-detection."
-    )
+class BatchAskRequest(BaseModel):
+    """Request model for asking the agent several questions at once."""
+    items: List[AskRequest] = Field(..., min_length=1, max_length=50, description="Questions to process")
 
 
-class AskResponse(BaseModel):
-    """Response model from the agent."""
-    session_id: str
-    message: str
-    answer: str
-    sources: List[SourceInfo] = []
-    tool_used: str = Field(..., description="Tool used: 'rag' or 'direct_llm'")
+class BatchAskResponse(BaseModel):
+    """Response model for a batch of agent answers (same order as the request items)."""
+    results: List[AskResponse]
 
 
 @router.post("/ask", response_model=AskResponse, tags=["agent"])
@@ -68,8 +58,11 @@ async def ask_agent_endpoint(request: AskRequest) -> AskResponse:
         HTTPException: If processing fails
     """
     logger.info(
-        f"AGENT API REQUEST | session_id={request.session_id} | "
-        f"question='{request.question[:100]}...' | k={request.k}"
+        "AGENT API REQUEST | session_id=%s | "
+        "question='%s...' | k=%s",
+        request.session_id,
+        request.question[:100],
+        request.k,
     )
     
     try:
@@ -81,36 +74,25 @@ async def ask_agent_endpoint(request: AskRequest) -> AskResponse:
             force_rag=request.force_rag
         )
         
-        # Convert sources to SourceInfo models
-        sources = []
-        for src in result.get("sources", []):
-            sources.append(SourceInfo(
-                title=src.get("title"),
-                score=src.get("score"),
-                source_file=src.get("source_file"),
-                section=src.get("section")
-            ))
-        
         logger.info(
-            f"AGENT API RESPONSE | session_id={request.session_id} | "
-            f"answer_length={len(result['answer'])} | tool_used={result.get('tool_used')}"
+            "AGENT API RESPONSE | session_id=%s | "
+            "answer_length=%s | tool_used=%s",
+            request.session_id,
+            len(result['answer']),
+            result.get('tool_used'),
         )
         
-        return AskResponse(
-            session_id=result["session_id"],
-            message=result["message"],
-            answer=result["answer"],
-            sources=sources,
-            tool_used=result.get("tool_used", "unknown")
-        )
+        return AskResponse.from_result(result)
         
     except Exception as e:
-        logger.error(
-            f"AGENT API ERROR | session_id={request.session_id} | "
-            f"error_type={type(e).__name__} | error='{str(e)}'"
+        # Traceback is formatted only if a handler emits the record
+        logger.exception(
+            "AGENT API ERROR | session_id=%s | "
+            "error_type=%s | error='%s'",
+            request.session_id,
+            type(e).__name__,
+            e,
         )
-        import traceback
-        logger.error(f"AGENT API TRACEBACK | session_id={request.session_id}\n{traceback.format_exc()}")
         
         raise HTTPException(
             status_code=500,
@@ -118,6 +100,43 @@ async def ask_agent_endpoint(request: AskRequest) -> AskResponse:
         ) from e
 
 
+@router.post("/ask/stream", tags=["agent"])
+async def ask_agent_stream(request: AskRequest) -> StreamingResponse:
+    """
+    Ask the support agent a question and stream the answer via Server-Sent Events.
+    
+    Emits `data: {"type": "token", "content": ...}` events as Gemini generates
+    text, followed by a final `data: {"type": "done", ...}` event with the same
+    fields as AskResponse (or `{"type": "error", ...}` on failure).
+    
+    Args:
+        request: AskRequest with session_id, question, and optional parameters
+        
+    Returns:
+        StreamingResponse with media type text/event-stream
+    """
+    logger.info(
+        "AGENT API STREAM REQUEST | session_id=%s | "
+        "question='%s...' | k=%s",
+        request.session_id,
+        request.question[:100],
+        request.k,
+    )
+    
+    agent = get_support_agent()
+    
+    async def event_stream():
+        async for event in agent.process_query_stream(
+            session_id=request.session_id,
+            message=request.question,
+            k=request.k,
+            force_rag=request.force_rag
+        ):
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @router.get("/ask", response_model=AskResponse, tags=["agent"])
 async def ask_agent_get(
     session_id: str = Query(..., description="Unique session ID"),
@@ -137,3 +156,64 @@ async def ask_agent_get(
         force_rag=force_rag
     )
     return await ask_agent_endpoint(request)
+
+
+@router.post("/ask/batch", response_model=BatchAskResponse, tags=["agent"])
+async def ask_agent_batch(request: BatchAskRequest) -> BatchAskResponse:
+    """
+    Ask the support agent several questions in one call.
+    
+    Items are grouped by session_id: questions from the same session run in
+    order (so conversation memory stays consistent), while different sessions
+    run concurrently, bounded by BATCH_CONCURRENCY.
+    
+    Args:
+        request: BatchAskRequest with the list of questions
+        
+    Returns:
+        BatchAskResponse with one answer per item, in request order
+        
+    Raises:
+        HTTPException: If processing fails
+    """
+    logger.info("AGENT API BATCH REQUEST | items=%s", len(request.items))
+    
+    agent = get_support_agent()
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    
+    # Bucket items by session so shared conversation context stays ordered
+    sessions: Dict[str, List[int]] = {}
+    for idx, item in enumerate(request.items):
+        sessions.setdefault(item.session_id, []).append(idx)
+    
+    results: List[Optional[Dict[str, Any]]] = [None] * len(request.items)
+    
+    async def run_session(indices: List[int]) -> None:
+        for idx in indices:
+            item = request.items[idx]
+            async with semaphore:
+                results[idx] = await agent.process_query(
+                    session_id=item.session_id,
+                    message=item.question,
+                    k=item.k,
+                    force_rag=item.force_rag
+                )
+    
+    try:
+        await asyncio.gather(*[run_session(indices) for indices in sessions.values()])
+    except Exception as e:
+        logger.error(
+            "AGENT API BATCH ERROR | items=%s | "
+            "error_type=%s | error='%s'",
+            len(request.items),
+            type(e).__name__,
+            e,
+        )
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing agent batch: {str(e)}"
+        ) from e
+    
+    logger.info("AGENT API BATCH RESPONSE | items=%s | sessions=%s", len(results), len(sessions))
+    
+    return BatchAskResponse(results=[AskResponse.from_result(result) for result in results])
@@ -0,0 +1,63 @@
+"""
+Shared request/response models for the support agent endpoints.
+
+Both /agent/ask (app/api/ask.py) and /api/agent/ask (app/api/routes.py)
+expose the same contract, so the schemas are declared once here.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class SourceInfo(BaseModel):
+    """Source metadata returned by the agent (if the RAG tool fires)."""
+
+    model_config = ConfigDict(frozen=True)
+
+    title: Optional[str] = None
+    score: Optional[float] = None
+    source_file: Optional[str] = None
+    section: Optional[str] = None
+
+
+class AskRequest(BaseModel):
+    """Request model for asking the agent."""
+
+    session_id: str = Field(..., description="Unique session ID for conversation context")
+    question: str = Field(..., min_length=1, max_length=1500, description="User's question")
+    k: int = Field(5, ge=1, le=20, description="Number of RAG chunks to retrieve (if RAG is used)")
+    force_rag: Optional[bool] = Field(
+        None,
+        description="Force RAG usage (True) or direct LLM (False). None for auto-detection."
+    )
+
+
+class AskResponse(BaseModel):
+    """Response model from the agent."""
+
+    session_id: str
+    message: str
+    answer: str
+    sources: List[SourceInfo] = []
+    tool_used: str = Field(..., description="Tool used: 'rag' or 'direct_llm'")
+
+    @classmethod
+    def from_result(cls, result: Dict[str, Any]) -> "AskResponse":
+        """Build a response from a SupportAgent result dictionary."""
+        sources = [
+            SourceInfo(
+                title=src.get("title"),
+                score=src.get("score"),
+                source_file=src.get("source_file"),
+                section=src.get("section")
+            )
+            for src in result.get("sources", [])
+        ]
+        return cls(
+            session_id=result["session_id"],
+            message=result["message"],
+            answer=result["answer"],
+            sources=sources,
+            tool_used=result.get("tool_used", "unknown")
+        )
@@ -3,14 +3,78 @@
 from __future__ import annotations
 
 import asyncio
-from typing import Any, Dict, List
+import functools
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Generic, Hashable, List, Optional, Set, Tuple, TypeVar
 
-from app.memory.memory import Message, get_memory_store
-from app.rag.query_engine import get_rag_instance
+from app.agent.semantic_cache import get_semantic_cache
+from app.memory.memory import encode_message, format_message, get_memory_store
+from app.rag.query_engine import get_rag_instance, warmup as warm_up_rag
 from app.utils.logger import get_logger
 
 logger = get_logger()
 
+# Worker threads for blocking vector search / Gemini calls (size to the Gemini concurrency limit)
+RAG_EXEC_WORKERS = int(os.getenv("RAG_EXEC_WORKERS", "8"))
+
+# Retrieval/answer caches for repeated chat questions
+CHAT_CACHE_DISABLE = os.getenv("CHAT_CACHE_DISABLE", "").lower() in ("1", "true", "yes")
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "2048"))
+CHAT_CACHE_TTL = int(os.getenv("CHAT_CACHE_TTL", "300"))  # seconds
+
+# Retrieval micro-batching: concurrent requests arriving within the window share
+# one encoder pass and one FAISS search (a batch is flushed early once full)
+RETRIEVAL_BATCH_MAX = int(os.getenv("CHAT_RETRIEVAL_BATCH_MAX", "32"))
+RETRIEVAL_BATCH_WINDOW_MS = float(os.getenv("CHAT_RETRIEVAL_BATCH_WINDOW_MS", "5"))
+
+V = TypeVar("V")
+
+# Shared read-only stand-in for missing chunk metadata
+_EMPTY: Dict[str, Any] = {}
+
+
+def _digest(text: str) -> bytes:
+    """Compact, collision-resistant cache key for arbitrary text."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class _TTLCache(Generic[V]):
+    """
+    Small LRU cache whose entries expire after `ttl` seconds.
+
+    Only touched from the event loop thread, so it needs no lock.
+    """
+
+    def __init__(self, max_entries: int = CHAT_CACHE_MAX_ENTRIES, ttl: int = CHAT_CACHE_TTL):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries: "OrderedDict[Hashable, tuple[float, V]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[V]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        created_at, value = item
+        if time.monotonic() - created_at > self._ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: V) -> None:
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
 
 class ChatChain:
     """
@@ -18,51 +82,183 @@ class ChatChain:
     - Redis-backed chat memory
     - Existing RAG pipeline (vector store + Gemini LLM)
     The class keeps the synchronous RAG stack off the event loop by delegating
-    blocking work to a thread executor.
+    blocking work to its own bounded thread executor.
     """
 
     def __init__(self, history_window: int = 10):
         self.memory = get_memory_store()
         self.history_window = history_window
-        self._rag_chain = None
+        # Dedicated pool so RAG work doesn't compete with asyncio's default executor
+        self._executor = ThreadPoolExecutor(max_workers=RAG_EXEC_WORKERS, thread_name_prefix="rag")
+        # Exact-match caches: (query digest, k) -> chunks, prompt digest -> answer
+        self._retrieval_cache: _TTLCache[List[Dict[str, Any]]] = _TTLCache()
+        self._answer_cache: _TTLCache[str] = _TTLCache()
+        self._semantic_namespaces: Set[str] = set()
+        self._corpus_version: Optional[int] = None
+        # Retrievals waiting for the next batch: (vector store, query, k, namespace, future)
+        self._pending_retrievals: List[Tuple[Any, str, int, Optional[str], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # In-flight batch tasks; the event loop only keeps weak references to tasks
+        self._retrieval_tasks: Set[asyncio.Task] = set()
 
     def _get_rag_chain(self):
-        if self._rag_chain is None:
-            # Lazily initialize so the API can start even if RAG warm-up is heavy
-            self._rag_chain = get_rag_instance(verbose=False)
-        return self._rag_chain
+        # Resolved per request (a lock-free read once initialized) so a
+        # reset_rag_instance() after re-indexing takes effect here too
+        return get_rag_instance(verbose=False)
+
+    def warm_up(self) -> None:
+        """
+        Eagerly load the shared RAG chain (FAISS index, metadata, embedding model).
+
+        Called from the FastAPI lifespan hook so the first chat request doesn't
+        pay the initialization cost.
+        """
+        warm_up_rag(verbose=False)
+        logger.info("CHAT CHAIN WARM-UP COMPLETE")
 
     async def _run_in_executor(self, func, *args, **kwargs):
         loop = asyncio.get_running_loop()
-        return await loop.run_in_executor(None, lambda: func(*args, **kwargs))
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
 
-    async def _search_docs(self, query: str, k: int):
-        rag_chain = self._get_rag_chain()
-        return await self._run_in_executor(rag_chain.vector_store.search, query, k, True)
+    def shutdown(self) -> None:
+        """Stop the RAG worker threads, cancelling queued work."""
+        self._executor.shutdown(wait=True, cancel_futures=True)
 
-    async def _invoke_chain(self, context: str, question: str) -> str:
-        rag_chain = self._get_rag_chain()
+    def _check_corpus_version(self, corpus_version: int) -> None:
+        """Drop cached retrievals and answers once the knowledge base is re-indexed."""
+        if self._corpus_version != corpus_version:
+            if self._corpus_version is not None:
+                self._retrieval_cache.clear()
+                self._answer_cache.clear()
+                for namespace in self._semantic_namespaces:
+                    get_semantic_cache(namespace).clear()
+            self._corpus_version = corpus_version
 
-        def _call_chain() -> str:
-            response = rag_chain.chain.invoke({"context": context, "question": question})
-            if hasattr(response, "content"):
-                return response.content  # type: ignore[attr-defined]
-            return str(response)
+    @staticmethod
+    def _retrieve_batch(vector_store, requests: List[Tuple[str, int, Optional[str]]]) -> List[List[Dict[str, Any]]]:
+        """
+        Encode all (query, k, namespace) requests at once, then serve near-duplicate
+        queries from their semantic cache and search FAISS once for the rest.
+        A namespace of None bypasses the semantic cache for that request.
+        """
+        query_vectors = vector_store.encode_queries([query for query, _, _ in requests])
 
-        result = await self._run_in_executor(_call_chain)
-        return result.strip()
+        results: List[Optional[List[Dict[str, Any]]]] = [None] * len(requests)
+        misses = []
+        for i, (_, _, namespace) in enumerate(requests):
+            if namespace is None:
+                misses.append(i)
+                continue
+            cached = get_semantic_cache(namespace).lookup(query_vectors[i:i + 1])
+            if cached is not None:
+                logger.debug("RAG RETRIEVAL SEMANTIC CACHE HIT | similarity=%.4f", cached["similarity"])
+                results[i] = cached["sources"]
+            else:
+                misses.append(i)
+
+        if misses:
+            # One search at the largest k; each request keeps its own top k
+            max_k = max(requests[i][1] for i in misses)
+            found = vector_store.search_by_vectors(query_vectors[misses], max_k, True)
+            for i, rows in zip(misses, found):
+                query, k, namespace = requests[i]
+                results[i] = rows[:k]
+                if namespace is None:
+                    continue
+                get_semantic_cache(namespace).add(
+                    query_vectors[i:i + 1],
+                    {"message": query, "answer": "", "tool_used": "retrieval", "sources": results[i]},
+                )
+        return results
+
+    async def _retrieve(self, vector_store, query: str, k: int, namespace: Optional[str]) -> List[Dict[str, Any]]:
+        """Queue a retrieval for the next micro-batch and wait for its results."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending_retrievals.append((vector_store, query, k, namespace, future))
+        if len(self._pending_retrievals) >= RETRIEVAL_BATCH_MAX:
+            self._flush_retrievals()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(RETRIEVAL_BATCH_WINDOW_MS / 1000, self._flush_retrievals)
+        return await future
+
+    def _flush_retrievals(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        pending, self._pending_retrievals = self._pending_retrievals, []
+
+        # Requests normally share one store; a RAG reset mid-window can split them
+        batches: Dict[int, List[Tuple[Any, str, int, Optional[str], asyncio.Future]]] = {}
+        for item in pending:
+            batches.setdefault(id(item[0]), []).append(item)
+        for batch in batches.values():
+            task = asyncio.ensure_future(self._run_retrieval_batch(batch))
+            self._retrieval_tasks.add(task)
+            task.add_done_callback(self._retrieval_tasks.discard)
+
+    async def _run_retrieval_batch(self, batch: List[Tuple[Any, str, int, Optional[str], asyncio.Future]]) -> None:
+        logger.debug("RAG RETRIEVAL BATCH | size=%d", len(batch))
+        try:
+            results = await self._run_in_executor(
+                self._retrieve_batch, batch[0][0], [(query, k, namespace) for _, query, k, namespace, _ in batch]
+            )
+        except Exception as exc:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (*_, future), result in zip(batch, results):
+            # A waiting request may have been cancelled meanwhile
+            if not future.done():
+                future.set_result(result)
+
+    async def _search_docs(self, rag_chain, query: str, k: int):
+        if CHAT_CACHE_DISABLE:
+            # Still micro-batched, just without the retrieval and semantic caches
+            return await self._retrieve(rag_chain.vector_store, query, k, None)
+
+        self._check_corpus_version(rag_chain.corpus_version)
+        key = (_digest(" ".join(query.lower().split())), k)
+        results = self._retrieval_cache.get(key)
+        if results is None:
+            namespace = f"chat_retrieval:k={k}"
+            self._semantic_namespaces.add(namespace)
+            results = await self._retrieve(rag_chain.vector_store, query, k, namespace)
+            self._retrieval_cache.put(key, results)
+        return results
 
     @staticmethod
-    def _format_history(history: List[Message]) -> str:
-        if not history:
-            return "No previous conversation."
-        return "\n".join(f"{msg.role.title()}: {msg.content}" for msg in history)
+    def _answer_key(inputs: Dict[str, Any]) -> bytes:
+        """Digest of everything the prompt is rendered from."""
+        turns = "\x00".join(f"{role}\x01{content}" for role, content in inputs["history"])
+        return _digest(f"{inputs['knowledge']}\x00{turns}\x00{inputs['question']}")
+
+    async def _invoke_chain(self, rag_chain, inputs: Dict[str, Any]) -> str:
+        answer_key = self._answer_key(inputs)
+        if not CHAT_CACHE_DISABLE:
+            cached = self._answer_cache.get(answer_key)
+            if cached is not None:
+                logger.debug("AI GENERATION CACHE HIT | answer_length=%s", len(cached))
+                return cached
+
+        # Gemini is network-bound and has a native async client, so no thread hop is needed
+        response = await rag_chain.chat_chain.ainvoke(inputs)
+        if hasattr(response, "content"):
+            result = response.content  # type: ignore[attr-defined]
+        else:
+            result = str(response)
+        answer = result.strip()
+
+        if not CHAT_CACHE_DISABLE:
+            self._answer_cache.put(answer_key, answer)
+        return answer
 
     @staticmethod
     def _format_sources(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         formatted = []
         for item in results:
-            metadata = item.get("metadata", {}) or {}
+            metadata = item.get("metadata") or _EMPTY
             formatted.append(
                 {
                     "title": item.get("title") or metadata.get("title"),
@@ -73,13 +269,135 @@ class ChatChain:
             )
         return formatted
 
+    _CHUNK_SEPARATOR = "\n\n---\n\n"
+    _NO_KNOWLEDGE = "No product context retrieved."
+
+    async def _prepare_context(
+        self, rag_chain, session_id: str, user_message: str, k: int
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Persist the user message, load history and retrieve knowledge chunks.
+
+        Returns:
+            (chat prompt inputs: history, knowledge and question, raw RAG results)
+        """
+        # Hot path: bind frequently used attributes to locals
+        log_info = logger.info
+        history_window = self.history_window
+
+        # 1-3. Persist the user input and fetch recent turns (one Redis round trip)
+        # while the knowledge base is searched (RAG executor thread)
+        log_info(
+            "RAG RETRIEVAL START | session_id=%s | query='%s...' | k=%s",
+            session_id,
+            user_message[:100],
+            k,
+        )
+
+        recent, rag_results = await asyncio.gather(
+            self.memory.add_and_get_recent(
+                session_id, encode_message("user", user_message), n=history_window
+            ),
+            self._search_docs(rag_chain, user_message, k),
+        )
+        logger.debug(
+            "MEMORY | session_id=%s | action=add_user_message | message_length=%s",
+            session_id,
+            len(user_message),
+        )
+        
+        log_info(
+            "MEMORY RETRIEVAL | session_id=%s | "
+            "messages_retrieved=%s | history_window=%s",
+            session_id,
+            len(recent),
+            history_window,
+        )
+        # The newest entry is the message just stored; it is sent as the question
+        history = [(msg.role, msg.content) for msg in recent[:-1]]
+        
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        if not recent:
+            logger.debug("MEMORY RETRIEVAL | session_id=%s | status=no_history_found", session_id)
+        elif debug_enabled:
+            # Log what messages were retrieved (summary is only built when it will be emitted)
+            history_summary = "; ".join(
+                f"{line[:50]}..." if len(line) > 50 else line
+                for line in (format_message(msg.role, msg.content) for msg in recent[-3:])  # Last 3 as summary
+            )
+            logger.debug("MEMORY RETRIEVAL CONTENT | session_id=%s | recent_messages=%s", session_id, history_summary)
+
+        # Log RAG retrieval results
+        log_info(
+            "RAG RETRIEVAL COMPLETE | session_id=%s | chunks_retrieved=%s",
+            session_id,
+            len(rag_results),
+        )
+        
+        if debug_enabled:
+            for idx, result in enumerate(rag_results, 1):
+                title = result.get("title") or (result.get("metadata") or _EMPTY).get("title", "N/A")
+                content = result.get("content", "")
+                content_snippet = content[:150] + "..." if len(content) > 150 else content
+                logger.debug(
+                    "RAG CHUNK %d | session_id=%s | title='%s' | score=%.4f | content_snippet='%s'",
+                    idx,
+                    session_id,
+                    title,
+                    result.get("score", 0.0),
+                    content_snippet,
+                )
+        
+        context_chunks = [content for res in rag_results if (content := res.get("content"))]
+        knowledge = self._CHUNK_SEPARATOR.join(context_chunks) if context_chunks else self._NO_KNOWLEDGE
+        
+        logger.debug(
+            "CONTEXT BUILT | session_id=%s | history_messages=%s | knowledge_length=%s",
+            session_id,
+            len(history),
+            len(knowledge),
+        )
+        return {"history": history, "knowledge": knowledge, "question": user_message}, rag_results
+
+    async def _finish_reply(self, session_id: str, answer: str, rag_results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Store the assistant answer and build the reply dictionary."""
+        logger.info(
+            "AI GENERATION COMPLETE | session_id=%s | "
+            "answer_length=%s | answer_preview='%s...'",
+            session_id,
+            len(answer),
+            answer[:150],
+        )
+
+        # Store assistant response for continuity
+        await self.memory.add_message(session_id, encode_message("assistant", answer))
+        logger.debug(
+            "MEMORY | session_id=%s | action=add_assistant_message | answer_length=%s",
+            session_id,
+            len(answer),
+        )
+
+        formatted_sources = self._format_sources(rag_results)
+        
+        logger.info(
+            "CHAT CHAIN COMPLETE | session_id=%s | "
+            "answer_length=%s | sources_count=%s",
+            session_id,
+            len(answer),
+            len(formatted_sources),
+        )
+
+        return {"answer": answer, "sources": formatted_sources}
+
     @staticmethod
-    def _build_context(history_text: str, chunks: List[str]) -> str:
-        knowledge = "\n\n---\n\n".join(chunks) if chunks else "No product context retrieved."
-        return (
-            f"Chat history:\n{history_text}\n\n"
-            "Relevant product documentation:\n"
-            f"{knowledge}"
+    def _log_error(session_id: str, error: Exception) -> None:
+        # Log any errors during the chat chain execution
+        logger.error(
+            "CHAT CHAIN ERROR | session_id=%s | "
+            "error_type=%s | error='%s'",
+            session_id,
+            type(error).__name__,
+            error,
         )
 
     async def generate_reply(self, session_id: str, user_message: str, k: int = 5) -> Dict[str, Any]:
@@ -87,80 +405,58 @@ class ChatChain:
         Generate a conversational reply with full logging of each step.
         """
         try:
-            # Persist the latest user input
-            await self.memory.add_message(session_id, Message(role="user", content=user_message))
-            logger.debug(f"MEMORY | session_id={session_id} | action=add_user_message | message_length={len(user_message)}")
+            # Resolve the shared chain once per request and hand it to the helpers
+            rag_chain = self._get_rag_chain()
+            prompt_inputs, rag_results = await self._prepare_context(rag_chain, session_id, user_message, k)
 
-            # 2. Fetch recent turns for conversational grounding
-            history = await self.memory.get_recent(session_id, n=self.history_window)
-            num_messages = len(history)
-            
-            logger.info(
-                f"MEMORY RETRIEVAL | session_id={session_id} | "
-                f"messages_retrieved={num_messages} | history_window={self.history_window}"
-            )
+            # 4. Let the configured prompt template + Gemini LLM craft the answer
+            logger.info("AI GENERATION START | session_id=%s | calling_gemini_api", session_id)
             
-            if history:
-                # Log what messages were retrieved
-                history_summary = "; ".join([
-                    f"{msg.role}:{msg.content[:50]}..." if len(msg.content) > 50 else f"{msg.role}:{msg.content}"
-                    for msg in history[-3:]  # Log last 3 messages as summary
-                ])
-                logger.debug(f"MEMORY RETRIEVAL CONTENT | session_id={session_id} | recent_messages={history_summary}")
-            else:
-                logger.debug(f"MEMORY RETRIEVAL | session_id={session_id} | status=no_history_found")
+            answer = await self._invoke_chain(rag_chain, prompt_inputs)
 
-            # 3. Retrieve knowledge base chunks via the existing vector store
-            logger.info(f"RAG RETRIEVAL START | session_id={session_id} | query='{user_message[:100]}...' | k={k}")
-            
-            rag_results = await self._search_docs(user_message, k)
-            
-            # Log RAG retrieval results
-            logger.info(f"RAG RETRIEVAL COMPLETE | session_id={session_id} | chunks_retrieved={len(rag_results)}")
+            return await self._finish_reply(session_id, answer, rag_results)
             
-            for idx, result in enumerate(rag_results, 1):
-                title = result.get("title") or result.get("metadata", {}).get("title", "N/A")
-                score = result.get("score", 0.0)
-                content_snippet = result.get("content", "")[:150] + "..." if len(result.get("content", "")) > 150 else result.get("content", "")
-                
-                logger.info(
-                    f"RAG CHUNK {idx} | session_id={session_id} | "
-                    f"title='{title}' | score={score:.4f} | content_snippet='{content_snippet}'"
-                )
-            
-            context_chunks = [res.get("content", "") for res in rag_results if res.get("content")]
-            history_text = self._format_history(history)
-            full_context = self._build_context(history_text, context_chunks)
-            
-            logger.debug(f"CONTEXT BUILT | session_id={session_id} | context_length={len(full_context)}")
+        except Exception as e:
+            self._log_error(session_id, e)
+            raise
 
-            # 4. Let the configured prompt template + Gemini LLM craft the answer
-            logger.info(f"AI GENERATION START | session_id={session_id} | calling_gemini_api")
-            
-            answer = await self._invoke_chain(full_context, user_message)
-            
-            logger.info(
-                f"AI GENERATION COMPLETE | session_id={session_id} | "
-                f"answer_length={len(answer)} | answer_preview='{answer[:150]}...'"
-            )
+    async def generate_reply_stream(self, session_id: str, user_message: str, k: int = 5) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Generate a conversational reply, yielding answer text as Gemini produces it.
 
-            # Store assistant response for continuity
-            await self.memory.add_message(session_id, Message(role="assistant", content=answer))
-            logger.debug(f"MEMORY | session_id={session_id} | action=add_assistant_message | answer_length={len(answer)}")
+        Yields:
+            {"type": "token", "content": ...} events, then a final
+            {"type": "done", "answer": ..., "sources": [...]} event
+            (or {"type": "error", "error": ...} on failure)
+        """
+        try:
+            rag_chain = self._get_rag_chain()
+            prompt_inputs, rag_results = await self._prepare_context(rag_chain, session_id, user_message, k)
 
-            formatted_sources = self._format_sources(rag_results)
-            
-            logger.info(
-                f"CHAT CHAIN COMPLETE | session_id={session_id} | "
-                f"answer_length={len(answer)} | sources_count={len(formatted_sources)}"
-            )
+            logger.info("AI GENERATION START | session_id=%s | calling_gemini_api | stream=true", session_id)
+
+            answer_key = self._answer_key(prompt_inputs)
+            cached = None if CHAT_CACHE_DISABLE else self._answer_cache.get(answer_key)
+            if cached is not None:
+                logger.debug("AI GENERATION CACHE HIT | answer_length=%s", len(cached))
+                parts = [cached]
+                yield {"type": "token", "content": cached}
+            else:
+                parts = []
+                async for chunk in rag_chain.chat_chain.astream(prompt_inputs):
+                    text = chunk.content if hasattr(chunk, "content") else str(chunk)
+                    if text:
+                        parts.append(text)
+                        yield {"type": "token", "content": text}
+
+            # Persist only once the full answer is known
+            answer = "".join(parts).strip()
+            if cached is None and not CHAT_CACHE_DISABLE:
+                self._answer_cache.put(answer_key, answer)
+
+            reply = await self._finish_reply(session_id, answer, rag_results)
+            yield {"type": "done", **reply}
 
-            return {"answer": answer, "sources": formatted_sources}
-            
         except Exception as e:
-            # Log any errors during the chat chain execution
-            logger.error(
-                f"CHAT CHAIN ERROR | session_id={session_id} | "
-                f"error_type={type(e).__name__} | error='{str(e)}'"
-            )
-            raise
+            self._log_error(session_id, e)
+            yield {"type": "error", "error": str(e)}
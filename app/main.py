@@ -5,8 +5,11 @@ This is the entry point for the customer support AI application.
 It provides REST API endpoints for querying the RAG system.
 """
 
+import asyncio
+import hashlib
 import os
 import sys
+from contextlib import asynccontextmanager
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -19,14 +22,21 @@ if str(project_root) not in sys.path:
 # Load environment variables
 load_dotenv()
 
+# Resolved once at startup; the Gemini clients also read the key only once
+API_KEY_CONFIGURED = bool(os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY"))
+# Load the vector store at import time, i.e. in the master process when run
+# under `gunicorn --preload`, so forked workers share its pages
+PRELOAD_VECTOR_STORE = os.getenv("RAG_PRELOAD_VECTOR_STORE", "").lower() in ("1", "true", "yes")
+
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict
 
 # Import routers (use absolute package paths only to avoid reload issues)
 from app.api.routes import router as api_router
-from app.routes.chat_router import router as chat_router
+from app.routes.chat_router import chat_chain, router as chat_router
 
 try:
     from app.api.ask import router as agent_router
@@ -42,6 +52,47 @@ except ImportError:
     # Fallback for direct execution
     from rag.query_engine import ask_question, ask_question_with_sources
 
+if PRELOAD_VECTOR_STORE:
+    from app.rag.vector_store import preload_shared_store
+
+    try:
+        preload_shared_store()
+    except Exception as e:
+        # Workers load the store lazily instead
+        print(f"Warning: Vector store preload failed: {e}", file=sys.stderr)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm up the chat chain and support agent before serving traffic and
+    release the agent and chat worker threads on shutdown.
+    
+    Building the Gemini client, RAG chain, embedding model and agent executor
+    here turns first-request latency into a one-time startup cost.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        # Loads the shared RAG singleton first; the agent warm-up then reuses it
+        await loop.run_in_executor(None, chat_chain.warm_up)
+    except Exception as e:
+        # Keep serving; components will be initialized lazily on first request
+        print(f"Warning: Chat chain warm-up failed: {e}", file=sys.stderr)
+    if agent_router:
+        try:
+            from app.agent.support_agent import get_support_agent
+
+            await loop.run_in_executor(None, get_support_agent().warm_up)
+        except Exception as e:
+            # Keep serving; components will be initialized lazily on first request
+            print(f"Warning: Support agent warm-up failed: {e}", file=sys.stderr)
+    yield
+    chat_chain.shutdown()
+    if agent_router:
+        from app.agent.support_agent import shutdown_support_agent
+
+        shutdown_support_agent()
+
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -49,7 +100,10 @@ app = FastAPI(
     description="AI-powered customer support system using RAG (Retrieval-Augmented Generation)",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    # orjson serializes responses (long answers + source lists) much faster than stdlib json
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -101,8 +155,19 @@ class HealthResponse(BaseModel):
 
 
 # API Endpoints
+def _question_session_id(prefix: str, question: str) -> str:
+    """
+    Derive a stable session ID from the question text.
+    
+    Uses blake2b rather than hash(), which is salted per process
+    (PYTHONHASHSEED) and collided heavily once reduced modulo 10000.
+    """
+    digest = hashlib.blake2b(question.encode("utf-8"), digest_size=8).hexdigest()
+    return f"{prefix}-{digest}"
+
+
 @app.get("/", tags=["root"])
-def root():
+async def root():
     """Root endpoint."""
     return {
         "message": "NeuraHome AI Customer Support API is running!",
@@ -112,14 +177,12 @@ def root():
 
 
 @app.get("/health", response_model=HealthResponse, tags=["health"])
-def health_check():
+async def health_check():
     """Health check endpoint."""
-    api_key_configured = bool(os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY"))
-    
     return HealthResponse(
         status="ok",
-        message="Service is healthy" if api_key_configured else "Service is running but API key not configured",
-        api_key_configured=api_key_configured
+        message="Service is healthy" if API_KEY_CONFIGURED else "Service is running but API key not configured",
+        api_key_configured=API_KEY_CONFIGURED
     )
 
 
@@ -148,7 +211,7 @@ async def ask(request: QuestionRequest):
             
             agent = get_support_agent()
             # Use a default session_id if not provided (for backward compatibility)
-            session_id = f"ask-endpoint-{hash(request.question) % 10000}"
+            session_id = _question_session_id("ask-endpoint", request.question)
             
             result = await agent.process_query(
                 session_id=session_id,
@@ -234,7 +297,7 @@ async def ask_get(
             
             agent = get_support_agent()
             # Use provided session_id or generate one
-            sid = session_id or f"ask-get-{hash(question) % 10000}"
+            sid = session_id or _question_session_id("ask-get", question)
             
             result = await agent.process_query(
                 session_id=sid,
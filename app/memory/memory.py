@@ -13,9 +13,10 @@ Usage:
 import asyncio
 import json
 import os
-import traceback
+import time
+from collections import OrderedDict
 from dataclasses import asdict, dataclass
-from typing import List, Optional
+from typing import Any, List, NamedTuple, Optional, Union
 
 try:
     import redis.asyncio as aioredis
@@ -24,6 +25,11 @@ except ImportError as exc:  # pragma: no cover - defensive import guard
         "The 'redis' extra is required for chat memory. Install it via `pip install redis>=5`."
     ) from exc
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib json fallback
+    orjson = None
+
 from app.utils.logger import get_logger
 
 logger = get_logger()
@@ -32,58 +38,284 @@ logger = get_logger()
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 MAX_HISTORY = int(os.getenv("RAG_MEMORY_MAX_HISTORY", "10"))       # keep last N messages
 SESSION_TTL_SECONDS = int(os.getenv("RAG_MEMORY_TTL", str(60 * 60 * 24 * 7)))  # default 7 days
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONN", "64"))  # size to expected request concurrency
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))  # seconds
+# RESP protocol version; 3 (RESP3) needs Redis 6+, the default 2 works with any supported server
+REDIS_PROTOCOL = int(os.getenv("REDIS_PROTOCOL", "2"))
+# Server-assisted client-side caching of history reads (needs Redis 6+; disabled automatically otherwise)
+REDIS_CLIENT_TRACKING = os.getenv("REDIS_CLIENT_TRACKING", "1").lower() in ("1", "true", "yes")
+LOCAL_CACHE_MAX_KEYS = int(os.getenv("REDIS_LOCAL_CACHE_MAX_KEYS", "10000"))
+TRACKING_RETRY_SECONDS = 30
+# Key prefixes covered by tracking
+TRACKED_PREFIXES = ("chat_history", "chat_version")
+INVALIDATE_CHANNEL = "__redis__:invalidate"
+
+
+def _dumps(data: dict) -> str:
+    """Serialize a message dict (orjson when installed; same JSON wire format either way)."""
+    if orjson is not None:
+        return orjson.dumps(data).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False)
+
 
+_loads = orjson.loads if orjson is not None else json.loads
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class Message:
     role: str  # "user", "assistant", "system", etc.
     content: str
 
 
+# Title-cased role labels for the common roles (avoids str.title() per message)
+_ROLE_TITLE = {"user": "User", "assistant": "Assistant", "system": "System"}
+
+
+def format_message(role: str, content: str) -> str:
+    """Format a single history message as a prompt line."""
+    return f"{_ROLE_TITLE.get(role) or role.title()}: {content}"
+
+
+class EncodedMessage(NamedTuple):
+    """A message pre-encoded in its stored form (JSON payload)."""
+    payload: str
+
+
+def encode_message(role: str, content: str) -> EncodedMessage:
+    """
+    Pre-encode a message in the stored wire format.
+    The result can be passed to `MemoryStore.add_message` in place of a Message,
+    which skips the dataclass -> dict conversion on the write path.
+    """
+    return EncodedMessage(_dumps({"role": role, "content": content}))
+
+
 class MemoryStore:
     def __init__(self, url: str = REDIS_URL, max_history: int = MAX_HISTORY, ttl: int = SESSION_TTL_SECONDS):
         """
         Initialize Redis connection (async).
         """
         self._url = url
-        self._redis = aioredis.from_url(self._url, encoding="utf-8", decode_responses=True)
+        self._redis = aioredis.from_url(
+            self._url,
+            encoding="utf-8",
+            decode_responses=True,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            # Ping idle connections before reuse instead of failing on a silently dropped socket
+            health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+            socket_keepalive=True,
+            retry_on_timeout=True,
+            protocol=REDIS_PROTOCOL,
+        )
         self._max_history = max_history
         self._ttl = ttl
 
+        # Client-side cache: Redis key -> last value read, evicted by tracking invalidations
+        self._local: "OrderedDict[str, Any]" = OrderedDict()
+        # Bumped on every invalidation so reads racing a write never store a stale value
+        self._epoch = 0
+        self._tracking_ready = False
+        self._tracking_task: Optional[asyncio.Task] = None
+        self._tracking_retry_at = 0.0
+        self._tracking_conns: List[Any] = []
+
     def _key(self, session_id: str) -> str:
         return f"chat_history:{session_id}"
 
-    async def add_message(self, session_id: str, message: Message) -> None:
+    def _version_key(self, session_id: str) -> str:
+        return f"chat_version:{session_id}"
+
+    # ---- client-side caching (RESP CLIENT TRACKING, broadcast mode) ----
+
+    async def _start_tracking(self) -> None:
         """
-        Append a message to the session history and trim to MAX_HISTORY.
-        Stores message as JSON string in a Redis list.
-        Also sets TTL on the session key.
+        Open an invalidation listener and enable broadcast tracking for the
+        history key prefixes, redirecting invalidations to the listener.
         """
+        pool = self._redis.connection_pool
+        listener = pool.connection_class(**pool.connection_kwargs)
+        tracker = pool.connection_class(**pool.connection_kwargs)
+        self._tracking_conns = [listener, tracker]
+
+        await listener.connect()
+        await listener.send_command("CLIENT", "ID")
+        listener_id = await listener.read_response()
+        await listener.send_command("SUBSCRIBE", INVALIDATE_CHANNEL)
+        await listener.read_response()
+
+        # The tracker connection must stay open for tracking to remain enabled
+        await tracker.connect()
+        prefixes = [arg for prefix in TRACKED_PREFIXES for arg in ("PREFIX", prefix)]
+        await tracker.send_command("CLIENT", "TRACKING", "ON", "REDIRECT", listener_id, "BCAST", *prefixes)
+        await tracker.read_response()
+
+        self._tracking_ready = True
+        self._tracking_task = asyncio.create_task(self._listen_invalidations(listener, tracker))
+        logger.info("MEMORY CLIENT TRACKING | status=enabled | prefixes=%s", ",".join(TRACKED_PREFIXES))
+
+    async def _listen_invalidations(self, listener, tracker) -> None:
+        """Evict locally cached keys as Redis reports them modified."""
         try:
-            key = self._key(session_id)
-            payload = json.dumps(asdict(message), ensure_ascii=False)
+            while True:
+                try:
+                    response = await listener.read_response(timeout=REDIS_HEALTH_CHECK_INTERVAL or None)
+                except asyncio.TimeoutError:
+                    response = None
+                if response is None:
+                    # Idle: make sure the tracking connection is still alive
+                    await tracker.send_command("PING")
+                    await tracker.read_response()
+                    continue
+                if len(response) >= 3 and response[0] == "message":
+                    self._invalidate(response[2])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(
+                "MEMORY CLIENT TRACKING | status=disconnected | error='%s' | local_cache=cleared | retry_in=%ss",
+                e, TRACKING_RETRY_SECONDS
+            )
+        finally:
+            await self._stop_tracking()
+
+    async def _stop_tracking(self) -> None:
+        """Disable the local cache and close the tracking connections."""
+        self._tracking_ready = False
+        self._invalidate(None)
+        self._tracking_retry_at = time.monotonic() + TRACKING_RETRY_SECONDS
+        conns, self._tracking_conns = self._tracking_conns, []
+        for conn in conns:
+            try:
+                await conn.disconnect()
+            except Exception:
+                pass
+
+    async def _tracking_active(self) -> bool:
+        """Return True when local reads are safe, (re)starting tracking if due."""
+        if not REDIS_CLIENT_TRACKING:
+            return False
+        if self._tracking_task is not None and not self._tracking_task.done():
+            return self._tracking_ready
+        if time.monotonic() < self._tracking_retry_at:
+            return False
+
+        # Set before awaiting so concurrent callers don't start a second listener
+        self._tracking_retry_at = time.monotonic() + TRACKING_RETRY_SECONDS
+        try:
+            await self._start_tracking()
+        except Exception as e:
+            logger.warning(
+                "MEMORY CLIENT TRACKING | status=unavailable | error='%s' | retry_in=%ss", e, TRACKING_RETRY_SECONDS
+            )
+            await self._stop_tracking()
+            return False
+        return True
+
+    def _invalidate(self, keys: Optional[List[str]]) -> None:
+        """Drop keys from the local cache (all keys when `keys` is None)."""
+        self._epoch += 1
+        if keys is None:
+            self._local.clear()
+            return
+        for key in keys:
+            self._local.pop(key, None)
+
+    def _remember(self, key: str, value: Any, epoch: int) -> None:
+        """Cache a value read at `epoch`, unless it was invalidated meanwhile."""
+        if epoch != self._epoch or not self._tracking_ready:
+            return
+        self._local[key] = value
+        self._local.move_to_end(key)
+        while len(self._local) > LOCAL_CACHE_MAX_KEYS:
+            self._local.popitem(last=False)
+
+    async def _read_list(self, key: str, n: Optional[int] = None) -> List[str]:
+        """LRANGE the last n items (all when n is None), served locally while tracked."""
+        if not await self._tracking_active():
+            return await self._redis.lrange(key, 0 if n is None else -n, -1)
+
+        full = self._local.get(key)
+        if full is None:
+            epoch = self._epoch
+            full = await self._redis.lrange(key, 0, -1)
+            self._remember(key, full, epoch)
+        else:
+            self._local.move_to_end(key)
+        return full if n is None else full[-n:]
+
+    def _forget_session(self, session_id: str) -> None:
+        """Evict a session's keys right after this process writes them."""
+        self._invalidate([self._key(session_id), self._version_key(session_id)])
+
+    def _queue_append(self, pipe, session_id: str, message: Union[Message, EncodedMessage]) -> None:
+        """
+        Queue the commands that append `message` (a Message or an
+        `encode_message` result) on a pipeline.
+        The INCR result (new session version) is the pipeline's third reply.
+        """
+        key = self._key(session_id)
+        version_key = self._version_key(session_id)
+        if not isinstance(message, EncodedMessage):
+            message = EncodedMessage(_dumps(asdict(message)))
+
+        # RPUSH then LTRIM keeps only latest `max_history` elements
+        pipe.rpush(key, message.payload)
+        # Keep only last N messages (negative indexing)
+        pipe.ltrim(key, -self._max_history, -1)
+        # Monotonic counter so readers can cheaply detect new messages
+        pipe.incr(version_key)
+        # Reset TTL to keep session alive for configured time
+        if self._ttl > 0:
+            pipe.expire(key, self._ttl)
+            pipe.expire(version_key, self._ttl)
+
+    def _decode_messages(self, session_id: str, raw: List[str]) -> List[Message]:
+        """Parse stored JSON entries, skipping malformed ones."""
+        messages: List[Message] = []
+        for item in raw:
+            try:
+                data = _loads(item)
+                messages.append(Message(role=data.get("role", "user"), content=data.get("content", "")))
+            except Exception as parse_err:
+                logger.warning(
+                    "MEMORY WARNING | session_id=%s | action=parse_message | error='%s' | skipping_malformed_entry",
+                    session_id, parse_err
+                )
+                continue
+        return messages
 
-            # RPUSH then LTRIM keeps only latest `max_history` elements
+    async def add_message(self, session_id: str, message: Union[Message, EncodedMessage]) -> int:
+        """
+        Append a message to the session history and trim to MAX_HISTORY.
+        Stores message as JSON string in a Redis list; `message` may also be
+        built by `encode_message`.
+        Also sets TTL on the session key and bumps the session version.
+        Returns the new session version.
+        """
+        try:
             # Using pipeline to group commands
             async with self._redis.pipeline() as pipe:
-                pipe.rpush(key, payload)
-                # Keep only last N messages (negative indexing)
-                pipe.ltrim(key, -self._max_history, -1)
-                # Reset TTL to keep session alive for configured time
-                if self._ttl > 0:
-                    pipe.expire(key, self._ttl)
-                await pipe.execute()
+                self._queue_append(pipe, session_id, message)
+                results = await pipe.execute()
+            self._forget_session(session_id)
             
-            logger.debug(
-                f"MEMORY OPERATION | session_id={session_id} | action=add_message | "
-                f"role={message.role} | content_length={len(message.content)}"
-            )
+            if isinstance(message, EncodedMessage):
+                logger.debug(
+                    "MEMORY OPERATION | session_id=%s | action=add_message | payload_length=%d",
+                    session_id, len(message.payload)
+                )
+            else:
+                logger.debug(
+                    "MEMORY OPERATION | session_id=%s | action=add_message | role=%s | content_length=%d",
+                    session_id, message.role, len(message.content)
+                )
+            return int(results[2])
         except Exception as e:
-            logger.error(
-                f"MEMORY ERROR | session_id={session_id} | operation=add_message | "
-                f"error_type={type(e).__name__} | error='{str(e)}'"
+            # Traceback is formatted only if a handler emits the record
+            logger.exception(
+                "MEMORY ERROR | session_id=%s | operation=add_message | error_type=%s | error='%s'",
+                session_id, type(e).__name__, e
             )
-            logger.error(f"MEMORY TRACEBACK | session_id={session_id}\n{traceback.format_exc()}")
             raise
 
     async def get_history(self, session_id: str) -> List[Message]:
@@ -93,11 +325,11 @@ class MemoryStore:
         If no history, returns an empty list.
         """
         key = self._key(session_id)
-        raw = await self._redis.lrange(key, 0, -1)
+        raw = await self._read_list(key)
         messages: List[Message] = []
         for item in raw:
             try:
-                data = json.loads(item)
+                data = _loads(item)
                 messages.append(Message(role=data.get("role", "user"), content=data.get("content", "")))
             except Exception:
                 # Skip malformed entries
@@ -110,44 +342,82 @@ class MemoryStore:
         If n is None, returns full history (up to max_history).
         """
         try:
-            key = self._key(session_id)
-            if n is None:
-                raw = await self._redis.lrange(key, 0, -1)
-            else:
-                # lrange with negative index: -n to -1 (last n items)
-                raw = await self._redis.lrange(key, -n, -1)
+            # Last n items (lrange -n..-1), served from the local cache while tracked
+            raw = await self._read_list(self._key(session_id), n)
             
-            messages: List[Message] = []
-            for item in raw:
-                try:
-                    data = json.loads(item)
-                    messages.append(Message(role=data.get("role", "user"), content=data.get("content", "")))
-                except Exception as parse_err:
-                    logger.warning(
-                        f"MEMORY WARNING | session_id={session_id} | "
-                        f"action=parse_message | error='{str(parse_err)}' | skipping_malformed_entry"
-                    )
-                    continue
+            messages = self._decode_messages(session_id, raw)
             
             logger.debug(
-                f"MEMORY OPERATION | session_id={session_id} | action=get_recent | "
-                f"requested_n={n} | messages_returned={len(messages)}"
+                "MEMORY OPERATION | session_id=%s | action=get_recent | requested_n=%s | messages_returned=%d",
+                session_id, n, len(messages)
             )
             return messages
         except Exception as e:
-            logger.error(
-                f"MEMORY ERROR | session_id={session_id} | operation=get_recent | "
-                f"error_type={type(e).__name__} | error='{str(e)}'"
+            # Traceback is formatted only if a handler emits the record
+            logger.exception(
+                "MEMORY ERROR | session_id=%s | operation=get_recent | error_type=%s | error='%s'",
+                session_id, type(e).__name__, e
             )
-            logger.error(f"MEMORY TRACEBACK | session_id={session_id}\n{traceback.format_exc()}")
             raise
 
+    async def add_and_get_recent(
+        self,
+        session_id: str,
+        message: Union[Message, EncodedMessage],
+        n: Optional[int] = None
+    ) -> List[Message]:
+        """
+        Append a message and return the most recent n messages (newest last)
+        in a single MULTI/EXEC round trip.
+        If n is None, returns full history (up to max_history).
+        """
+        try:
+            key = self._key(session_id)
+            async with self._redis.pipeline() as pipe:
+                self._queue_append(pipe, session_id, message)
+                pipe.lrange(key, 0 if n is None else -n, -1)
+                results = await pipe.execute()
+            self._forget_session(session_id)
+
+            messages = self._decode_messages(session_id, results[-1])
+            logger.debug(
+                "MEMORY OPERATION | session_id=%s | action=add_and_get_recent | requested_n=%s | messages_returned=%d",
+                session_id, n, len(messages)
+            )
+            return messages
+        except Exception as e:
+            # Traceback is formatted only if a handler emits the record
+            logger.exception(
+                "MEMORY ERROR | session_id=%s | operation=add_and_get_recent | error_type=%s | error='%s'",
+                session_id, type(e).__name__, e
+            )
+            raise
+
+    async def get_version(self, session_id: str) -> int:
+        """
+        Return the session version (number of messages ever added, 0 if none).
+        Unlike the history length it keeps growing after trimming, so it can be
+        used to invalidate cached views of the history.
+        """
+        key = self._version_key(session_id)
+        if not await self._tracking_active():
+            raw = await self._redis.get(key)
+            return int(raw) if raw else 0
+
+        version = self._local.get(key)
+        if version is None:
+            epoch = self._epoch
+            raw = await self._redis.get(key)
+            version = int(raw) if raw else 0
+            self._remember(key, version, epoch)
+        return version
+
     async def clear_history(self, session_id: str) -> None:
         """
         Remove the whole session history from Redis.
         """
-        key = self._key(session_id)
-        await self._redis.delete(key)
+        await self._redis.delete(self._key(session_id), self._version_key(session_id))
+        self._forget_session(session_id)
 
     async def session_exists(self, session_id: str) -> bool:
         key = self._key(session_id)
@@ -157,6 +427,13 @@ class MemoryStore:
         """
         Close redis connection gracefully.
         """
+        if self._tracking_task is not None:
+            self._tracking_task.cancel()
+            try:
+                await self._tracking_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._tracking_task = None
         await self._redis.close()
         # redis.asyncio sometimes needs explicit wait_closed
         try:
@@ -168,7 +445,15 @@ class MemoryStore:
 # Convenience: singleton MemoryStore instance for quick imports
 _memory_instance: Optional[MemoryStore] = None
 
-__all__ = ["Message", "MemoryStore", "get_memory_store", "reset_memory_store"]
+__all__ = [
+    "EncodedMessage",
+    "Message",
+    "MemoryStore",
+    "encode_message",
+    "format_message",
+    "get_memory_store",
+    "reset_memory_store",
+]
 
 
 def get_memory_store() -> MemoryStore:
@@ -1,9 +1,15 @@
+import itertools
 import json
 import sys
 import re
+from collections import deque
 from pathlib import Path
-from typing import List, Dict, Optional
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
 
 # Handle import for both module and direct execution
 try:
@@ -15,6 +21,30 @@ except ImportError:
 # Default output file path (relative to project root)
 DEFAULT_OUTPUT_FILE = "data/rag_kb_chunks.jsonl"
 
+# Sections need this many characters left after dropping rule and blank lines
+MIN_CONTENT_CHARS = 10
+_RULE_LINE_RE = re.compile(r'^---+$', re.MULTILINE)
+_BLANK_LINE_RE = re.compile(r'^\s*$', re.MULTILINE)
+
+# Only H1 and H2 headings start a section; H3 and deeper stay part of the section content.
+# Matched line by line over the whole document (MULTILINE); the heading text is
+# captured without surrounding whitespace and a match never extends past its line.
+_HEADING_RE = re.compile(r'^(#{1,2})[ \t]+([^\n]+?)[^\S\n]*$', re.MULTILINE)
+
+# Split points, coarsest first ("" splits into single characters)
+SEPARATORS = ("\n\n", "\n", ". ", " ", "")
+
+
+# Chunks are streamed to disk; a large buffer keeps the number of write calls low
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def _jsonl_line(record: Dict) -> bytes:
+    """Encode one record as a JSONL line (orjson when installed, UTF-8 either way)."""
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
 
 def is_meaningful_content(content: str) -> bool:
     """
@@ -24,200 +54,314 @@ def is_meaningful_content(content: str) -> bool:
         content: Content string to check
         
     Returns:
-        True if content has meaningful text, False otherwise
+        True if at least MIN_CONTENT_CHARS characters remain once horizontal
+        rule lines and blank lines are removed, False otherwise
     """
-    if not content:
+    # Cleaning only removes characters, so short content can never pass
+    if len(content) < MIN_CONTENT_CHARS:
         return False
     
     # Remove horizontal rules, empty lines, and whitespace
-    cleaned = re.sub(r'^---+$', '', content, flags=re.MULTILINE)  # Remove --- lines
-    cleaned = re.sub(r'^\s*$', '', cleaned, flags=re.MULTILINE)  # Remove empty lines
-    cleaned = cleaned.strip()
+    cleaned = _RULE_LINE_RE.sub('', content) if '---' in content else content
+    cleaned = _BLANK_LINE_RE.sub('', cleaned).strip()
     
     # Check if there's any non-whitespace content left
-    return len(cleaned) >= 10  # At least 10 characters of actual content
+    return len(cleaned) >= MIN_CONTENT_CHARS
 
 
-def extract_sections(content: str) -> List[Dict[str, str]]:
+def _split_on(text: str, separator: str) -> List[str]:
+    """Split on a literal separator, keeping it at the start of each following piece."""
+    if not separator:
+        return list(text)
+    first, *rest = text.split(separator)
+    pieces = [first]
+    pieces.extend(separator + piece for piece in rest)
+    return [piece for piece in pieces if piece]
+
+
+def _merge_splits(splits: List[str], chunk_size: int, chunk_overlap: int) -> List[str]:
+    """Greedily pack pieces into chunks of at most chunk_size, carrying up to chunk_overlap forward."""
+    chunks = []
+    current = deque()
+    total = 0
+    for piece in splits:
+        length = len(piece)
+        if total + length > chunk_size and current:
+            chunk = "".join(current).strip()
+            if chunk:
+                chunks.append(chunk)
+            # Drop pieces from the front until only the overlap (and room for this piece) is left
+            while total > chunk_overlap or (total + length > chunk_size and total > 0):
+                total -= len(current.popleft())
+        current.append(piece)
+        total += length
+    
+    chunk = "".join(current).strip()
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def split_text(
+    text: str,
+    chunk_size: int,
+    chunk_overlap: int,
+    separators: Sequence[str] = SEPARATORS
+) -> List[str]:
     """
-    Extract sections from markdown content by detecting headings.
-    Splits on H1 (#) and H2 (##) headings only. H3 (###) and deeper are kept as part of the section.
-    Filters out sections that only contain separators or whitespace.
+    Recursively split text into chunks of at most chunk_size characters.
+    
+    Produces the same chunks as LangChain's RecursiveCharacterTextSplitter
+    (keep_separator=True, strip_whitespace=True) for literal separators, using
+    plain str operations instead of a regex search and split per recursion level.
     
     Args:
-        content: Markdown content string
+        text: Text to split
+        chunk_size: Maximum size of each chunk in characters
+        chunk_overlap: Number of characters to overlap between chunks
+        separators: Separators to try, coarsest first
         
     Returns:
-        List of dictionaries with 'heading' and 'content' keys
+        List of chunk strings
+    """
+    # Use the first separator present in the text; finer ones handle oversized pieces
+    separator = separators[-1]
+    finer: Sequence[str] = ()
+    for i, candidate in enumerate(separators):
+        if not candidate:
+            separator = candidate
+            break
+        if candidate in text:
+            separator = candidate
+            finer = separators[i + 1:]
+            break
+    
+    chunks = []
+    small = []
+    for piece in _split_on(text, separator):
+        if len(piece) < chunk_size:
+            small.append(piece)
+            continue
+        if small:
+            chunks.extend(_merge_splits(small, chunk_size, chunk_overlap))
+            small = []
+        if finer:
+            chunks.extend(split_text(piece, chunk_size, chunk_overlap, finer))
+        else:
+            chunks.append(piece)
+    if small:
+        chunks.extend(_merge_splits(small, chunk_size, chunk_overlap))
+    return chunks
+
+
+def iter_sections(content: str) -> Iterator[Tuple[str, str]]:
     """
-    sections = []
+    Yield sections from markdown content by detecting headings.
+    Splits on H1 (#) and H2 (##) headings only. H3 (###) and deeper are kept as part of the section.
+    Skips sections that only contain separators or whitespace.
     
-    # Pattern to match only H1 and H2 headings (not H3+)
-    # H3 and deeper headings are treated as part of the section content
-    heading_pattern = r'^(#{1,2})\s+(.+)$'
+    Each section is yielded as soon as the next heading closes it, so it can be
+    chunked without materializing the whole section list first.
     
-    lines = content.split('\n')
+    Args:
+        content: Markdown content string
+        
+    Yields:
+        (heading, section content) tuples
+    """
+    found = False
     current_heading = None
-    current_content = []
+    body_start = 0
     
-    for line in lines:
-        match = re.match(heading_pattern, line)
-        if match:
-            # Save previous section if it has meaningful content
-            if current_heading is not None:
-                section_content = '\n'.join(current_content).strip()
-                if is_meaningful_content(section_content):
-                    sections.append({
-                        'heading': current_heading,
-                        'content': section_content
-                    })
-                # If section is empty, skip it (handles cases where H1 is just a title)
-            
-            # Start new section
-            heading_level = len(match.group(1))
-            current_heading = match.group(2).strip()
-            current_content = []
-        else:
-            # Include all non-H1/H2 lines in current section (including H3+ headings)
-            current_content.append(line)
+    # The regex scanner finds heading lines; section bodies are sliced out between them
+    for match in _HEADING_RE.finditer(content):
+        # Emit previous section if it has meaningful content
+        # (empty sections are skipped, e.g. when an H1 is just a title)
+        if current_heading is not None:
+            section_content = content[body_start:match.start()].strip()
+            if is_meaningful_content(section_content):
+                found = True
+                yield current_heading, section_content
+        
+        # Start new section (text before the first heading is dropped)
+        current_heading = match.group(2)
+        body_start = match.end()
     
-    # Add the last section if it has meaningful content
+    # Emit the last section if it has meaningful content
     if current_heading is not None:
-        section_content = '\n'.join(current_content).strip()
+        section_content = content[body_start:].strip()
         if is_meaningful_content(section_content):
-            sections.append({
-                'heading': current_heading,
-                'content': section_content
-            })
+            found = True
+            yield current_heading, section_content
     
     # If no headings found, treat entire content as one section
-    if not sections and content.strip():
+    if not found:
         cleaned_content = content.strip()
         if is_meaningful_content(cleaned_content):
-            sections.append({
-                'heading': 'Introduction',
-                'content': cleaned_content
-            })
+            yield 'Introduction', cleaned_content
+
+
+def extract_sections(content: str) -> List[Dict[str, str]]:
+    """
+    Extract sections from markdown content (see iter_sections()).
     
-    return sections
+    Args:
+        content: Markdown content string
+        
+    Returns:
+        List of dictionaries with 'heading' and 'content' keys
+    """
+    return [{'heading': heading, 'content': body} for heading, body in iter_sections(content)]
 
 
-def chunk_documents(
+def iter_chunks(
     documents: List[Dict],
     chunk_size: int = 500,
     chunk_overlap: int = 50,
-    verbose: bool = False
-) -> List[Dict]:
+    verbose: bool = False,
+    stats: Optional[Dict[str, int]] = None
+) -> Iterator[Dict]:
     """
-    Split documents into chunks using LangChain RecursiveCharacterTextSplitter.
+    Split documents into chunks with split_text() (recursive character splitting),
+    yielding each chunk as soon as it is built so only one section's chunks are
+    held in memory at a time.
     
     Args:
         documents: List of document dictionaries from load_markdown_files()
         chunk_size: Maximum size of each chunk in characters
         chunk_overlap: Number of characters to overlap between chunks
         verbose: If True, print progress information
+        stats: Optional dictionary from new_chunking_stats(), updated while iterating
         
-    Returns:
-        List of chunk dictionaries with title, content, and metadata
+    Yields:
+        Chunk dictionaries with title, content, and metadata
     """
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len,
-        separators=["\n\n", "\n", ". ", " ", ""]
-    )
-
-    all_chunks = []
-    stats = {
-        'total_docs': len(documents),
-        'total_sections': 0,
-        'total_chunks': 0,
-        'docs_without_sections': 0
-    }
+    if chunk_overlap > chunk_size:
+        raise ValueError(
+            f"Got a larger chunk overlap ({chunk_overlap}) than chunk size ({chunk_size}), should be smaller."
+        )
+
+    if stats is None:
+        stats = new_chunking_stats(len(documents))
     
     for doc_idx, doc in enumerate(documents, 1):
         if verbose:
             print(f"Processing document {doc_idx}/{stats['total_docs']}: {doc['filename']}")
         
         try:
-            # Extract sections from document
-            sections = extract_sections(doc['content'])
+            filepath = doc.get('filepath')
             
-            if not sections:
-                if verbose:
-                    print(f"  ⚠️  Warning: No sections found in {doc['filename']}")
-                stats['docs_without_sections'] += 1
-                continue
-            
-            stats['total_sections'] += len(sections)
-            
-            # Process each section
-            for section in sections:
-                heading = section['heading']
-                content = section['content']
-                
-                # Double-check content is meaningful (should already be filtered, but safety check)
-                if not is_meaningful_content(content):
-                    if verbose:
-                        print(f"  ⚠️  Skipping empty section: {heading}")
-                    continue
+            # Chunk each section as soon as it is extracted
+            # (iter_sections() only yields meaningful sections)
+            section_count = 0
+            for heading, content in iter_sections(doc['content']):
+                section_count += 1
                 
                 # Split section into chunks
                 try:
-                    chunks = text_splitter.split_text(content)
-                    
-                    for chunk_idx, chunk in enumerate(chunks, 1):
-                        if not chunk.strip():
-                            continue
-                        
-                        chunk_metadata = {
-                            "source": doc['filename'],
-                            "category": doc['category'],
-                            "section": heading,
-                            "chunk_index": chunk_idx,
-                            "total_chunks_in_section": len(chunks)
-                        }
-                        
-                        # Add filepath if available
-                        if 'filepath' in doc:
-                            chunk_metadata['filepath'] = doc['filepath']
-                        
-                        all_chunks.append({
-                            "title": f"{doc['filename']} - {heading}",
-                            "content": chunk.strip(),
-                            "metadata": chunk_metadata
-                        })
-                        stats['total_chunks'] += 1
-                        
+                    chunks = split_text(content, chunk_size, chunk_overlap)
                 except Exception as e:
                     if verbose:
                         print(f"  ⚠️  Error chunking section '{heading}': {e}")
                     continue
+                
+                # Fields shared by every chunk of this section
+                title = f"{doc['filename']} - {heading}"
+                base_metadata = {
+                    "source": doc['filename'],
+                    "category": doc['category'],
+                    "section": heading
+                }
+                
+                for chunk_idx, chunk in enumerate(chunks, 1):
+                    stripped = chunk.strip()
+                    if not stripped:
+                        continue
+                    
+                    chunk_metadata = {
+                        **base_metadata,
+                        "chunk_index": chunk_idx,
+                        "total_chunks_in_section": len(chunks)
+                    }
+                    
+                    # Add filepath if available
+                    if filepath is not None:
+                        chunk_metadata['filepath'] = filepath
+                    
+                    stats['total_chunks'] += 1
+                    yield {
+                        "title": title,
+                        "content": stripped,
+                        "metadata": chunk_metadata
+                    }
+            
+            stats['total_sections'] += section_count
+            if not section_count:
+                if verbose:
+                    print(f"  ⚠️  Warning: No sections found in {doc['filename']}")
+                stats['docs_without_sections'] += 1
                     
         except Exception as e:
             if verbose:
                 print(f"  ⚠️  Error processing {doc['filename']}: {e}")
             continue
+
+
+def new_chunking_stats(total_docs: int) -> Dict[str, int]:
+    """Return an empty statistics dictionary for iter_chunks()."""
+    return {
+        'total_docs': total_docs,
+        'total_sections': 0,
+        'total_chunks': 0,
+        'docs_without_sections': 0
+    }
+
+
+def print_chunking_stats(stats: Dict[str, int]) -> None:
+    """Print statistics collected by iter_chunks()."""
+    print(f"\n📊 Chunking Statistics:")
+    print(f"  - Documents processed: {stats['total_docs']}")
+    print(f"  - Sections extracted: {stats['total_sections']}")
+    print(f"  - Total chunks created: {stats['total_chunks']}")
+    print(f"  - Documents without sections: {stats['docs_without_sections']}")
+    if stats['total_chunks'] > 0:
+        avg_chunks_per_doc = stats['total_chunks'] / stats['total_docs']
+        print(f"  - Average chunks per document: {avg_chunks_per_doc:.1f}")
+
+
+def chunk_documents(
+    documents: List[Dict],
+    chunk_size: int = 500,
+    chunk_overlap: int = 50,
+    verbose: bool = False
+) -> List[Dict]:
+    """
+    Split documents into chunks (see iter_chunks()).
+    
+    Args:
+        documents: List of document dictionaries from load_markdown_files()
+        chunk_size: Maximum size of each chunk in characters
+        chunk_overlap: Number of characters to overlap between chunks
+        verbose: If True, print progress information
+        
+    Returns:
+        List of chunk dictionaries with title, content, and metadata
+    """
+    stats = new_chunking_stats(len(documents))
+    all_chunks = list(iter_chunks(documents, chunk_size, chunk_overlap, verbose, stats))
     
     if verbose:
-        print(f"\n📊 Chunking Statistics:")
-        print(f"  - Documents processed: {stats['total_docs']}")
-        print(f"  - Sections extracted: {stats['total_sections']}")
-        print(f"  - Total chunks created: {stats['total_chunks']}")
-        print(f"  - Documents without sections: {stats['docs_without_sections']}")
-        if stats['total_chunks'] > 0:
-            avg_chunks_per_doc = stats['total_chunks'] / stats['total_docs']
-            print(f"  - Average chunks per document: {avg_chunks_per_doc:.1f}")
+        print_chunking_stats(stats)
     
     return all_chunks
 
 
-def save_chunks_to_jsonl(chunks: List[Dict], output_file: str = DEFAULT_OUTPUT_FILE) -> Path:
+def save_chunks_to_jsonl(chunks: Iterable[Dict], output_file: str = DEFAULT_OUTPUT_FILE) -> Path:
     """
-    Save chunks to a JSONL file.
+    Save chunks to a JSONL file, writing them as they are produced.
     
     Args:
-        chunks: List of chunk dictionaries
+        chunks: Chunk dictionaries (a list, or an iterator such as iter_chunks())
         output_file: Path to output file (relative or absolute)
         
     Returns:
@@ -233,10 +377,9 @@ def save_chunks_to_jsonl(chunks: List[Dict], output_file: str = DEFAULT_OUTPUT_F
     # Create parent directories if they don't exist
     output_path.parent.mkdir(parents=True, exist_ok=True)
     
-    # Write chunks to JSONL file
-    with open(output_path, "w", encoding="utf-8") as f:
-        for chunk in chunks:
-            f.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+    # Stream chunks to the JSONL file through one large buffer
+    with open(output_path, "wb", buffering=WRITE_BUFFER_SIZE) as f:
+        f.writelines(map(_jsonl_line, chunks))
     
     return output_path
 
@@ -254,18 +397,23 @@ if __name__ == "__main__":
         print("\n⚠️  No documents loaded. Exiting.")
         sys.exit(1)
     
-    # Chunk documents
+    # Chunk documents, streaming them straight to the output file
     print(f"\n✂️  Chunking {len(documents)} documents...")
-    chunks = chunk_documents(documents, chunk_size=500, chunk_overlap=50, verbose=True)
+    stats = new_chunking_stats(len(documents))
+    chunks = iter_chunks(documents, chunk_size=500, chunk_overlap=50, verbose=True, stats=stats)
     
-    if not chunks:
+    # Check for at least one chunk before touching the output file
+    first_chunk = next(chunks, None)
+    if first_chunk is None:
+        print_chunking_stats(stats)
         print("\n⚠️  No chunks created. Exiting.")
         sys.exit(1)
     
     # Save chunks
     print(f"\n💾 Saving chunks to file...")
-    output_path = save_chunks_to_jsonl(chunks, DEFAULT_OUTPUT_FILE)
+    output_path = save_chunks_to_jsonl(itertools.chain([first_chunk], chunks), DEFAULT_OUTPUT_FILE)
+    print_chunking_stats(stats)
     
-    print(f"\n✅ Successfully saved {len(chunks)} chunks to:")
+    print(f"\n✅ Successfully saved {stats['total_chunks']} chunks to:")
     print(f"   {output_path}")
     print("=" * 70)
@@ -0,0 +1,96 @@
+"""
+Persistent answer cache shared across worker processes.
+
+A small SQLite key/value table (WAL mode, so concurrent uvicorn workers can
+read while one writes) holding JSON-encoded answers with an expiry time.
+It sits behind RAGChain's in-process caches, so a warm answer survives
+restarts and is shared by every worker instead of each one starting cold.
+
+Cache failures (locked or corrupt database, disk full) never fail a
+request: get() then reports a miss and set() is skipped.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+# Expired rows are purged every this many writes
+PURGE_INTERVAL = 256
+
+
+class DiskAnswerCache:
+    """
+    SQLite-backed key/value cache with per-entry TTL.
+    """
+
+    def __init__(self, path: Path, ttl: int):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: SQLite database file
+            ttl: Seconds an entry stays valid (0 disables expiry)
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(str(self.path), timeout=5.0, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Return the cached value for `key`, or None on a miss or expired entry.
+        """
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value FROM answers WHERE key = ? AND expires_at > ?", (key, time.time())
+                ).fetchone()
+        except sqlite3.Error:
+            return None
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        Store a JSON-serializable value under `key`.
+        """
+        expires_at = time.time() + self.ttl if self.ttl > 0 else float("inf")
+        # default=float: retrieval scores are numpy floats
+        payload = json.dumps(value, default=float)
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO answers (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, payload, expires_at)
+                )
+                self._writes += 1
+                if self._writes % PURGE_INTERVAL == 0:
+                    self._conn.execute("DELETE FROM answers WHERE expires_at <= ?", (time.time(),))
+                self._conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def clear(self) -> None:
+        """Drop all cached entries."""
+        try:
+            with self._lock:
+                self._conn.execute("DELETE FROM answers")
+                self._conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
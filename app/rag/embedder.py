@@ -1,15 +1,44 @@
 import json
+import shutil
 import sys
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
 # Default file paths (relative to project root)
 DEFAULT_CHUNKS_FILE = "data/rag_kb_chunks.jsonl"
 DEFAULT_EMBEDDINGS_OUTPUT = "data/embeddings.npy"
 DEFAULT_METADATA_OUTPUT = "data/metadata.jsonl"
 DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+# MiniLM-sized models comfortably take large batches on both CPU and GPU
+DEFAULT_BATCH_SIZE = 128
+
+
+def _jsonl_bytes(records: List[Dict]) -> bytes:
+    """Encode records as one JSONL buffer (orjson when installed, UTF-8 either way)."""
+    if orjson is not None:
+        lines = [orjson.dumps(record) for record in records]
+    else:
+        lines = [json.dumps(record, ensure_ascii=False).encode("utf-8") for record in records]
+    lines.append(b"")
+    return b"\n".join(lines)
+
+
+# Accepts bytes; orjson.JSONDecodeError subclasses json.JSONDecodeError
+_loads = orjson.loads if orjson is not None else json.loads
+
+
+@lru_cache(maxsize=4)
+def _load_model(model_name: str) -> SentenceTransformer:
+    """Load a SentenceTransformer once per process (reused across generate_embeddings calls)."""
+    return SentenceTransformer(model_name)
 
 
 def get_project_root() -> Path:
@@ -27,29 +56,39 @@ def load_chunks(chunks_file: str = DEFAULT_CHUNKS_FILE) -> List[Dict]:
     Returns:
         List of chunk dictionaries
     """
+    return _load_chunks(_resolve_chunks_path(chunks_file))[0]
+
+
+def _resolve_chunks_path(chunks_file: str) -> Path:
     chunks_path = Path(chunks_file)
     if not chunks_path.is_absolute():
         chunks_path = get_project_root() / chunks_file
     
     if not chunks_path.exists():
         raise FileNotFoundError(f"Chunks file not found: {chunks_path}")
-    
+    return chunks_path
+
+
+def _load_chunks(chunks_path: Path) -> Tuple[List[Dict], int]:
+    """Load chunks, returning them with the number of invalid lines skipped."""
     chunks = []
+    skipped = 0
     try:
-        with open(chunks_path, "r", encoding="utf-8") as f:
+        # Parse raw UTF-8 lines directly, without decoding them to str first
+        with open(chunks_path, "rb") as f:
             for line_num, line in enumerate(f, 1):
-                line = line.strip()
-                if not line:
+                if line.isspace():
                     continue
                 try:
-                    chunks.append(json.loads(line))
+                    chunks.append(_loads(line))
                 except json.JSONDecodeError as e:
                     print(f"⚠️  Warning: Skipping invalid JSON on line {line_num}: {e}")
+                    skipped += 1
                     continue
     except Exception as e:
         raise IOError(f"Error reading chunks file: {e}")
     
-    return chunks
+    return chunks, skipped
 
 
 def generate_embeddings(
@@ -57,7 +96,8 @@ def generate_embeddings(
     embeddings_output: str = DEFAULT_EMBEDDINGS_OUTPUT,
     metadata_output: str = DEFAULT_METADATA_OUTPUT,
     model_name: str = DEFAULT_MODEL_NAME,
-    batch_size: int = 32,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    quantize: bool = True,
     verbose: bool = True
 ) -> tuple[Path, Path]:
     """
@@ -69,6 +109,8 @@ def generate_embeddings(
         metadata_output: Path to output metadata JSONL file
         model_name: Name of the SentenceTransformer model to use
         batch_size: Batch size for encoding
+        quantize: If True, store int8 vectors with a per-row float16 scale;
+            otherwise store float16 vectors
         verbose: If True, print progress information
         
     Returns:
@@ -82,7 +124,8 @@ def generate_embeddings(
     # Load chunks
     if verbose:
         print(f"\n📂 Loading chunks from: {chunks_file}")
-    chunks = load_chunks(chunks_file)
+    chunks_path = _resolve_chunks_path(chunks_file)
+    chunks, skipped_lines = _load_chunks(chunks_path)
     
     if not chunks:
         raise ValueError("No chunks found in file!")
@@ -104,18 +147,36 @@ def generate_embeddings(
     if verbose:
         print(f"📌 Loading embedding model: {model_name}...")
     try:
-        model = SentenceTransformer(model_name)
+        model = _load_model(model_name)
     except Exception as e:
         raise RuntimeError(f"Failed to load model '{model_name}': {e}")
     
+    # Half precision halves activation bandwidth on GPU (CPU kernels stay FP32)
+    use_fp16 = model.device.type == "cuda"
+    if use_fp16:
+        model.half()
+    
+    # Repeated boilerplate (warnings, contact details) is encoded only once:
+    # each chunk maps to the row of its text among the unique texts
+    unique_ids: Dict[str, int] = {}
+    chunk_ids = np.fromiter(
+        (unique_ids.setdefault(text, len(unique_ids)) for text in texts),
+        dtype=np.intp,
+        count=len(texts)
+    )
+    unique_texts = list(unique_ids)
+    
     # Generate embeddings
     if verbose:
-        print(f"⚙️  Generating embeddings for {len(texts)} chunks...")
+        print(f"⚙️  Generating embeddings for {len(texts)} chunks ({len(unique_texts)} unique)...")
         print(f"   Batch size: {batch_size}")
+        print(f"   Precision: {'fp16' if use_fp16 else 'fp32'}")
     
     try:
-        vectors = model.encode(
-            texts,
+        # encode() already batches texts sorted by length (minimal padding per batch)
+        # and returns the vectors in the original order, so no pre-sorting is needed here
+        unique_vectors = model.encode(
+            unique_texts,
             batch_size=batch_size,
             show_progress_bar=verbose,
             convert_to_numpy=True,
@@ -124,12 +185,24 @@ def generate_embeddings(
     except Exception as e:
         raise RuntimeError(f"Error generating embeddings: {e}")
     
-    # Convert to float32 for efficiency
-    vectors = vectors.astype(np.float32)
+    # Fan the unique vectors back out to one row per chunk
+    vectors = unique_vectors[chunk_ids]
     
     if verbose:
         print(f"✅ Generated embeddings shape: {vectors.shape}")
         print(f"   Dimension: {vectors.shape[1]}")
+        print(f"   Storage: {'int8 + per-row scale' if quantize else 'float16'}")
+    
+    # VectorStore keeps these compact in memory and upcasts to float32 only for FAISS/MMR
+    if quantize:
+        # Symmetric per-row int8: row ~= q * scale (about 1/4 of the float32 size)
+        scale = np.abs(vectors).max(axis=1, keepdims=True) / 127.0
+        scale[scale == 0] = 1.0
+        quantized = np.round(vectors / scale).astype(np.int8)
+        scale = scale.astype(np.float16)
+    else:
+        # Half the bytes of float32 on disk and at load time
+        vectors = vectors.astype(np.float16)
     
     # Resolve output paths
     embeddings_path = Path(embeddings_output)
@@ -148,7 +221,12 @@ def generate_embeddings(
     if verbose:
         print(f"\n💾 Saving embeddings to: {embeddings_path}")
     try:
-        np.save(embeddings_path, vectors)
+        if quantize:
+            # Written through a file object so the configured name is kept (np.savez would add .npz)
+            with open(embeddings_path, "wb") as f:
+                np.savez(f, q=quantized, scale=scale)
+        else:
+            np.save(embeddings_path, vectors)
     except Exception as e:
         raise IOError(f"Error saving embeddings: {e}")
     
@@ -156,9 +234,13 @@ def generate_embeddings(
     if verbose:
         print(f"💾 Saving metadata to: {metadata_path}")
     try:
-        with open(metadata_path, "w", encoding="utf-8") as f:
-            for chunk in chunks:
-                f.write(json.dumps(chunk, ensure_ascii=False) + "\n")
+        if skipped_lines:
+            # Re-encode so skipped invalid lines don't misalign metadata with the vectors
+            with open(metadata_path, "wb") as f:
+                f.write(_jsonl_bytes(chunks))
+        elif chunks_path.resolve() != metadata_path.resolve():
+            # Metadata is the chunks file verbatim: copy it instead of re-encoding
+            shutil.copyfile(chunks_path, metadata_path)
     except Exception as e:
         raise IOError(f"Error saving metadata: {e}")
     
@@ -1,11 +1,44 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Dict, Optional, Tuple
 
 KB_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "data", "knowledge_base")
+# Upper bound on concurrent file reads (reads release the GIL while waiting on I/O)
+MAX_READ_WORKERS = 32
+
+
+def _read_markdown(category: str, filename: str, filepath: str) -> Tuple[Optional[Dict[str, str]], Optional[str]]:
+    """
+    Read one markdown file.
+    
+    Returns:
+        (document dictionary, None) on success, or (None, warning message)
+        if the file is empty or unreadable
+    """
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+    except UnicodeDecodeError as e:
+        return None, f"⚠️  Error: Could not decode {filename} - {e}"
+    except Exception as e:
+        return None, f"⚠️  Error: Could not read {filename} - {e}"
+    
+    if not content:
+        return None, f"⚠️  Warning: Empty file skipped: {filename}"
+    
+    return {
+        "filename": filename,
+        "content": content,
+        "category": category,
+        "filepath": filepath
+    }, None
+
 
 def load_markdown_files(verbose=False):
     """
     Load all markdown files from knowledge base directories.
+    Files are read concurrently on a thread pool; documents keep directory order.
     
     Args:
         verbose (bool): If True, print detailed loading information
@@ -26,6 +59,9 @@ def load_markdown_files(verbose=False):
         print(f"Knowledge base directory: {KB_DIR}")
         print(f"Looking for categories: {', '.join(categories)}\n")
 
+    # Collect (category, filename, filepath) for every markdown file first
+    paths = []
+    files_loaded = {}
     for category in categories:
         folder_path = os.path.join(KB_DIR, category)
         
@@ -39,42 +75,14 @@ def load_markdown_files(verbose=False):
                 print(f"⚠️  Warning: {category} is not a directory")
             continue
 
-        files_loaded = 0
         try:
-            for file in os.listdir(folder_path):
-                if file.endswith(".md"):
-                    filepath = os.path.join(folder_path, file)
-                    
-                    # Skip if it's a directory
-                    if os.path.isdir(filepath):
+            # scandir entries cache their file type, so no extra stat per file
+            with os.scandir(folder_path) as entries:
+                for entry in entries:
+                    if not entry.name.endswith(".md") or not entry.is_file():
                         continue
-                    
-                    try:
-                        with open(filepath, "r", encoding="utf-8") as f:
-                            content = f.read().strip()
-                            
-                            if not content:
-                                if verbose:
-                                    print(f"⚠️  Warning: Empty file skipped: {file}")
-                                continue
-                            
-                            documents.append({
-                                "filename": file,
-                                "content": content,
-                                "category": category,
-                                "filepath": filepath
-                            })
-                            files_loaded += 1
-                            
-                    except UnicodeDecodeError as e:
-                        if verbose:
-                            print(f"⚠️  Error: Could not decode {file} - {e}")
-                    except Exception as e:
-                        if verbose:
-                            print(f"⚠️  Error: Could not read {file} - {e}")
-            
-            if verbose:
-                print(f"✓ Loaded {files_loaded} file(s) from {category}/")
+                    paths.append((category, entry.name, entry.path))
+            files_loaded[category] = 0
                 
         except PermissionError as e:
             if verbose:
@@ -83,6 +91,23 @@ def load_markdown_files(verbose=False):
             if verbose:
                 print(f"⚠️  Error: Could not access {category} - {e}")
 
+    if not paths:
+        results = []
+    else:
+        with ThreadPoolExecutor(max_workers=min(MAX_READ_WORKERS, len(paths))) as executor:
+            results = list(executor.map(lambda path: _read_markdown(*path), paths))
+
+    for (category, _, _), (document, warning) in zip(paths, results):
+        if document is not None:
+            documents.append(document)
+            files_loaded[category] += 1
+        elif verbose:
+            print(warning)
+
+    if verbose:
+        for category, count in files_loaded.items():
+            print(f"✓ Loaded {count} file(s) from {category}/")
+
     return documents
 
 if __name__ == "__main__":
@@ -0,0 +1,178 @@
+"""
+ONNX Runtime query encoder.
+
+Drop-in replacement for SentenceTransformer.encode() for mean-pooled models
+such as all-MiniLM-L6-v2. The model is exported to ONNX and dynamically
+quantized to int8 (VNNI / ARM dot-product kernels) as a separate build step,
+so the server only loads the exported model and never imports PyTorch for it:
+
+    python app/rag/onnx_encoder.py --model sentence-transformers/all-MiniLM-L6-v2
+
+Opt-in: requires the optional `optimum[onnxruntime]` package and
+EMBEDDING_BACKEND=onnx. VectorStore falls back to SentenceTransformer when
+the package or the exported model is missing.
+"""
+
+import os
+import platform
+from pathlib import Path
+from typing import List, Union
+
+import numpy as np
+
+# Default export directory, relative to the project root
+DEFAULT_ONNX_CACHE_DIR = "data/onnx"
+# Name ORTQuantizer gives the quantized model (default file suffix "quantized")
+QUANTIZED_MODEL_FILE = "model_quantized.onnx"
+# Matches SentenceTransformer's max_seq_length for all-MiniLM-L6-v2
+DEFAULT_MAX_SEQ_LENGTH = 256
+# Threads per inference (0 lets ONNX Runtime choose)
+INTRA_OP_THREADS = int(os.getenv("ONNX_INTRA_OP_THREADS", str(os.cpu_count() or 0)))
+
+
+def _session_options():
+    """CPU session tuned for single-query latency: full graph fusion, all cores."""
+    import onnxruntime
+
+    options = onnxruntime.SessionOptions()
+    options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.intra_op_num_threads = INTRA_OP_THREADS
+    return options
+
+
+def _quantization_config():
+    """Dynamic int8 quantization config for the host CPU."""
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return AutoQuantizationConfig.arm64(is_static=False, per_channel=False)
+    return AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+
+
+def model_dir_for(model_name: str, cache_dir: Path) -> Path:
+    """Directory holding the exported model for a Hugging Face model id."""
+    return Path(cache_dir) / model_name.replace("/", "__")
+
+
+def export_quantized_model(model_name: str, model_dir: Path) -> Path:
+    """
+    Export a Hugging Face model to ONNX and quantize it to int8.
+
+    Args:
+        model_name: Hugging Face model id
+        model_dir: Directory to write the ONNX models and tokenizer to
+
+    Returns:
+        Path to the quantized ONNX model
+    """
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from transformers import AutoTokenizer
+
+    model_dir.mkdir(parents=True, exist_ok=True)
+    model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+    model.save_pretrained(model_dir)
+    AutoTokenizer.from_pretrained(model_name).save_pretrained(model_dir)
+
+    quantizer = ORTQuantizer.from_pretrained(model)
+    quantizer.quantize(save_dir=model_dir, quantization_config=_quantization_config())
+    return model_dir / QUANTIZED_MODEL_FILE
+
+
+class OnnxSentenceEncoder:
+    """
+    Int8 ONNX Runtime encoder with SentenceTransformer's encode() interface.
+    """
+
+    def __init__(self, model_name: str, cache_dir: Path, max_seq_length: int = DEFAULT_MAX_SEQ_LENGTH):
+        """
+        Load the quantized model exported by export_quantized_model().
+
+        Args:
+            model_name: Hugging Face model id
+            cache_dir: Directory holding exported models
+            max_seq_length: Maximum tokens per input (longer inputs are truncated)
+
+        Raises:
+            FileNotFoundError: If the model has not been exported yet
+        """
+        model_dir = model_dir_for(model_name, cache_dir)
+        if not (model_dir / QUANTIZED_MODEL_FILE).exists():
+            raise FileNotFoundError(
+                f"No exported ONNX model in {model_dir}; run "
+                f"'python app/rag/onnx_encoder.py --model {model_name}' first"
+            )
+
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        self.max_seq_length = max_seq_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.model = ORTModelForFeatureExtraction.from_pretrained(
+            model_dir,
+            file_name=QUANTIZED_MODEL_FILE,
+            provider="CPUExecutionProvider",
+            session_options=_session_options()
+        )
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        **kwargs
+    ) -> np.ndarray:
+        """
+        Encode sentences into mean-pooled float32 embeddings.
+
+        Args:
+            sentences: Sentence or list of sentences
+            batch_size: Sentences per forward pass
+            convert_to_numpy: Accepted for compatibility; output is always numpy
+            normalize_embeddings: Whether to L2-normalize the embeddings
+
+        Returns:
+            Array of shape (dim,) for a single sentence, else (len(sentences), dim)
+        """
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            features = self.tokenizer(
+                sentences[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            token_embeddings = self.model(**features).last_hidden_state
+
+            # Mean pooling over non-padding tokens
+            mask = features["attention_mask"][..., None].astype(np.float32)
+            summed = (token_embeddings * mask).sum(axis=1)
+            batches.append(summed / np.clip(mask.sum(axis=1), 1e-9, None))
+
+        dim = self.model.config.hidden_size
+        embeddings = np.concatenate(batches).astype(np.float32) if batches else np.empty((0, dim), np.float32)
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings /= np.clip(norms, 1e-12, None)
+
+        return embeddings[0] if single else embeddings
+
+
+# Build step: export and quantize the query encoder
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export a query encoder to int8 ONNX")
+    parser.add_argument("--model", "-m", type=str, default="sentence-transformers/all-MiniLM-L6-v2", help="Hugging Face model id")
+    parser.add_argument("--output-dir", "-o", type=str, default=None, help=f"Export directory (default: <project root>/{DEFAULT_ONNX_CACHE_DIR})")
+
+    args = parser.parse_args()
+    output_dir = Path(args.output_dir) if args.output_dir else Path(__file__).resolve().parents[2] / DEFAULT_ONNX_CACHE_DIR
+
+    model_path = export_quantized_model(args.model, model_dir_for(args.model, output_dir))
+    print(f"Exported {args.model} -> {model_path}")
@@ -6,27 +6,31 @@ It uses lazy initialization to avoid loading everything at import time.
 """
 
 import sys
+import threading
 from pathlib import Path
 from typing import Optional, Dict
 
 # Handle imports
 try:
     from .rag_chain import RAGChain
+    from .vector_store import reset_shared_stores
 except ImportError:
-    # Fallback: add parent directory to path
-    parent_dir = Path(__file__).parent.parent
-    if str(parent_dir) not in sys.path:
-        sys.path.insert(0, str(parent_dir))
-    try:
-        from app.rag.rag_chain import RAGChain
-    except ImportError:
-        # Last resort: try relative import
-        sys.path.insert(0, str(Path(__file__).parent))
-        from rag_chain import RAGChain
+    # Direct execution: make the project root importable so rag_chain loads as
+    # part of the app.rag package
+    project_root = Path(__file__).parent.parent.parent
+    if str(project_root) not in sys.path:
+        sys.path.insert(0, str(project_root))
+    from app.rag.rag_chain import RAGChain
+    from app.rag.vector_store import reset_shared_stores
 
 
 # Global RAG instance (lazy initialization)
 _rag_instance: Optional[RAGChain] = None
+# Serializes initialization so concurrent first callers build only one RAGChain
+_rag_lock = threading.Lock()
+
+# Bumped whenever the RAG instance is reset (e.g. after re-indexing the corpus)
+_corpus_version = 0
 
 
 def get_rag_instance(verbose: bool = False) -> RAGChain:
@@ -41,18 +45,43 @@ def get_rag_instance(verbose: bool = False) -> RAGChain:
     """
     global _rag_instance
     
-    if _rag_instance is None:
-        try:
-            _rag_instance = RAGChain(verbose=verbose)
-        except Exception as e:
-            raise RuntimeError(f"Failed to initialize RAG chain: {e}")
+    rag = _rag_instance
+    if rag is None:
+        with _rag_lock:
+            # Re-check: another thread may have finished initializing while we waited
+            rag = _rag_instance
+            if rag is None:
+                try:
+                    rag = RAGChain(verbose=verbose)
+                except Exception as e:
+                    raise RuntimeError(f"Failed to initialize RAG chain: {e}")
+                rag.corpus_version = _corpus_version
+                _rag_instance = rag
     
-    return _rag_instance
+    return rag
+
+
+def warmup(verbose: bool = False) -> RAGChain:
+    """
+    Eagerly initialize the RAG instance (FAISS index, metadata, embedding model, LLM client).
+    
+    Meant to be called at application startup so the first query doesn't
+    pay the initialization cost.
+    
+    Args:
+        verbose: If True, print initialization messages
+        
+    Returns:
+        RAGChain instance
+    """
+    # RAGChain warms its vector store (index, metadata, embeddings, one encode)
+    return get_rag_instance(verbose=verbose)
 
 
 def ask_question(question: str, k: int = 5, verbose: bool = False) -> str:
     """
     Query the RAG system and return AI answer.
+    Answers are cached by the RAG chain (see RAGChain.ask).
     
     Args:
         question: Question string
@@ -78,6 +107,7 @@ def ask_question(question: str, k: int = 5, verbose: bool = False) -> str:
 def ask_question_with_sources(question: str, k: int = 5, verbose: bool = False) -> Dict:
     """
     Query the RAG system and return answer with source information.
+    Results are cached by the RAG chain (see RAGChain.ask_with_sources).
     
     Args:
         question: Question string
@@ -103,9 +133,15 @@ def ask_question_with_sources(question: str, k: int = 5, verbose: bool = False)
 def reset_rag_instance():
     """
     Reset the global RAG instance (useful for testing or reinitialization).
+    
+    Also bumps the corpus version so answer caches keyed on it are invalidated,
+    and drops the shared vector stores so a rebuilt index is reloaded.
     """
-    global _rag_instance
-    _rag_instance = None
+    global _rag_instance, _corpus_version
+    with _rag_lock:
+        _rag_instance = None
+        _corpus_version += 1
+        reset_shared_stores()
 
 
 # Quick test
@@ -6,34 +6,139 @@ This module provides a RAG (Retrieval-Augmented Generation) chain that:
 2. Uses Google Gemini LLM to generate answers based on retrieved context
 """
 
+import asyncio
+import hashlib
 import os
-import sys
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
 
-# Load environment variables
+# Load environment variables (before the imports below read their settings)
 load_dotenv()
 
-# Workaround for LangChain 1.0+ compatibility
-# ChatGoogleGenerativeAI tries to access langchain.verbose which doesn't exist
-try:
-    import langchain
-    if not hasattr(langchain, 'verbose'):
-        langchain.verbose = False
-except ImportError:
-    pass
+import numpy as np
 
-# Import LangChain components
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.prompts import PromptTemplate
+from app.agent.semantic_cache import SemanticCache
+from .disk_cache import DiskAnswerCache
+from .vector_store import (
+    VectorStore,
+    DEFAULT_EMBEDDINGS_FILE,
+    DEFAULT_METADATA_FILE,
+    DEFAULT_FAISS_INDEX_FILE,
+    get_project_root,
+    get_shared_store,
+)
 
-# Import VectorStore for retrieval
-try:
-    from .vector_store import VectorStore, DEFAULT_EMBEDDINGS_FILE, DEFAULT_METADATA_FILE, DEFAULT_FAISS_INDEX_FILE
-except ImportError:
-    sys.path.insert(0, str(Path(__file__).parent))
-    from vector_store import VectorStore, DEFAULT_EMBEDDINGS_FILE, DEFAULT_METADATA_FILE, DEFAULT_FAISS_INDEX_FILE
+# Set once the LangChain compatibility shim has run (see _patch_langchain)
+_langchain_patched = False
+
+
+def _patch_langchain() -> None:
+    """
+    Workaround for LangChain 1.0+ compatibility: ChatGoogleGenerativeAI tries
+    to access langchain.verbose, which doesn't exist. Runs once per process.
+    """
+    global _langchain_patched
+    if _langchain_patched:
+        return
+    try:
+        import langchain
+        if not hasattr(langchain, 'verbose'):
+            langchain.verbose = False
+    except ImportError:
+        pass
+    _langchain_patched = True
+
+
+# Prefix of the answer returned when generation fails
+ANSWER_ERROR_PREFIX = "Error generating answer: "
+# Entries per answer cache (ask / ask_with_sources)
+ANSWER_CACHE_SIZE = int(os.getenv("RAG_ANSWER_CACHE_SIZE", "1024"))
+# Answer cache shared by all worker processes; set the path to "" to disable
+ANSWER_DISK_CACHE_PATH = os.getenv("RAG_DISK_CACHE_PATH", "data/answer_cache.sqlite3")
+ANSWER_DISK_CACHE_TTL = int(os.getenv("RAG_DISK_CACHE_TTL", str(24 * 60 * 60)))  # default 1 day
+# Retrieval: pick k of RAG_MMR_FETCH_K candidates by maximal marginal relevance,
+# then drop trailing chunks beyond RAG_MAX_CONTEXT_CHARS of context
+MMR_FETCH_K = int(os.getenv("RAG_MMR_FETCH_K", "10"))
+MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.5"))
+MAX_CONTEXT_CHARS = int(os.getenv("RAG_MAX_CONTEXT_CHARS", "4000"))
+# Minimum cosine similarity for answering a paraphrased question from the semantic cache
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("RAG_SEMANTIC_CACHE_THRESHOLD", "0.95"))
+# ask_with_sources() result when retrieval finds nothing
+NO_RESULTS_ANSWER = {
+    "answer": "I couldn't find relevant information to answer your question.",
+    "sources": [],
+    "context": ""
+}
+
+
+def _normalize_question(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+class QuestionKey(str):
+    """
+    Cache key for a question: equal to (and hashed as) the normalized text,
+    while `original` keeps the question as asked. Embeddings and prompts use
+    the original, so product names and SKUs keep their casing.
+    """
+    
+    original: str
+    
+    def __new__(cls, question: str) -> "QuestionKey":
+        key = super().__new__(cls, _normalize_question(question))
+        key.original = question.strip()
+        return key
+
+# Answering instructions shared by the single-turn and conversational prompts
+ANSWER_GUIDELINES = (
+    "You are a helpful and professional AI assistant for NeuraHome Systems, "
+    "a smart home technology company.\n\n"
+    "Your role is to answer customer questions based on the provided context from "
+    "product manuals, FAQs, troubleshooting guides, advanced settings guides, user management guides, "
+    "edge cases documentation, and policy documents.\n\n"
+    "Guidelines:\n"
+    "- Answer questions clearly, concisely, and helpfully\n"
+    "- Only use information from the provided context\n"
+    "- Structure answers with clear steps, bullet points, or numbered lists when appropriate\n"
+    "- Include specific details like model numbers, error codes, settings paths, or step-by-step instructions\n\n"
+    "When the context contains the answer:\n"
+    "- Provide a complete, detailed answer\n"
+    "- Include all relevant information from the context\n"
+    "- Reference specific sections or features when helpful\n"
+    "- If troubleshooting, provide step-by-step solutions in order\n\n"
+    "When the context doesn't fully answer the question:\n"
+    "- Acknowledge what specific information is missing\n"
+    "- Provide ANY related information from the context that might be helpful, even if not a direct answer\n"
+    "- Suggest what the user might try based on similar information in the context\n"
+    "- Mention that more detailed instructions may be available in the NeuraHome mobile app\n"
+    "- Provide contact information for support: support@neurahome.com or +1-800-NEURA-HOME\n"
+    "- Be helpful and constructive, not dismissive\n\n"
+    "Additional guidelines:\n"
+    "- Be friendly, professional, and empathetic\n"
+    "- If asked about troubleshooting, provide comprehensive step-by-step solutions\n"
+    "- Include relevant technical details, specifications, or error codes when available\n"
+    "- If multiple solutions exist, present them in order from simplest to most complex\n"
+    "- For setup questions, provide clear step-by-step instructions\n"
+    "- For feature questions, explain how to access and use the feature\n"
+    "- Always end with helpful next steps or support contact if the answer is incomplete\n\n"
+)
+
+# Single-turn prompt for ask() / ask_with_sources()
+ANSWER_PROMPT = ANSWER_GUIDELINES + "Context:\n{context}\n\nQuestion: {question}\n\nAnswer:"
+# Static fragments around the two fields, so formatting is a plain join
+_PROMPT_HEAD, _, _rest = ANSWER_PROMPT.partition("{context}")
+_PROMPT_MID, _, _PROMPT_TAIL = _rest.partition("{question}")
+del _rest
+
+
+# Part of the disk cache key, so editing the prompt invalidates stored answers
+PROMPT_VERSION = hashlib.sha256(ANSWER_PROMPT.encode("utf-8")).hexdigest()[:16]
+
+
+def _format_prompt(context: str, question: str) -> str:
+    return "".join((_PROMPT_HEAD, context, _PROMPT_MID, question, _PROMPT_TAIL))
 
 
 class RAGChain:
@@ -48,7 +153,8 @@ class RAGChain:
         index_file: str = DEFAULT_FAISS_INDEX_FILE,
         model_name: str = "gemini-2.5-flash",
         temperature: float = 0.2,
-        verbose: bool = False
+        verbose: bool = False,
+        vector_store: Optional[VectorStore] = None
     ):
         """
         Initialize RAG Chain.
@@ -60,8 +166,19 @@ class RAGChain:
             model_name: Gemini model name
             temperature: LLM temperature (0.0-1.0)
             verbose: If True, print initialization messages
+            vector_store: Store to retrieve from (defaults to the process-wide
+                shared store for the given files)
         """
+        # Deferred so importing this module stays cheap; the LLM SDKs load here
+        _patch_langchain()
+        import google.generativeai as genai
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+        
         self.verbose = verbose
+        self.model_name = model_name
+        # Identifies the indexed corpus; answer caches are invalidated when it changes
+        self.corpus_version = 0
         
         # Check for API key
         api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
@@ -78,11 +195,9 @@ class RAGChain:
         if self.verbose:
             print("📌 Loading vector store...")
         try:
-            self.vector_store = VectorStore(embeddings_file, metadata_file, index_file)
+            self.vector_store = vector_store or get_shared_store(embeddings_file, metadata_file, index_file)
             # Pre-load components
-            self.vector_store.load_index()
-            self.vector_store.load_metadata()
-            self.vector_store.load_model()
+            self.vector_store.warm_up()
         except Exception as e:
             raise RuntimeError(f"Failed to initialize vector store: {e}")
         
@@ -90,6 +205,12 @@ class RAGChain:
         if self.verbose:
             print(f"⚙️  Loading Gemini LLM ({model_name})...")
         try:
+            # Single-turn answers call the Gemini SDK directly
+            genai.configure(api_key=api_key)
+            self.gemini = genai.GenerativeModel(
+                model_name,
+                generation_config={"temperature": temperature}
+            )
             self.llm = ChatGoogleGenerativeAI(
                 model=model_name,
                 temperature=temperature,
@@ -98,66 +219,68 @@ class RAGChain:
         except Exception as e:
             raise RuntimeError(f"Failed to initialize Gemini LLM: {e}")
         
-        # Create prompt template
-        self.prompt_template = PromptTemplate(
-            input_variables=["context", "question"],
-            template=(
-                "You are a helpful and professional AI assistant for NeuraHome Systems, "
-                "a smart home technology company.\n\n"
-                "Your role is to answer customer questions based on the provided context from "
-                "product manuals, FAQs, troubleshooting guides, advanced settings guides, user management guides, "
-                "edge cases documentation, and policy documents.\n\n"
-                "Guidelines:\n"
-                "- Answer questions clearly, concisely, and helpfully\n"
-                "- Only use information from the provided context\n"
-                "- Structure answers with clear steps, bullet points, or numbered lists when appropriate\n"
-                "- Include specific details like model numbers, error codes, settings paths, or step-by-step instructions\n\n"
-                "When the context contains the answer:\n"
-                "- Provide a complete, detailed answer\n"
-                "- Include all relevant information from the context\n"
-                "- Reference specific sections or features when helpful\n"
-                "- If troubleshooting, provide step-by-step solutions in order\n\n"
-                "When the context doesn't fully answer the question:\n"
-                "- Acknowledge what specific information is missing\n"
-                "- Provide ANY related information from the context that might be helpful, even if not a direct answer\n"
-                "- Suggest what the user might try based on similar information in the context\n"
-                "- Mention that more detailed instructions may be available in the NeuraHome mobile app\n"
-                "- Provide contact information for support: support@neurahome.com or +1-800-NEURA-HOME\n"
-                "- Be helpful and constructive, not dismissive\n\n"
-                "Additional guidelines:\n"
-                "- Be friendly, professional, and empathetic\n"
-                "- If asked about troubleshooting, provide comprehensive step-by-step solutions\n"
-                "- Include relevant technical details, specifications, or error codes when available\n"
-                "- If multiple solutions exist, present them in order from simplest to most complex\n"
-                "- For setup questions, provide clear step-by-step instructions\n"
-                "- For feature questions, explain how to access and use the feature\n"
-                "- Always end with helpful next steps or support contact if the answer is incomplete\n\n"
-                "Context:\n{context}\n\n"
-                "Question: {question}\n\n"
-                "Answer:"
-            )
-        )
+        # Conversational prompt: history and retrieved knowledge are passed as
+        # structured parts and rendered once into chat messages
+        self.chat_prompt = ChatPromptTemplate.from_messages([
+            ("system", ANSWER_GUIDELINES + "Context:\n{knowledge}"),
+            MessagesPlaceholder("history", optional=True),
+            ("human", "{question}"),
+        ])
         
         # Create chain using LangChain 1.0+ API
         # In LangChain 1.0+, we use prompt | llm pattern instead of LLMChain
-        self.chain = self.prompt_template | self.llm
+        self.chat_chain = self.chat_prompt | self.llm
+        
+        # Exact-match answer caches; corpus_version is part of the key so
+        # re-indexing invalidates old answers. Exceptions are never cached.
+        self._cached_answer = lru_cache(maxsize=ANSWER_CACHE_SIZE)(self._generate_answer)
+        self._cached_answer_with_sources = lru_cache(maxsize=ANSWER_CACHE_SIZE)(self._generate_answer_with_sources)
+        # Paraphrase caches over query embeddings, one per (method, k)
+        self._semantic_caches: Dict[Tuple[str, int], SemanticCache] = {}
+        # Cross-process cache; keyed on the index file's mtime/size so a rebuilt
+        # index (picked up on restart or reset) invalidates old answers
+        index_stat = self.vector_store.index_file.stat()
+        self._index_fingerprint = f"{index_stat.st_mtime_ns}:{index_stat.st_size}"
+        self._disk_cache: Optional[DiskAnswerCache] = None
+        if ANSWER_DISK_CACHE_PATH:
+            disk_cache_path = Path(ANSWER_DISK_CACHE_PATH)
+            if not disk_cache_path.is_absolute():
+                disk_cache_path = get_project_root() / disk_cache_path
+            try:
+                self._disk_cache = DiskAnswerCache(disk_cache_path, ANSWER_DISK_CACHE_TTL)
+            except Exception as e:
+                print(f"⚠️  Warning: disk answer cache unavailable: {e}")
         
         if self.verbose:
             print("✅ RAG Chain initialized successfully!")
     
-    def retrieve(self, query: str, k: int = 5) -> str:
+    def retrieve(
+        self,
+        query: str,
+        k: int = 5,
+        query_embedding: Optional[np.ndarray] = None,
+        raise_errors: bool = False
+    ) -> str:
         """
         Retrieve relevant context chunks for a query.
         
         Args:
             query: Query string
             k: Number of chunks to retrieve
+            query_embedding: Optional precomputed embedding of `query` from
+                vector_store.encode_query (float32, L2-normalized, shape (1, dim));
+                skips encoding the query again
+            raise_errors: If True, re-raise retrieval failures instead of
+                returning an error string as the context (answer paths that
+                cache their result must not cache an answer built on it)
             
         Returns:
             Formatted context string with retrieved chunks
         """
         try:
-            results = self.vector_store.search(query, k=k, return_distances=True)
+            if query_embedding is None:
+                query_embedding = self.vector_store.encode_query(query)
+            results = self._search(query_embedding, k)[0]
             
             if not results:
                 return "No relevant context found."
@@ -183,12 +306,17 @@ class RAGChain:
         except Exception as e:
             if self.verbose:
                 print(f"⚠️  Error during retrieval: {e}")
+            if raise_errors:
+                raise
             return f"Error retrieving context: {str(e)}"
     
     def ask(self, question: str, k: int = 5) -> str:
         """
         Ask a question and get an answer using RAG.
         
+        Answers are cached per normalized question (lowercased, whitespace
+        collapsed), k and corpus version; failed generations are not cached.
+        
         Args:
             question: Question string
             k: Number of context chunks to retrieve
@@ -197,89 +325,287 @@ class RAGChain:
             Answer string
         """
         try:
-            # Retrieve relevant context
-            context = self.retrieve(question, k=k)
-            
-            # Generate answer using LLM (LangChain 1.0+ API)
-            response = self.chain.invoke({"context": context, "question": question})
-            # Extract content from response (handles both string and AIMessage)
-            if hasattr(response, 'content'):
-                answer = response.content
-            else:
-                answer = str(response)
+            return self._cached_answer(QuestionKey(question), k, self.corpus_version)
+        except Exception as e:
+            error_msg = f"{ANSWER_ERROR_PREFIX}{str(e)}"
+            if self.verbose:
+                print(f"❌ {error_msg}")
+            return error_msg
+    
+    def ask_stream(self, question: str, k: int = 5) -> Iterator[str]:
+        """
+        Ask a question and yield the answer as Gemini generates it.
+        
+        Shares ask()'s semantic cache: a cached answer is yielded whole, and a
+        completed non-empty streamed answer is added to the cache. Unlike ask(),
+        the stream path does not consult or fill the exact-match (lru) and disk
+        answer caches. On failure the error message is yielded as the final piece.
+        
+        Args:
+            question: Question string
+            k: Number of context chunks to retrieve
             
-            return answer.strip()
+        Yields:
+            Answer text pieces
+        """
+        question = question.strip()
+        pieces = []
+        try:
+            semantic_cache = self._semantic_cache("ask", k)
+            query_embedding = self.vector_store.encode_query(question)
+            cached = semantic_cache.lookup(query_embedding)
+            if cached is not None:
+                yield cached["answer"]
+                return
             
+            context = self.retrieve(question, k=k, query_embedding=query_embedding, raise_errors=True)
+            for chunk in self.gemini.generate_content(_format_prompt(context, question), stream=True):
+                # Chunks without parts (e.g. a final safety-rating chunk) have no text
+                if chunk.parts:
+                    pieces.append(chunk.text)
+                    yield chunk.text
         except Exception as e:
-            error_msg = f"Error generating answer: {str(e)}"
+            error_msg = f"{ANSWER_ERROR_PREFIX}{str(e)}"
             if self.verbose:
                 print(f"❌ {error_msg}")
-            return error_msg
+            yield error_msg
+            return
+        
+        answer = "".join(pieces).strip()
+        # A blocked or safety-only response streams no text; don't replay it to paraphrases
+        if answer:
+            semantic_cache.add(query_embedding, {"message": question, "answer": answer, "tool_used": "rag"})
+    
+    def _semantic_cache(self, method: str, k: int) -> SemanticCache:
+        cache = self._semantic_caches.get((method, k))
+        if cache is None:
+            cache = self._semantic_caches.setdefault(
+                (method, k), SemanticCache(threshold=SEMANTIC_CACHE_THRESHOLD)
+            )
+        return cache
+    
+    def _disk_key(self, method: str, question: str, k: int) -> str:
+        raw = "|".join((self.model_name, PROMPT_VERSION, self._index_fingerprint, method, str(k), question))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    
+    def _disk_get(self, key: str):
+        return self._disk_cache.get(key) if self._disk_cache is not None else None
+    
+    def _disk_set(self, key: str, value) -> None:
+        if self._disk_cache is not None:
+            self._disk_cache.set(key, value)
+    
+    def _generate_answer(self, key: QuestionKey, k: int, corpus_version: int) -> str:
+        # Answer computed earlier, possibly by another worker
+        disk_key = self._disk_key("ask", key, k)
+        question = key.original
+        stored = self._disk_get(disk_key)
+        if stored is not None:
+            return stored
+        
+        # Reuse the answer of a near-identical earlier question
+        semantic_cache = self._semantic_cache("ask", k)
+        query_embedding = self.vector_store.encode_query(question)
+        cached = semantic_cache.lookup(query_embedding)
+        if cached is not None:
+            return cached["answer"]
+        
+        # Retrieve relevant context (reusing the embedding computed for the cache probe)
+        # (raises on failure, so ask() returns an uncached error instead)
+        context = self.retrieve(question, k=k, query_embedding=query_embedding, raise_errors=True)
+        
+        # Generate answer using LLM
+        response = self.gemini.generate_content(_format_prompt(context, question))
+        answer = self._response_text(response)
+        semantic_cache.add(query_embedding, {"message": question, "answer": answer, "tool_used": "rag"})
+        self._disk_set(disk_key, answer)
+        return answer
     
     def ask_with_sources(self, question: str, k: int = 5) -> Dict:
         """
         Ask a question and return answer with source information.
         
+        Results are cached like ask(); each call returns its own copy.
+        
         Args:
             question: Question string
             k: Number of context chunks to retrieve
             
         Returns:
             Dictionary with 'answer', 'sources', and 'context' keys
+            (plus 'error' if generation failed)
         """
         try:
-            # Retrieve relevant context with metadata
-            results = self.vector_store.search(question, k=k, return_distances=True)
-            
-            if not results:
-                return {
-                    "answer": "I couldn't find relevant information to answer your question.",
-                    "sources": [],
-                    "context": ""
-                }
-            
-            # Format context
-            chunks = []
-            sources = []
-            for result in results:
-                content = result['content']
-                title = result.get('title', '')
-                metadata = result.get('metadata', {})
-                
-                chunks.append(content)
-                
-                # Collect source information
-                source_info = {
-                    "title": title,
-                    "score": result.get('score', 0.0),
-                    "category": metadata.get('category', ''),
-                    "source_file": metadata.get('source', ''),
-                    "section": metadata.get('section', '')
-                }
-                sources.append(source_info)
-            
-            context = "\n\n---\n\n".join(chunks)
-            
-            # Generate answer (LangChain 1.0+ API)
-            response = self.chain.invoke({"context": context, "question": question})
-            # Extract content from response (handles both string and AIMessage)
-            if hasattr(response, 'content'):
-                answer = response.content
-            else:
-                answer = str(response)
-            
-            return {
-                "answer": answer.strip(),
-                "sources": sources,
-                "context": context
-            }
-            
+            result = self._cached_answer_with_sources(QuestionKey(question), k, self.corpus_version)
         except Exception as e:
-            error_msg = f"Error generating answer: {str(e)}"
+            error_msg = f"{ANSWER_ERROR_PREFIX}{str(e)}"
             if self.verbose:
                 print(f"❌ {error_msg}")
             return {
                 "answer": error_msg,
                 "sources": [],
-                "context": ""
+                "context": "",
+                "error": str(e)
             }
+        # Copy so callers can't mutate the cached entry
+        return {**result, "sources": [dict(source) for source in result["sources"]]}
+    
+    def _generate_answer_with_sources(self, key: QuestionKey, k: int, corpus_version: int) -> Dict:
+        # Answer computed earlier, possibly by another worker
+        disk_key = self._disk_key("ask_with_sources", key, k)
+        question = key.original
+        stored = self._disk_get(disk_key)
+        if stored is not None:
+            return stored
+        
+        # Reuse the answer of a near-identical earlier question
+        semantic_cache = self._semantic_cache("ask_with_sources", k)
+        query_embedding = self.vector_store.encode_query(question)
+        cached = semantic_cache.lookup(query_embedding)
+        if cached is not None:
+            return {"answer": cached["answer"], "sources": cached["sources"], "context": cached["context"]}
+        
+        # Retrieve relevant context with metadata (reusing the embedding computed for the cache probe)
+        results = self._search(query_embedding, k)[0]
+        
+        if not results:
+            return dict(NO_RESULTS_ANSWER)
+        
+        context, sources = self._format_results(results)
+        
+        # Generate answer
+        response = self.gemini.generate_content(_format_prompt(context, question))
+        
+        result = {
+            "answer": self._response_text(response),
+            "sources": sources,
+            "context": context
+        }
+        semantic_cache.add(query_embedding, {"message": question, "tool_used": "rag", **result})
+        self._disk_set(disk_key, result)
+        return result
+    
+    def _search(self, query_vectors: np.ndarray, k: int) -> List[List[Dict]]:
+        """
+        Retrieve up to k diverse chunks per query within the context budget.
+        
+        Args:
+            query_vectors: Normalized query vectors of shape (n, dim)
+            k: Maximum number of chunks per query
+            
+        Returns:
+            One list of search results per query
+        """
+        batch_results = self.vector_store.search_mmr_by_vectors(
+            query_vectors, k=k, fetch_k=MMR_FETCH_K, lambda_mult=MMR_LAMBDA, return_distances=True
+        )
+        capped = []
+        for results in batch_results:
+            # Always keep the best chunk, then stop at the first one over budget
+            total = 0
+            for n, result in enumerate(results):
+                total += len(result["content"])
+                if n and total > MAX_CONTEXT_CHARS:
+                    results = results[:n]
+                    break
+            capped.append(results)
+        return capped
+    
+    def _format_results(self, results: List[Dict]) -> Tuple[str, List[Dict]]:
+        """Build the prompt context and source list from search results."""
+        sources = self.vector_store.get_sources([result["id"] for result in results])
+        for source, result in zip(sources, results):
+            source["score"] = result.get('score', 0.0)
+        
+        return "\n\n---\n\n".join(result['content'] for result in results), sources
+    
+    @staticmethod
+    def _response_text(response) -> str:
+        # Raises ValueError if Gemini returned no text (e.g. a blocked prompt)
+        return response.text.strip()
+    
+    async def ask_batch(self, questions: List[str], k: int = 5) -> List[Dict]:
+        """
+        Answer several questions concurrently, returning ask_with_sources() results.
+        
+        All questions are embedded in one encoder call and searched with one
+        batched FAISS call (both off the event loop); the Gemini calls for
+        questions not answered by the semantic cache then run concurrently.
+        
+        Args:
+            questions: Question strings
+            k: Number of context chunks to retrieve per question
+            
+        Returns:
+            One result dictionary per question, in order (with 'error' set for
+            questions whose generation failed)
+        """
+        if not questions:
+            return []
+        
+        semantic_cache = self._semantic_cache("ask_with_sources", k)
+        embeddings = await asyncio.to_thread(self.vector_store.encode_queries, questions)
+        
+        answers: List[Optional[Dict]] = [None] * len(questions)
+        misses = []
+        for i in range(len(questions)):
+            cached = semantic_cache.lookup(embeddings[i:i + 1])
+            if cached is not None:
+                answers[i] = {"answer": cached["answer"], "sources": cached["sources"], "context": cached["context"]}
+            else:
+                misses.append(i)
+        
+        if misses:
+            batch_results = await asyncio.to_thread(
+                self._search, embeddings[misses], k
+            )
+            prompts = {i: self._format_results(results) for i, results in zip(misses, batch_results) if results}
+            responses = await asyncio.gather(
+                *(self.gemini.generate_content_async(_format_prompt(prompts[i][0], questions[i])) for i in prompts),
+                return_exceptions=True
+            )
+            for i, response in zip(prompts, responses):
+                if not isinstance(response, Exception):
+                    try:
+                        response = self._response_text(response)
+                    except Exception as e:
+                        response = e
+                if isinstance(response, Exception):
+                    error_msg = f"{ANSWER_ERROR_PREFIX}{str(response)}"
+                    if self.verbose:
+                        print(f"❌ {error_msg}")
+                    answers[i] = {"answer": error_msg, "sources": [], "context": "", "error": str(response)}
+                    continue
+                context, sources = prompts[i]
+                answers[i] = {"answer": response, "sources": sources, "context": context}
+                semantic_cache.add(embeddings[i:i + 1], {"message": questions[i], "tool_used": "rag", **answers[i]})
+            for i in misses:
+                if answers[i] is None:
+                    answers[i] = dict(NO_RESULTS_ANSWER)
+        
+        # Copies, so callers can't mutate cached entries
+        return [{**answer, "sources": [dict(source) for source in answer["sources"]]} for answer in answers]
+    
+    def cache_clear(self) -> None:
+        """Drop all cached answers (exact, semantic and on disk)."""
+        self._cached_answer.cache_clear()
+        self._cached_answer_with_sources.cache_clear()
+        for cache in list(self._semantic_caches.values()):
+            cache.clear()
+        if self._disk_cache is not None:
+            self._disk_cache.clear()
+    
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Return hit/miss counters of the exact-match answer caches, for monitoring hit rate.
+        
+        Returns:
+            {"ask": {...}, "ask_with_sources": {...}} with hits, misses,
+            size and maxsize for each cache (exact-match misses include
+            semantic-cache hits)
+        """
+        stats = {}
+        for name, cached in (("ask", self._cached_answer), ("ask_with_sources", self._cached_answer_with_sources)):
+            info = cached.cache_info()
+            stats[name] = {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+        return stats
@@ -7,14 +7,19 @@ It can be used to verify that embeddings, index, and metadata are working correc
 
 import sys
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional
+
+import numpy as np
 
 # Import VectorStore class for proper testing
 try:
-    from .vector_store import VectorStore, DEFAULT_EMBEDDINGS_FILE, DEFAULT_METADATA_FILE, DEFAULT_FAISS_INDEX_FILE
+    from .vector_store import VectorStore, DEFAULT_EMBEDDINGS_FILE, DEFAULT_METADATA_FILE, DEFAULT_FAISS_INDEX_FILE, get_project_root
 except ImportError:
     sys.path.insert(0, str(Path(__file__).parent))
-    from vector_store import VectorStore, DEFAULT_EMBEDDINGS_FILE, DEFAULT_METADATA_FILE, DEFAULT_FAISS_INDEX_FILE
+    from vector_store import VectorStore, DEFAULT_EMBEDDINGS_FILE, DEFAULT_METADATA_FILE, DEFAULT_FAISS_INDEX_FILE, get_project_root
+
+# Precomputed TEST_QUERIES embeddings (written with --save-query-embeddings)
+DEFAULT_QUERY_EMBEDDINGS_FILE = "data/test_query_embeddings.npz"
 
 
 # Test queries covering different categories
@@ -62,40 +67,7 @@ def test_single_query(store: VectorStore, query: str, k: int = 5, verbose: bool
         results = store.search(query, k=k, return_distances=True)
         
         if verbose:
-            print(f"\n{'='*70}")
-            print(f"🔍 Query: {query}")
-            print(f"{'='*70}")
-            
-            if not results:
-                print("⚠️  No results found!")
-                return results
-            
-            print(f"\n📋 Top {len(results)} results:\n")
-            
-            for result in results:
-                print(f"Rank #{result['rank']}")
-                if 'score' in result:
-                    print(f"  Score: {result['score']:.4f} (Distance: {result['distance']:.4f})")
-                print(f"  Title: {result.get('title', 'N/A')}")
-                
-                # Display content (truncated if long)
-                content = result['content']
-                if len(content) > 300:
-                    content = content[:300] + "..."
-                content = content.replace("\n", " ").strip()
-                print(f"  Content: {content}")
-                
-                # Display metadata if available
-                if result.get('metadata'):
-                    meta = result['metadata']
-                    if 'category' in meta:
-                        print(f"  Category: {meta['category']}")
-                    if 'source' in meta:
-                        print(f"  Source: {meta['source']}")
-                    if 'section' in meta:
-                        print(f"  Section: {meta['section']}")
-                
-                print()
+            print_results(query, results)
         
         return results
         
@@ -105,15 +77,129 @@ def test_single_query(store: VectorStore, query: str, k: int = 5, verbose: bool
         return []
 
 
-def test_batch_queries(store: VectorStore, queries: List[str], k: int = 3, verbose: bool = True):
+def print_results(query: str, results: List[Dict]):
+    """
+    Display the search results for one query.
+    
+    Args:
+        query: Query string
+        results: Search results for the query
+    """
+    print(f"\n{'='*70}")
+    print(f"🔍 Query: {query}")
+    print(f"{'='*70}")
+    
+    if not results:
+        print("⚠️  No results found!")
+        return
+    
+    print(f"\n📋 Top {len(results)} results:\n")
+    
+    for result in results:
+        print(f"Rank #{result['rank']}")
+        if 'score' in result:
+            print(f"  Score: {result['score']:.4f} (Distance: {result['distance']:.4f})")
+        print(f"  Title: {result.get('title', 'N/A')}")
+        
+        # Display content (truncated if long)
+        content = result['content']
+        if len(content) > 300:
+            content = content[:300] + "..."
+        content = content.replace("\n", " ").strip()
+        print(f"  Content: {content}")
+        
+        # Display metadata if available
+        if result.get('metadata'):
+            meta = result['metadata']
+            if 'category' in meta:
+                print(f"  Category: {meta['category']}")
+            if 'source' in meta:
+                print(f"  Source: {meta['source']}")
+            if 'section' in meta:
+                print(f"  Section: {meta['section']}")
+        
+        print()
+
+
+def _resolve_path(path: str) -> Path:
+    resolved = Path(path)
+    if not resolved.is_absolute():
+        resolved = get_project_root() / resolved
+    return resolved
+
+
+def save_query_embeddings(
+    store: VectorStore,
+    queries: List[str],
+    path: str = DEFAULT_QUERY_EMBEDDINGS_FILE
+) -> Path:
+    """
+    Encode queries once and save them with the queries and model name.
+    
+    Args:
+        store: VectorStore instance
+        queries: List of query strings
+        path: Output .npz file (relative to project root or absolute)
+        
+    Returns:
+        Path to the saved file
+    """
+    output_path = _resolve_path(path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(
+        output_path,
+        vectors=store.encode_queries(queries),
+        queries=np.array(queries),
+        model_name=np.array(store.model_name)
+    )
+    return output_path
+
+
+def load_query_embeddings(
+    store: VectorStore,
+    queries: List[str],
+    path: str = DEFAULT_QUERY_EMBEDDINGS_FILE
+) -> Optional[np.ndarray]:
+    """
+    Load precomputed query embeddings if they match the queries and model.
+    
+    Args:
+        store: VectorStore instance
+        queries: List of query strings
+        path: .npz file written by save_query_embeddings
+        
+    Returns:
+        Float32 array of shape (len(queries), dim), or None if the file is
+        missing or was made for other queries or another model
+    """
+    input_path = _resolve_path(path)
+    if not input_path.exists():
+        return None
+    with np.load(input_path) as saved:
+        if saved["queries"].tolist() != list(queries) or str(saved["model_name"]) != store.model_name:
+            return None
+        return np.ascontiguousarray(saved["vectors"], dtype=np.float32)
+
+
+def test_batch_queries(
+    store: VectorStore,
+    queries: List[str],
+    k: int = 3,
+    verbose: bool = True,
+    query_embeddings_file: str = DEFAULT_QUERY_EMBEDDINGS_FILE
+):
     """
     Test multiple queries and provide summary statistics.
     
+    Uses precomputed query embeddings when a matching file exists, so only
+    the FAISS search runs; otherwise the queries are encoded live.
+    
     Args:
         store: VectorStore instance
         queries: List of query strings
         k: Number of results per query
         verbose: If True, print detailed results
+        query_embeddings_file: Precomputed embeddings (see save_query_embeddings)
     """
     print("=" * 70)
     print("Batch Query Testing")
@@ -130,30 +216,38 @@ def test_batch_queries(store: VectorStore, queries: List[str], k: int = 3, verbo
         'max_score': 0.0
     }
     
-    all_scores = []
+    # One encoder pass (skipped with precomputed embeddings) and one FAISS call for all queries
+    try:
+        query_vectors = load_query_embeddings(store, queries, query_embeddings_file)
+        if query_vectors is not None:
+            print("Using precomputed query embeddings\n")
+            batch_results = store.search_by_vectors(query_vectors, k=k, return_distances=True)
+        else:
+            batch_results = store.search_batch(queries, k=k, return_distances=True)
+    except Exception as e:
+        print(f"❌ Error searching batch: {e}")
+        batch_results = [[] for _ in queries]
     
-    for i, query in enumerate(queries, 1):
+    for i, (query, results) in enumerate(zip(queries, batch_results), 1):
         if verbose:
             print(f"\n[{i}/{len(queries)}] ", end="")
-        
-        results = test_single_query(store, query, k=k, verbose=verbose)
+            print_results(query, results)
         
         if results:
             results_summary['successful_queries'] += 1
             results_summary['total_results'] += len(results)
-            
-            for result in results:
-                if 'score' in result:
-                    score = result['score']
-                    all_scores.append(score)
-                    results_summary['min_score'] = min(results_summary['min_score'], score)
-                    results_summary['max_score'] = max(results_summary['max_score'], score)
         else:
             results_summary['failed_queries'] += 1
     
-    # Calculate average score
-    if all_scores:
-        results_summary['avg_score'] = sum(all_scores) / len(all_scores)
+    # Score statistics as vectorized reductions over all results
+    all_scores = np.fromiter(
+        (result['score'] for results in batch_results for result in results if 'score' in result),
+        dtype=np.float64
+    )
+    if all_scores.size:
+        results_summary['avg_score'] = float(all_scores.mean())
+        results_summary['min_score'] = float(all_scores.min())
+        results_summary['max_score'] = float(all_scores.max())
     
     # Print summary
     print("\n" + "=" * 70)
@@ -163,7 +257,7 @@ def test_batch_queries(store: VectorStore, queries: List[str], k: int = 3, verbo
     print(f"Successful: {results_summary['successful_queries']}")
     print(f"Failed: {results_summary['failed_queries']}")
     print(f"Total results: {results_summary['total_results']}")
-    if all_scores:
+    if all_scores.size:
         print(f"Average score: {results_summary['avg_score']:.4f}")
         print(f"Min score: {results_summary['min_score']:.4f}")
         print(f"Max score: {results_summary['max_score']:.4f}")
@@ -240,6 +334,8 @@ def main():
     parser.add_argument("--query", type=str, help="Single query to test (if not provided, runs all test queries)")
     parser.add_argument("--k", type=int, default=5, help="Number of results to return")
     parser.add_argument("--quiet", action="store_true", help="Suppress detailed output")
+    parser.add_argument("--query-embeddings", default=DEFAULT_QUERY_EMBEDDINGS_FILE, help="Path to precomputed test query embeddings")
+    parser.add_argument("--save-query-embeddings", action="store_true", help="Encode the test queries and save their embeddings before testing")
     
     args = parser.parse_args()
     
@@ -251,13 +347,17 @@ def main():
             args.index
         )
         
+        if args.save_query_embeddings:
+            saved_path = save_query_embeddings(store, TEST_QUERIES, args.query_embeddings)
+            print(f"\n💾 Saved test query embeddings to: {saved_path}")
+        
         # Run tests
         if args.query:
             # Single query test
             test_single_query(store, args.query, k=args.k, verbose=not args.quiet)
         else:
             # Batch test with default queries
-            test_batch_queries(store, TEST_QUERIES, k=args.k, verbose=not args.quiet)
+            test_batch_queries(store, TEST_QUERIES, k=args.k, verbose=not args.quiet, query_embeddings_file=args.query_embeddings)
         
         print("\n✅ All tests completed!")
         
@@ -1,16 +1,70 @@
 import json
+import logging
+import mmap
+import os
 import sys
+import threading
+from collections import OrderedDict
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
 import numpy as np
 import faiss
 from sentence_transformers import SentenceTransformer
 
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
 # Default file paths (relative to project root)
 DEFAULT_EMBEDDINGS_FILE = "data/embeddings.npy"
 DEFAULT_METADATA_FILE = "data/metadata.jsonl"
 DEFAULT_FAISS_INDEX_FILE = "data/faiss_index.bin"
 DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_ONNX_CACHE_DIR = "data/onnx"
+# Query encoder backend: "torch" (SentenceTransformer) or opt-in "onnx" (int8
+# ONNX Runtime, needs optimum[onnxruntime] and a model exported with
+# app/rag/onnx_encoder.py). "onnx" falls back to "torch" if either is missing.
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+# Query embeddings kept per store (LRU, keyed on the whitespace-collapsed query; 0 disables)
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096"))
+# Serve searches from GPU 0 (requires faiss-gpu; falls back to CPU)
+FAISS_USE_GPU = os.getenv("FAISS_USE_GPU", "").lower() in ("1", "true", "yes")
+DEFAULT_INDEX_TYPE = "auto"
+INDEX_TYPES = ("auto", "sq_fp16", "hnsw", "ivfpq", "cagra", "flat", "ivf")
+
+# HNSW settings -- override via environment variables if needed.
+# "auto" only switches to HNSW above HNSW_MIN_VECTORS; on small corpora the
+# exhaustive scan is as fast and exact.
+HNSW_MIN_VECTORS = int(os.getenv("FAISS_HNSW_MIN_VECTORS", "5000"))
+HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))
+
+# IVF-PQ settings. "auto" switches to IVF-PQ above IVFPQ_MIN_VECTORS, where
+# compressed codes (PQ_M bytes per vector at 8 bits) matter more than the
+# small recall loss; PQ training also needs far more vectors than small
+# corpora have.
+IVFPQ_MIN_VECTORS = int(os.getenv("FAISS_IVFPQ_MIN_VECTORS", "1000000"))
+PQ_M = int(os.getenv("FAISS_PQ_M", "16"))
+PQ_NBITS = int(os.getenv("FAISS_PQ_NBITS", "8"))
+# Inverted lists probed per query by IVF indexes (recall/latency tradeoff)
+DEFAULT_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+# IVF/PQ k-means trains on this many vectors per centroid (FAISS's own cap),
+# sampled from the corpus, instead of on every vector
+TRAIN_POINTS_PER_CENTROID = int(os.getenv("FAISS_TRAIN_POINTS_PER_CENTROID", "256"))
+
+
+def _training_sample(vectors: np.ndarray, n_centroids: int) -> np.ndarray:
+    """Random sample of TRAIN_POINTS_PER_CENTROID * n_centroids rows (all rows if fewer)."""
+    sample_size = TRAIN_POINTS_PER_CENTROID * n_centroids
+    if len(vectors) <= sample_size:
+        return vectors
+    rows = np.random.default_rng(0).choice(len(vectors), sample_size, replace=False)
+    rows.sort()  # Sequential reads from the source array
+    return vectors[rows]
 
 
 def get_project_root() -> Path:
@@ -18,6 +72,41 @@ def get_project_root() -> Path:
     return Path(__file__).parent.parent.parent
 
 
+def maximal_marginal_relevance(
+    query_vector: np.ndarray,
+    candidate_vectors: np.ndarray,
+    k: int,
+    lambda_mult: float = 0.5
+) -> List[int]:
+    """
+    Pick k candidates balancing relevance to the query against redundancy.
+    
+    Args:
+        query_vector: Normalized query vector of shape (dim,) or (1, dim)
+        candidate_vectors: Normalized candidate vectors of shape (n, dim)
+        k: Number of candidates to select
+        lambda_mult: 1.0 ranks purely by relevance, 0.0 purely by diversity
+        
+    Returns:
+        Row indices of the selected candidates, in selection order
+    """
+    k = min(k, len(candidate_vectors))
+    if k <= 0:
+        return []
+    
+    relevance = candidate_vectors @ query_vector.reshape(-1)
+    selected = [int(np.argmax(relevance))]
+    # Highest similarity of each candidate to any selected one
+    redundancy = candidate_vectors @ candidate_vectors[selected[0]]
+    while len(selected) < k:
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        redundancy = np.maximum(redundancy, candidate_vectors @ candidate_vectors[best])
+    return selected
+
+
 class VectorStore:
     """
     Vector store for semantic search using FAISS and SentenceTransformers.
@@ -54,94 +143,299 @@ class VectorStore:
         self.model_name = model_name
         self.model = None
         self.index = None
+        self._gpu_resources = None
+        # Inverted lists probed per query by IVF indexes
+        self.nprobe = DEFAULT_NPROBE
         self.metadata = None
+        # Struct-of-arrays view of the result and source fields, aligned to FAISS row ids
+        self.columns: Optional[Dict[str, np.ndarray]] = None
         self.embeddings = None
+        self._query_vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_vectors_lock = threading.Lock()
     
     def load_model(self):
-        """Load the SentenceTransformer model."""
+        """
+        Load the query encoder.
+
+        Uses the int8 ONNX Runtime encoder when EMBEDDING_BACKEND is "onnx",
+        optimum is installed and the model has been exported, otherwise the
+        SentenceTransformer model. Both
+        expose the same encode() interface. The ONNX encoder is CPU-only; the
+        SentenceTransformer model runs on CUDA when available, so GPU hosts
+        should set EMBEDDING_BACKEND=torch.
+        """
         if self.model is None:
-            try:
-                self.model = SentenceTransformer(self.model_name)
-            except Exception as e:
-                raise RuntimeError(f"Failed to load model '{self.model_name}': {e}")
+            if EMBEDDING_BACKEND == "onnx":
+                self.model = self._load_onnx_model()
+            if self.model is None:
+                try:
+                    self.model = SentenceTransformer(self.model_name)
+                except Exception as e:
+                    raise RuntimeError(f"Failed to load model '{self.model_name}': {e}")
         return self.model
     
+    def _load_onnx_model(self):
+        """Load the ONNX encoder, or return None if it is unavailable."""
+        try:
+            try:
+                from .onnx_encoder import OnnxSentenceEncoder
+            except ImportError:
+                from onnx_encoder import OnnxSentenceEncoder
+            return OnnxSentenceEncoder(self.model_name, get_project_root() / DEFAULT_ONNX_CACHE_DIR)
+        except ImportError:
+            logger.warning("ONNX ENCODER UNAVAILABLE | optimum[onnxruntime] not installed | using SentenceTransformer")
+        except FileNotFoundError as e:
+            logger.warning("ONNX ENCODER UNAVAILABLE | %s | using SentenceTransformer", e)
+        except Exception as e:
+            logger.warning("ONNX ENCODER UNAVAILABLE | error=%s | using SentenceTransformer", e)
+        return None
+    
     def load_embeddings(self) -> np.ndarray:
-        """Load embeddings from file."""
+        """
+        Load embeddings from file.
+
+        The file may hold int8 vectors with a per-row scale (npz archive with
+        "q" and "scale", the embedder's default), dequantized here to float16,
+        or plain float16/float32 vectors, which stay memory-mapped as stored.
+        Either way the matrix keeps its compact storage precision (half the
+        memory of float32 for float16); callers promote to float32 only what
+        they need - build_index the full copy it hands to FAISS, MMR just the
+        candidate rows it gathers.
+        """
         if self.embeddings is None:
             if not self.embeddings_file.exists():
                 raise FileNotFoundError(f"Embeddings file not found: {self.embeddings_file}")
             try:
-                self.embeddings = np.load(self.embeddings_file).astype(np.float32)
+                stored = np.load(self.embeddings_file, mmap_mode="r")
+                if isinstance(stored, np.lib.npyio.NpzFile):
+                    with stored:
+                        self.embeddings = stored["q"].astype(np.float16) * stored["scale"].astype(np.float16)
+                else:
+                    self.embeddings = stored
             except Exception as e:
                 raise IOError(f"Error loading embeddings: {e}")
         return self.embeddings
     
     def load_metadata(self) -> List[Dict]:
-        """Load metadata from JSONL file."""
+        """
+        Load metadata from JSONL file.
+
+        Also builds `columns`: the fields returned with search results
+        (content, title, metadata) and reported as sources (category,
+        source_file, section) as object arrays indexed by FAISS row id, so
+        per-query results are gathered with one fancy index per field instead
+        of nested dict lookups per chunk.
+        """
         if self.metadata is None:
             if not self.metadata_file.exists():
                 raise FileNotFoundError(f"Metadata file not found: {self.metadata_file}")
             try:
-                self.metadata = []
-                with open(self.metadata_file, "r", encoding="utf-8") as f:
-                    for line in f:
-                        line = line.strip()
-                        if line:
-                            self.metadata.append(json.loads(line))
+                metadata = self._read_jsonl(self.metadata_file)
             except Exception as e:
                 raise IOError(f"Error loading metadata: {e}")
+            self.columns = self._build_columns(metadata)
+            self.metadata = metadata
         return self.metadata
     
-    def build_index(self, use_gpu: bool = False, index_type: str = "flat") -> faiss.Index:
+    @staticmethod
+    def _read_jsonl(path: Path) -> List[Dict]:
+        """Parse a JSONL file from a read-only memory map (orjson when installed)."""
+        loads = orjson.loads if orjson is not None else json.loads
+        records = []
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # mmap can't map an empty file
+                return records
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for line in iter(mm.readline, b""):
+                    line = line.strip()
+                    if line:
+                        records.append(loads(line))
+        return records
+    
+    @staticmethod
+    def _build_columns(metadata: List[Dict]) -> Dict[str, np.ndarray]:
+        columns = {
+            "content": [], "title": [], "metadata": [],
+            "category": [], "source_file": [], "section": []
+        }
+        for chunk in metadata:
+            chunk_meta = chunk.get("metadata", {})
+            columns["content"].append(chunk.get("content") or chunk.get("text", ""))
+            columns["title"].append(chunk.get("title", ""))
+            columns["metadata"].append(chunk_meta)
+            columns["category"].append(chunk_meta.get("category", ""))
+            columns["source_file"].append(chunk_meta.get("source", ""))
+            columns["section"].append(chunk_meta.get("section", ""))
+        
+        arrays = {}
+        for name, values in columns.items():
+            # Fill element-wise: np.array(list) would split list/dict-valued entries
+            array = np.empty(len(values), dtype=object)
+            array[:] = values
+            arrays[name] = array
+        return arrays
+    
+    def get_sources(self, ids: List[int]) -> List[Dict]:
+        """
+        Return title, category, source_file and section for FAISS row ids.
+        
+        Args:
+            ids: Row ids as found in search results ("id")
+            
+        Returns:
+            One source dictionary per id, in order
+        """
+        self.load_metadata()
+        rows = np.asarray(ids, dtype=np.int64)
+        titles, categories, source_files, sections = (
+            self.columns[name][rows] for name in ("title", "category", "source_file", "section")
+        )
+        return [
+            {"title": title, "category": category, "source_file": source_file, "section": section}
+            for title, category, source_file, section in zip(titles, categories, source_files, sections)
+        ]
+    
+    def build_index(self, use_gpu: bool = False, index_type: str = DEFAULT_INDEX_TYPE) -> faiss.Index:
         """
         Build FAISS index from embeddings.
         
+        Vectors are L2-normalized once here and indexed by inner product, which
+        then equals cosine similarity (queries are normalized by encode_queries).
+        
         Args:
             use_gpu: Whether to use GPU (requires faiss-gpu)
-            index_type: Type of index ("flat" for exact search, "ivf" for approximate)
+            index_type: Type of index ("sq_fp16" for exact search over fp16-stored
+                vectors, "hnsw" for graph-based approximate search, "ivfpq" for
+                approximate search over PQ-compressed vectors, "cagra" for GPU
+                graph search (needs faiss built with cuVS), "flat" for exact
+                search over float32, "ivf" for approximate, "auto" for "ivfpq"
+                above IVFPQ_MIN_VECTORS vectors, "hnsw" above HNSW_MIN_VECTORS
+                and "sq_fp16" otherwise)
             
         Returns:
             FAISS index
         """
-        vectors = self.load_embeddings()
+        # Copy: the loaded embeddings may be a read-only memory map
+        vectors = np.array(self.load_embeddings(), dtype=np.float32)
+        # Stored vectors are normalized, but fp16/int8 storage perturbs the norms
+        faiss.normalize_L2(vectors)
         dim = vectors.shape[1]
+        if "OMP_NUM_THREADS" not in os.environ:
+            # k-means and adds are parallel and memory-bandwidth bound; use every core
+            faiss.omp_set_num_threads(os.cpu_count() or 1)
+        
+        if index_type == "auto":
+            if len(vectors) > IVFPQ_MIN_VECTORS:
+                index_type = "ivfpq"
+            elif len(vectors) > HNSW_MIN_VECTORS:
+                index_type = "hnsw"
+            else:
+                index_type = "sq_fp16"
         
-        if index_type == "flat":
-            # Exact search - IndexFlatL2 for L2 distance
-            index = faiss.IndexFlatL2(dim)
+        if index_type == "ivfpq":
+            # Approximate search over PQ codes - PQ_M bytes per vector instead of
+            # 4 * dim; the inverted lists can be memory-mapped on load
+            nlist = max(1, int(4 * np.sqrt(len(vectors))))
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, PQ_M, PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+            # Enough samples for both the coarse and the 2**PQ_NBITS PQ centroids
+            index.train(_training_sample(vectors, max(nlist, 2 ** PQ_NBITS)))
+        elif index_type == "hnsw":
+            # Approximate search - visits ~efSearch * log(N) vectors instead of all N
+            index = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        elif index_type == "sq_fp16":
+            # Exact search over vectors stored as fp16 - half the memory traffic of
+            # IndexFlatIP with SIMD fp16 distance kernels, recall unchanged in practice
+            index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT)
+            index.train(vectors)
+        elif index_type == "flat":
+            # Exact search - IndexFlatIP for cosine similarity
+            index = faiss.IndexFlatIP(dim)
         elif index_type == "ivf":
             # Approximate search - faster for large datasets
             nlist = min(100, len(vectors) // 10)  # Number of clusters
-            quantizer = faiss.IndexFlatL2(dim)
-            index = faiss.IndexIVFFlat(quantizer, dim, nlist)
-            index.train(vectors)
+            quantizer = faiss.IndexFlatIP(dim)
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+            index.train(_training_sample(vectors, nlist))
+        elif index_type == "cagra":
+            # GPU graph search (cuVS CAGRA) - near-constant latency as the corpus
+            # grows, best with batched queries. Saved in its CPU (IndexHNSWCagra)
+            # form; load with FAISS_USE_GPU to move it back to the GPU
+            if not hasattr(faiss, "GpuIndexCagra"):
+                raise ValueError("Index type 'cagra' requires faiss built with cuVS (faiss-gpu-cuvs)")
+            self._gpu_resources = faiss.StandardGpuResources()
+            index = faiss.GpuIndexCagra(
+                self._gpu_resources, dim, faiss.METRIC_INNER_PRODUCT, faiss.GpuIndexCagraConfig()
+            )
         else:
             raise ValueError(f"Unknown index type: {index_type}")
         
-        if use_gpu:
-            try:
-                res = faiss.StandardGpuResources()
-                index = faiss.index_cpu_to_gpu(res, 0, index)
-            except Exception as e:
-                print(f"⚠️  Warning: GPU not available, using CPU: {e}")
-        
-        index.add(vectors)
+        if index_type == "cagra":
+            # CAGRA builds its graph from the full dataset in train()
+            index.train(vectors)
+        else:
+            if use_gpu:
+                index = self._to_gpu(index)
+            
+            index.add(vectors)
+            if hasattr(index, "reclaimMemory"):
+                # GPU IVF lists grow geometrically while adding; shrink them to size
+                index.reclaimMemory()
         
-        self.index = index
+        self.index = self._configure_index(index)
+        return index
+    
+    def _configure_index(self, index: faiss.Index) -> faiss.Index:
+        """Apply query-time search parameters (not persisted by write_index)."""
+        if isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = HNSW_EF_SEARCH
+        elif isinstance(index, faiss.IndexIVF):
+            index.nprobe = self.nprobe
         return index
     
     def load_index(self) -> faiss.Index:
-        """Load FAISS index from file."""
+        """
+        Load FAISS index from file.
+
+        The index is memory-mapped read-only where the index type supports it,
+        so startup does not depend on index size and the OS page cache is shared
+        between worker processes; the first queries pay the page faults instead.
+        Index types that can't be mapped are read fully into memory.
+
+        With FAISS_USE_GPU set the index is copied to GPU 0, falling back to
+        the CPU index if faiss-gpu, a GPU, or GPU support for the index type
+        is missing (HNSW and the non-IVF scalar quantizer have none; build a
+        "flat" or "ivf" index for GPU serving).
+        """
         if self.index is None:
             if not self.index_file.exists():
                 raise FileNotFoundError(f"Index file not found: {self.index_file}. Run build_index() first.")
             try:
-                self.index = faiss.read_index(str(self.index_file))
+                try:
+                    index = faiss.read_index(str(self.index_file), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                except RuntimeError:
+                    index = faiss.read_index(str(self.index_file))
+                self.index = self._configure_index(index)
             except Exception as e:
                 raise IOError(f"Error loading index: {e}")
+            if FAISS_USE_GPU:
+                self.index = self._to_gpu(self.index)
         return self.index
     
+    def _to_gpu(self, index: faiss.Index) -> faiss.Index:
+        """Copy the index to GPU 0, or return it unchanged if that's not possible."""
+        try:
+            if faiss.get_num_gpus() < 1:
+                raise RuntimeError("no GPU found")
+            # Resources must outlive the GPU index
+            self._gpu_resources = faiss.StandardGpuResources()
+            return faiss.index_cpu_to_gpu(self._gpu_resources, 0, index)
+        except Exception as e:
+            logger.warning("FAISS GPU UNAVAILABLE | error=%s | using CPU", e)
+            return index
+    
     def save_index(self, index: Optional[faiss.Index] = None):
         """Save FAISS index to file."""
         if index is None:
@@ -152,8 +446,8 @@ class VectorStore:
         self.index_file.parent.mkdir(parents=True, exist_ok=True)
         
         # Handle GPU index
-        if hasattr(index, 'index'):
-            # GPU index - convert to CPU first
+        if hasattr(index, 'index') or type(index).__name__.startswith("Gpu"):
+            # GPU index - convert to CPU first (CAGRA becomes IndexHNSWCagra)
             index = faiss.index_gpu_to_cpu(index)
         
         try:
@@ -161,6 +455,80 @@ class VectorStore:
         except Exception as e:
             raise IOError(f"Error saving index: {e}")
     
+    def warm_up(self) -> "VectorStore":
+        """
+        Load everything a search touches and run one encode.
+        
+        Called once at startup (RAGChain, FastAPI lifespan) so the first
+        request pays neither the encoder initialization nor the lazy index,
+        metadata and embedding loads used by MMR retrieval.
+        """
+        self.load_index()
+        self.load_metadata()
+        self.load_embeddings()
+        self.load_model()
+        self.encode_query("warm up")
+        return self
+    
+    def encode_query(self, query: str) -> np.ndarray:
+        """
+        Encode a query into a normalized float32 vector.
+        
+        Args:
+            query: Query text
+            
+        Returns:
+            Array of shape (1, dim)
+        """
+        return self.encode_queries([query])
+    
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Encode several queries in one encoder call.
+        
+        Queries are whitespace-collapsed (case is kept, so cased encoders see
+        the text as asked) and looked up in an LRU of recent query embeddings
+        first, so repeated questions skip the encoder; only the distinct misses
+        are encoded.
+        
+        Args:
+            queries: Query texts
+            
+        Returns:
+            Normalized float32 array of shape (len(queries), dim)
+        """
+        keys = [" ".join(query.split()) for query in queries]
+        vectors: List[Optional[np.ndarray]] = [None] * len(keys)
+        with self._query_vectors_lock:
+            for i, key in enumerate(keys):
+                vector = self._query_vectors.get(key)
+                if vector is not None:
+                    self._query_vectors.move_to_end(key)
+                    vectors[i] = vector
+        
+        # Distinct misses -> positions they fill
+        misses: Dict[str, List[int]] = {}
+        for i, key in enumerate(keys):
+            if vectors[i] is None:
+                misses.setdefault(key, []).append(i)
+        
+        if misses:
+            model = self.load_model()
+            encoded = model.encode(
+                list(misses), batch_size=max(len(misses), 1), convert_to_numpy=True, normalize_embeddings=True
+            )
+            encoded = np.ascontiguousarray(encoded, dtype=np.float32).reshape(len(misses), -1)
+            with self._query_vectors_lock:
+                for (key, rows), vector in zip(misses.items(), encoded):
+                    for i in rows:
+                        vectors[i] = vector
+                    if QUERY_EMBEDDING_CACHE_SIZE > 0:
+                        self._query_vectors[key] = vector
+                        while len(self._query_vectors) > QUERY_EMBEDDING_CACHE_SIZE:
+                            self._query_vectors.popitem(last=False)
+        
+        return np.stack(vectors)
+    
     def search(
         self,
         query: str,
@@ -178,46 +546,217 @@ class VectorStore:
         Returns:
             List of result dictionaries with content and metadata
         """
-        # Load model and encode query
-        model = self.load_model()
-        query_vector = model.encode([query], convert_to_numpy=True, normalize_embeddings=True)[0]
-        query_vector = query_vector.astype(np.float32).reshape(1, -1)
+        # Encode query
+        query_vector = self.encode_query(query)
+        return self.search_by_vector(query_vector, k, return_distances)
+    
+    def search_batch(
+        self,
+        queries: List[str],
+        k: int = 5,
+        return_distances: bool = True
+    ) -> List[List[Dict]]:
+        """
+        Search for several queries with one encoder pass and one FAISS call.
+        
+        Args:
+            queries: Query texts
+            k: Number of results to return per query
+            return_distances: Whether to include distance scores
+            
+        Returns:
+            One list of result dictionaries (content and metadata) per query
+        """
+        if not queries:
+            return []
+        query_vectors = self.encode_queries(queries)
+        return self.search_by_vectors(query_vectors, k, return_distances)
+    
+    def search_by_vector(
+        self,
+        query_vector: np.ndarray,
+        k: int = 5,
+        return_distances: bool = True
+    ) -> List[Dict]:
+        """
+        Search for chunks similar to an already encoded query.
+        
+        Lets callers that already embedded the query (e.g. for a semantic
+        cache probe) skip a second encoder pass.
+        
+        Args:
+            query_vector: Query vector as returned by encode_query: float32,
+                L2-normalized, shape (1, dim)
+            k: Number of results to return
+            return_distances: Whether to include distance scores
+            
+        Returns:
+            List of result dictionaries with content and metadata
+        """
+        return self.search_by_vectors(query_vector, k, return_distances)[0]
+    
+    def search_by_vectors(
+        self,
+        query_vectors: np.ndarray,
+        k: int = 5,
+        return_distances: bool = True
+    ) -> List[List[Dict]]:
+        """
+        Search for several already encoded queries with one FAISS call.
         
+        Args:
+            query_vectors: Query vectors as returned by encode_queries: float32,
+                L2-normalized, shape (n, dim)
+            k: Number of results to return per query
+            return_distances: Whether to include distance scores
+            
+        Returns:
+            One list of result dictionaries (content and metadata) per query.
+            With return_distances, "score" is the cosine similarity and
+            "distance" is 1 - score (for indexes built before the switch to
+            inner product: the L2 distance, with score = 1 / (1 + distance))
+        """
         # Load index and search
         index = self.load_index()
-        distances, indices = index.search(query_vector, k)
+        distances, indices = index.search(query_vectors, k)
+        inner_product = index.metric_type == faiss.METRIC_INNER_PRODUCT
         
         # Load metadata
         metadata = self.load_metadata()
+        contents, titles, chunk_metas = (self.columns[name] for name in ("content", "title", "metadata"))
+        
+        # Scores for the whole (n, k) batch in one pass, so the loop below does no arithmetic
+        if inner_product:
+            scores, distances = distances, 1.0 - distances
+        else:
+            scores = 1.0 / (1.0 + distances)  # Convert distance to similarity score
         
         # Build results
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx < 0 or idx >= len(metadata):
-                continue
-            
-            chunk = metadata[idx].copy()
-            result = {
-                "content": chunk.get("content") or chunk.get("text", ""),
-                "title": chunk.get("title", ""),
-                "metadata": chunk.get("metadata", {}),
-                "rank": i + 1
-            }
+        all_results = []
+        for row_scores, row_distances, row_indices in zip(scores, distances, indices):
+            # Drop padding (-1) for queries with fewer than k hits
+            ranks = np.flatnonzero((row_indices >= 0) & (row_indices < len(metadata)))
+            ids = row_indices[ranks]
+            results = [
+                {"id": int(idx), "content": content, "title": title, "metadata": chunk_meta, "rank": int(rank) + 1}
+                for idx, content, title, chunk_meta, rank in zip(
+                    ids, contents[ids], titles[ids], chunk_metas[ids], ranks
+                )
+            ]
             
             if return_distances:
-                result["distance"] = float(distances[0][i])
-                result["score"] = 1.0 / (1.0 + distances[0][i])  # Convert distance to similarity score
+                for result, score, distance in zip(
+                    results, row_scores[ranks].tolist(), row_distances[ranks].tolist()
+                ):
+                    result["score"] = score
+                    result["distance"] = distance
+            
+            all_results.append(results)
+        
+        return all_results
+    
+    def search_mmr_by_vectors(
+        self,
+        query_vectors: np.ndarray,
+        k: int = 5,
+        fetch_k: int = 10,
+        lambda_mult: float = 0.5,
+        return_distances: bool = True
+    ) -> List[List[Dict]]:
+        """
+        Search with maximal marginal relevance, dropping near-duplicate chunks.
+        
+        Fetches fetch_k candidates per query with one FAISS call, then keeps
+        the k that best balance relevance and diversity. Candidate vectors come
+        from the stored embeddings, so nothing is re-encoded.
+        
+        Args:
+            query_vectors: Query vectors as returned by encode_queries
+            k: Number of results to return per query
+            fetch_k: Number of candidates to choose from
+            lambda_mult: 1.0 ranks purely by relevance, 0.0 purely by diversity
+            return_distances: Whether to include distance scores
             
-            results.append(result)
+        Returns:
+            One list of result dictionaries per query, in MMR order
+        """
+        candidates = self.search_by_vectors(query_vectors, max(k, fetch_k), return_distances)
+        embeddings = self.load_embeddings()
+        
+        all_results = []
+        for query_vector, results in zip(query_vectors, candidates):
+            vectors = embeddings[[result["id"] for result in results]].astype(np.float32)
+            vectors = vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+            selected = [results[i] for i in maximal_marginal_relevance(query_vector, vectors, k, lambda_mult)]
+            for rank, result in enumerate(selected, 1):
+                result["rank"] = rank
+            all_results.append(selected)
         
-        return results
+        return all_results
+
+
+# Process-wide stores, one per set of files, shared by every RAGChain. Loaded
+# before the server forks its workers (gunicorn --preload), their index,
+# metadata and embeddings pages are shared copy-on-write instead of duplicated.
+_shared_stores: Dict[Tuple[str, str, str, str], VectorStore] = {}
+_shared_stores_lock = threading.Lock()
+
+
+def get_shared_store(
+    embeddings_file: str = DEFAULT_EMBEDDINGS_FILE,
+    metadata_file: str = DEFAULT_METADATA_FILE,
+    index_file: str = DEFAULT_FAISS_INDEX_FILE,
+    model_name: str = DEFAULT_MODEL_NAME
+) -> VectorStore:
+    """
+    Return the process-wide VectorStore for the given files (created lazily).
+    
+    Args:
+        embeddings_file: Path to embeddings .npy file
+        metadata_file: Path to metadata JSONL file
+        index_file: Path to FAISS index file
+        model_name: Name of the SentenceTransformer model
+        
+    Returns:
+        Shared VectorStore instance
+    """
+    key = (str(embeddings_file), str(metadata_file), str(index_file), model_name)
+    store = _shared_stores.get(key)
+    if store is None:
+        with _shared_stores_lock:
+            store = _shared_stores.get(key)
+            if store is None:
+                store = _shared_stores[key] = VectorStore(embeddings_file, metadata_file, index_file, model_name)
+    return store
+
+
+def preload_shared_store() -> VectorStore:
+    """
+    Load the default shared store's index, metadata and embeddings.
+    
+    Call in the server's master process before workers fork. The encoder is
+    left to each worker, since model runtimes don't survive fork reliably.
+    """
+    store = get_shared_store()
+    store.load_index()
+    store.load_metadata()
+    store.load_embeddings()
+    return store
+
+
+def reset_shared_stores() -> None:
+    """
+    Drop all shared stores (e.g. after re-indexing) so they are reloaded on next use.
+    """
+    with _shared_stores_lock:
+        _shared_stores.clear()
 
 
 def build_faiss_index(
     embeddings_file: str = DEFAULT_EMBEDDINGS_FILE,
     metadata_file: str = DEFAULT_METADATA_FILE,
     index_file: str = DEFAULT_FAISS_INDEX_FILE,
-    index_type: str = "flat",
+    index_type: str = DEFAULT_INDEX_TYPE,
     use_gpu: bool = False,
     verbose: bool = True
 ) -> Path:
@@ -228,7 +767,7 @@ def build_faiss_index(
         embeddings_file: Path to embeddings file
         metadata_file: Path to metadata file
         index_file: Path to save index file
-        index_type: Type of index ("flat" or "ivf")
+        index_type: Type of index ("auto", "sq_fp16", "hnsw", "ivfpq", "cagra", "flat" or "ivf")
         use_gpu: Whether to use GPU
         verbose: If True, print progress information
         
@@ -273,7 +812,7 @@ if __name__ == "__main__":
     parser.add_argument("--embeddings", default=DEFAULT_EMBEDDINGS_FILE, help="Path to embeddings file")
     parser.add_argument("--metadata", default=DEFAULT_METADATA_FILE, help="Path to metadata file")
     parser.add_argument("--index", default=DEFAULT_FAISS_INDEX_FILE, help="Path to output index file")
-    parser.add_argument("--type", choices=["flat", "ivf"], default="flat", help="Index type")
+    parser.add_argument("--type", choices=INDEX_TYPES, default=DEFAULT_INDEX_TYPE, help="Index type")
     parser.add_argument("--gpu", action="store_true", help="Use GPU (requires faiss-gpu)")
     parser.add_argument("--test", action="store_true", help="Run test search after building")
     
@@ -1,10 +1,10 @@
 # app/routes/chat_router.py
 
-import traceback
-from datetime import datetime
+import json
 from typing import List, Optional
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from app.chat.chat_chain import ChatChain
@@ -39,12 +39,10 @@ async def chat_message(payload: ChatRequest) -> ChatResponse:
     Chat endpoint with full request/response logging.
     Logs: incoming request, memory retrieval, RAG retrieval, AI response, and errors.
     """
-    request_timestamp = datetime.now().isoformat()
-    
-    # 1. Log incoming request
+    # 1. Log incoming request (lazy %-formatting: skipped when INFO is disabled)
     logger.info(
-        f"INCOMING REQUEST | session_id={payload.session_id} | "
-        f"message='{payload.message[:100]}...' | k={payload.k} | timestamp={request_timestamp}"
+        "INCOMING REQUEST | session_id=%s | message='%.100s...' | k=%d",
+        payload.session_id, payload.message, payload.k
     )
     
     try:
@@ -58,37 +56,58 @@ async def chat_message(payload: ChatRequest) -> ChatResponse:
         # 4. Log AI/Gemini response
         answer = reply["answer"]
         sources = reply.get("sources", [])
-        response_timestamp = datetime.now().isoformat()
         
         logger.info(
-            f"AI RESPONSE | session_id={payload.session_id} | "
-            f"answer_length={len(answer)} | num_sources={len(sources)} | timestamp={response_timestamp}"
+            "AI RESPONSE | session_id=%s | answer_length=%d | num_sources=%d",
+            payload.session_id, len(answer), len(sources)
         )
-        logger.debug(f"AI RESPONSE CONTENT | session_id={payload.session_id} | answer='{answer[:200]}...'")
+        logger.debug("AI RESPONSE CONTENT | session_id=%s | answer='%.200s...'", payload.session_id, answer)
         
         # Log final output summary
         logger.info(
-            f"REQUEST COMPLETE | session_id={payload.session_id} | "
-            f"status=success | answer_length={len(answer)} | sources_count={len(sources)}"
+            "REQUEST COMPLETE | session_id=%s | status=success | answer_length=%d | sources_count=%d",
+            payload.session_id, len(answer), len(sources)
         )
         
-        return ChatResponse(
+        # Sources come from our own retrieval code, so skip per-field validation here;
+        # FastAPI still checks the serialized response against response_model once
+        return ChatResponse.model_construct(
             answer=answer,
-            sources=[SourceModel(**src) for src in sources if src],
+            sources=[SourceModel.model_construct(**src) for src in sources if src],
         )
         
     except HTTPException:
         # Re-raise HTTP exceptions (these are intentional)
         raise
     except Exception as exc:
-        # 5. Log errors/exceptions with full traceback
-        error_timestamp = datetime.now().isoformat()
-        error_traceback = traceback.format_exc()
-        
-        logger.error(
-            f"ERROR | session_id={payload.session_id} | "
-            f"exception_type={type(exc).__name__} | error='{str(exc)}' | timestamp={error_timestamp}"
+        # 5. Log errors/exceptions with full traceback (formatted only if a handler emits it)
+        logger.exception(
+            "ERROR | session_id=%s | exception_type=%s | error='%s'",
+            payload.session_id, type(exc).__name__, exc
         )
-        logger.error(f"FULL TRACEBACK | session_id={payload.session_id}\n{error_traceback}")
         
         raise HTTPException(status_code=500, detail=f"Unable to generate reply: {exc}") from exc
+
+
+@router.post("/message/stream", tags=["chat"])
+async def chat_message_stream(payload: ChatRequest) -> StreamingResponse:
+    """
+    Chat endpoint that streams the reply via Server-Sent Events.
+    Emits `data: {"type": "token", "content": ...}` events as Gemini generates text,
+    then `data: {"type": "done", "answer": ..., "sources": [...]}` (or an error event).
+    The reply is stored in chat memory once the stream completes.
+    """
+    logger.info(
+        "INCOMING STREAM REQUEST | session_id=%s | message='%.100s...' | k=%d",
+        payload.session_id, payload.message, payload.k
+    )
+
+    async def event_stream():
+        async for event in chat_chain.generate_reply_stream(
+            session_id=payload.session_id,
+            user_message=payload.message,
+            k=payload.k,
+        ):
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
+Records = List[Dict[str, Any]]
+Index = Dict[Any, Dict[str, Any]]
+
+# (path, id field) -> ((mtime_ns, size), records, records by id)
+_cache: Dict[Tuple[Path, str], Tuple[Tuple[int, int], Records, Index]] = {}
+_lock = threading.Lock()
+
+
+def _signature(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _index(records: Records, key: str) -> Index:
+    index: Index = {}
+    for record in records:
+        # First match wins, like a linear scan would
+        index.setdefault(record.get(key), record)
+    return index
+
+
+def load_records(path: Path, key: str) -> Tuple[Records, Index]:
+    """
+    Return the records of a JSON list file and an index of them by `key`.
+
+    The file is parsed once and reused until its mtime or size changes (e.g.
+    edited by hand or by another worker), so repeat calls cost one stat().
+    Callers must treat the returned records as read-only.
+    """
+    signature = _signature(path)
+    cached = _cache.get((path, key))
+    if cached is not None and cached[0] == signature:
+        return cached[1], cached[2]
+
+    if orjson is not None:
+        records = orjson.loads(path.read_bytes())
+    else:
+        with path.open("r", encoding="utf-8") as handle:
+            records = json.load(handle)
+    index = _index(records, key)
+    with _lock:
+        _cache[(path, key)] = (signature, records, index)
+    return records, index
+
+
+def save_records(path: Path, records: Records, key: str) -> None:
+    """Write records to a JSON list file and make them the cached version."""
+    with path.open("w", encoding="utf-8") as handle:
+        json.dump(records, handle, indent=2)
+    index = _index(records, key)
+    with _lock:
+        _cache[(path, key)] = (_signature(path), records, index)
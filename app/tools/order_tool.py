@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-import json
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict
+
+from .json_store import load_records
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 ORDERS_FILE = BASE_DIR / "data" / "orders.json"
@@ -14,11 +15,11 @@ class OrderLookupTool:
     def __init__(self, data_file: Path | None = None) -> None:
         self._data_file = data_file or ORDERS_FILE
 
-    def _load_orders(self) -> List[Dict[str, Any]]:
+    def _load_orders(self) -> Dict[Any, Dict[str, Any]]:
+        """Orders by order_id (cached until orders.json changes)."""
         if not self._data_file.exists():
             raise FileNotFoundError(f"Orders file not found: {self._data_file}")
-        with self._data_file.open("r", encoding="utf-8") as handle:
-            return json.load(handle)
+        return load_records(self._data_file, "order_id")[1]
 
     def lookup(self, order_id: str) -> Dict[str, Any]:
         """Return order details or an error message."""
@@ -27,9 +28,10 @@ class OrderLookupTool:
         except FileNotFoundError as exc:
             return {"error": str(exc)}
 
-        for order in orders:
-            if order.get("order_id") == order_id:
-                return order
+        order = orders.get(order_id)
+        if order is not None:
+            # Copy so callers can't modify the cached record
+            return dict(order)
 
         return {"error": f"Order '{order_id}' not found."}
 
@@ -1,63 +1,83 @@
 from __future__ import annotations
 
 import json
+import threading
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict
 
 BASE_DIR = Path(__file__).resolve().parents[2]
-TICKETS_FILE = BASE_DIR / "data" / "tickets.json"
+TICKETS_FILE = BASE_DIR / "data" / "tickets.jsonl"
+TICKET_PREFIX = "T-"
 
 
 class TicketTool:
-    """Simple ticket creation utility backed by tickets.json."""
+    """Simple ticket creation utility backed by the append-only tickets.jsonl file."""
 
     def __init__(self, data_file: Path | None = None) -> None:
         self._data_file = data_file or TICKETS_FILE
+        self._lock = threading.Lock()
+        self._decoder = json.JSONDecoder()
+        # Bytes of the file already folded into _max_number
+        self._scanned_bytes = 0
+        self._max_number = 0
 
     def _ensure_file(self) -> None:
-        """Ensure the tickets file exists with an empty list."""
-        if not self._data_file.exists():
-            self._data_file.parent.mkdir(parents=True, exist_ok=True)
-            with self._data_file.open("w", encoding="utf-8") as handle:
-                json.dump([], handle, indent=2)
-
-    def _load_tickets(self) -> List[Dict[str, Any]]:
-        self._ensure_file()
-        with self._data_file.open("r", encoding="utf-8") as handle:
-            return json.load(handle)
-
-    def _save_tickets(self, tickets: List[Dict[str, Any]]) -> None:
+        """Ensure the tickets file exists, migrating a legacy tickets.json list once."""
+        if self._data_file.exists():
+            return
+        self._data_file.parent.mkdir(parents=True, exist_ok=True)
+        legacy_file = self._data_file.with_suffix(".json")
+        tickets = []
+        if legacy_file.exists():
+            with legacy_file.open("r", encoding="utf-8") as handle:
+                tickets = json.load(handle)
         with self._data_file.open("w", encoding="utf-8") as handle:
-            json.dump(tickets, handle, indent=2)
+            handle.writelines(json.dumps(ticket) + "\n" for ticket in tickets)
 
     @staticmethod
-    def _next_ticket_id(tickets: List[Dict[str, Any]]) -> str:
-        prefix = "T-"
-        if not tickets:
-            return f"{prefix}001"
-
-        max_number = 0
-        for ticket in tickets:
-            ticket_id = ticket.get("ticket_id", "")
-            if ticket_id.startswith(prefix):
-                try:
-                    max_number = max(max_number, int(ticket_id.split("-")[1]))
-                except (IndexError, ValueError):
-                    continue
-
-        return f"{prefix}{max_number + 1:03d}"
+    def _ticket_number(ticket_id: str) -> int:
+        if not ticket_id.startswith(TICKET_PREFIX):
+            return 0
+        try:
+            return int(ticket_id.split("-")[1])
+        except (IndexError, ValueError):
+            return 0
+
+    def _scan_new_tickets(self) -> None:
+        """Fold tickets appended since the last scan (by any process) into the id counter."""
+        if self._data_file.stat().st_size < self._scanned_bytes:
+            # File was replaced or truncated; start over
+            self._scanned_bytes = 0
+            self._max_number = 0
+
+        with self._data_file.open("rb") as handle:
+            handle.seek(self._scanned_bytes)
+            data = handle.read()
+
+        # Only complete lines; another writer may be mid-append
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if line.strip():
+                ticket = self._decoder.decode(line.decode("utf-8"))
+                self._max_number = max(self._max_number, self._ticket_number(ticket.get("ticket_id", "")))
+        self._scanned_bytes += end
+
+    def _next_ticket_id(self) -> str:
+        return f"{TICKET_PREFIX}{self._max_number + 1:03d}"
 
     def create_ticket(self, issue_type: str, description: str, user_id: str) -> Dict[str, Any]:
-        """Create a ticket and append to tickets.json."""
-        tickets = self._load_tickets()
-        ticket = {
-            "ticket_id": self._next_ticket_id(tickets),
-            "issue_type": issue_type,
-            "description": description,
-            "user_id": user_id,
-            "status": "open",
-        }
-        tickets.append(ticket)
-        self._save_tickets(tickets)
+        """Create a ticket and append it to tickets.jsonl."""
+        with self._lock:
+            self._ensure_file()
+            self._scan_new_tickets()
+            ticket = {
+                "ticket_id": self._next_ticket_id(),
+                "issue_type": issue_type,
+                "description": description,
+                "user_id": user_id,
+                "status": "open",
+            }
+            # The next scan reads this line back and advances the counter
+            with self._data_file.open("a", encoding="utf-8") as handle:
+                handle.write(json.dumps(ticket) + "\n")
         return ticket
-
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-import json
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Tuple
+
+from .json_store import load_records, save_records
 
 BASE_DIR = Path(__file__).resolve().parents[2]
 USERS_FILE = BASE_DIR / "data" / "users.json"
@@ -14,28 +15,28 @@ class UpdateAddressTool:
     def __init__(self, data_file: Path | None = None) -> None:
         self._data_file = data_file or USERS_FILE
 
-    def _load_users(self) -> List[Dict[str, Any]]:
+    def _load_users(self) -> Tuple[List[Dict[str, Any]], Dict[Any, Dict[str, Any]]]:
+        """Users and users by user_id (cached until users.json changes; read-only)."""
         if not self._data_file.exists():
             raise FileNotFoundError(f"Users file not found: {self._data_file}")
-        with self._data_file.open("r", encoding="utf-8") as handle:
-            return json.load(handle)
+        return load_records(self._data_file, "user_id")
 
     def _save_users(self, users: List[Dict[str, Any]]) -> None:
-        with self._data_file.open("w", encoding="utf-8") as handle:
-            json.dump(users, handle, indent=2)
+        save_records(self._data_file, users, "user_id")
 
     def update(self, user_id: str, new_address: str) -> Dict[str, Any]:
         """Update user address and save to users.json."""
         try:
-            users = self._load_users()
+            users, users_by_id = self._load_users()
         except FileNotFoundError as exc:
             return {"error": str(exc)}
 
-        for user in users:
-            if user.get("user_id") == user_id:
-                user["address"] = new_address
-                self._save_users(users)
-                return user
+        user = users_by_id.get(user_id)
+        if user is None:
+            return {"error": f"User '{user_id}' not found."}
 
-        return {"error": f"User '{user_id}' not found."}
+        # Build new records rather than mutating the cached ones
+        updated = {**user, "address": new_address}
+        self._save_users([updated if record is user else record for record in users])
+        return dict(updated)
 
@@ -3,20 +3,42 @@ Logging configuration for the chatbot API.
 Creates a structured logger that writes to chatbot.log file.
 """
 
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 # Project root directory
 PROJECT_ROOT = Path(__file__).parent.parent.parent
 LOG_FILE = PROJECT_ROOT / "chatbot.log"
+# Log file rotation
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+
+# Background threads that write queued records; stopped (and flushed) at exit
+_listeners: List[logging.handlers.QueueListener] = []
+
+
+def _stop_listeners() -> None:
+    for listener in _listeners:
+        listener.stop()
+    _listeners.clear()
+
+
+atexit.register(_stop_listeners)
 
 
 def setup_logger(name: str = "chatbot", log_file: Optional[Path] = None, level: int = logging.INFO) -> logging.Logger:
     """
     Set up a structured logger with file and console handlers.
     
+    Records are handed to a queue and written by a background listener thread,
+    so logging calls on the request path never block on file or stdout I/O.
+    
     Args:
         name: Logger name
         log_file: Path to log file (defaults to chatbot.log in project root)
@@ -42,17 +64,24 @@ def setup_logger(name: str = "chatbot", log_file: Optional[Path] = None, level:
         datefmt="%Y-%m-%d %H:%M:%S"
     )
     
-    # File handler - write to chatbot.log
-    file_handler = logging.FileHandler(log_file, encoding="utf-8")
+    # File handler - write to chatbot.log (opened on first write)
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8", delay=True
+    )
     file_handler.setLevel(level)
     file_handler.setFormatter(formatter)
-    logger.addHandler(file_handler)
     
     # Console handler - also print to stdout
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(level)
     console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    
+    # Queue in front of both handlers; the listener thread does the actual I/O
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    listener = logging.handlers.QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    _listeners.append(listener)
     
     return logger
 